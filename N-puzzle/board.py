@@ -1,5 +1,6 @@
 import pygame
 from constants import *
+from state import MOVE_DIRS, PuzzleState
 from random import shuffle, seed, sample
 
 class Tile:
@@ -69,12 +70,7 @@ class Board:
     OUTER_BORDER_SIZE = 10
     INNER_BORDER_SIZE = 5
         
-    MOVE_DIRS = { 
-                  "RIGHT" : (0, 1),
-                  "LEFT"  : (0, -1),
-                  "DOWN"  : (1, 0),
-                  "UP"    : (-1, 0)
-                }
+    MOVE_DIRS = MOVE_DIRS
 
     def __init__(self, n, board=None, random_shifts=1000, board_prints=True):
        
@@ -119,6 +115,10 @@ class Board:
             self.forecast_move(move)
         print(self.tiles)
 
+    def get_state(self):
+        # the headless version of the board, for the solvers
+        return PuzzleState.from_board(self)
+
     def draw(self, window):
         window.fill(WHITE)
         
@@ -18,12 +18,21 @@ import pygame
 import argparse
 from constants import *  
 from board import *
-from solvers import UnidirectionalSolver
+from solvers import UnidirectionalSolver, GreedySolver, IDAStarSolver, \
+                    AStarPatternDatabaseHeuristic
+from pattern_db import DEFAULT_PATTERNS
 
 WINDOW = pygame.display.set_mode((WIDTH, HEIGHT + INSTRUCTIONS_HEIGHT))
 
 pygame.display.set_caption(GAME_NAME)
 
+# boards up to this size that have pattern databases get an IDA* try, 
+# others straight away a greedy solution. IDA* gives up after 
+# OPTIMAL_SOLVE_BUDGET expansions (under 10s with pattern database 
+# lookups), and the board gets a greedy solution instead
+MAX_OPTIMAL_SIZE = 4
+OPTIMAL_SOLVE_BUDGET = 500000
+
 
 def parse_cli():
     parser = argparse.ArgumentParser(
@@ -68,6 +77,40 @@ def solved_instructions(window, step, total, total_visited):
     window.blit(text3, (10, HEIGHT + 70))         
 
 
+def solve(board, n):
+    """ Picks a solver for the board size and solves the board
+
+        A* finishes on any 3x3 board. IDA* only holds its current path, 
+        but on 4x4 it can run for hours, so it gets OPTIMAL_SOLVE_BUDGET
+        expansions before greedy best-first takes over. IDA* is only tried
+        with pattern databases (built the first time, ~20s for 4x4), so on 
+        sizes up to MAX_OPTIMAL_SIZE that DEFAULT_PATTERNS covers. Past 4x4 
+        greedy is the only solver that reliably finishes.
+
+        Args:
+            board (Board): the board to solve
+            n (int): board size
+
+        Returns:
+            (int, list) : the number of nodes visited and the moves
+    """
+    if n <= 3:
+        return UnidirectionalSolver(board).get_solution()
+
+    num_visited = 0
+    if n <= MAX_OPTIMAL_SIZE and n in DEFAULT_PATTERNS:
+        solver = IDAStarSolver(board, AStarPatternDatabaseHeuristic, 
+                               max_expansions=OPTIMAL_SOLVE_BUDGET)
+        num_visited, moves = solver.get_solution()
+        if moves is not None:
+            return num_visited, moves
+        print("No optimal solution within {} nodes, solving greedily".format(\
+            OPTIMAL_SOLVE_BUDGET))
+
+    visited, moves = GreedySolver(board).get_solution()
+    return num_visited + visited, moves
+
+
 def main():
 
     run = True
@@ -107,9 +150,8 @@ def main():
                     instructions(WINDOW, automatic_solve_invoked=True)
                     pygame.display.update()
                    
-                    # get solution 
-                    solver = UnidirectionalSolver(board)
-                    num_visited, moves = solver.get_solution()
+                    # get solution
+                    num_visited, moves = solve(board, args.n)
                     print("Solution found after visiting {} nodes".format(\
                         num_visited))                   
  
@@ -1,113 +1,348 @@
 
 import abc
-from copy import deepcopy
 from heapq import heappush, heappop
+from state import PuzzleState, FlatState
+from pattern_db import DEFAULT_PATTERNS, DEFAULT_CACHE_DIR, load_database, rank
+
+# heuristics and solvers work on headless PuzzleStates (see state.py), the
+# Board is only read once, to get the starting state
 
 class AStarBaseHeuristicComputer():
     
+    # heuristics may also define delta(state, move), the change in h when
+    # the Move is made from state. solvers use it when it is there, so a 
+    # child's h costs O(1) instead of a pass over the whole board
+
     def __init__(self):
         pass
 
     @abc.abstractmethod
-    def compute_heuristic(self, tiles):
+    def compute_heuristic(self, state):
         pass
 
 
-class AStarManhattanHeuristic():
+class AStarTableHeuristic(AStarBaseHeuristicComputer):
+    
+    # h is a sum over the tiles of tile_cost(val, pos, n), which only
+    # depends on a tile and its cell, so it goes in a table (one per board 
+    # size). A move changes the cells of exactly two tiles, the one that 
+    # slides and the blank, so delta is four table lookups
 
     def __init__(self):
+        self.n = None
+        self.table = None
+
+    @abc.abstractmethod
+    def tile_cost(self, val, pos, n):
         pass
 
-    def compute_heuristic(self, tiles):
-        # returns sum of manhattan distances to the correct locations
-        d = {}
-        n = len(tiles)
-        for i in range(n):
-            for j in range(n):
-                val = tiles[i][j].val
-                d[val] = (i, j)
+    def get_table(self, n):
+        # table[val][pos]: cost of tile val in cell pos
+        if n != self.n:
+            self.table = [[self.tile_cost(val, pos, n) for pos in range(n * n)] 
+                          for val in range(n * n)]
+            self.n = n
+        return self.table
 
-        summ = 0
-        for val in range(n * n):
-            row_diff = abs(val // n - d[val][0]) #* (val // n)
-            col_diff = abs(val %  n - d[val][1]) #* (val % n)
-            summ += row_diff + col_diff
-        return summ
+    def compute_heuristic(self, state):
+        table = self.get_table(state.n)
+        return sum([table[val][pos] for pos, val in enumerate(state.tiles())])
 
+    def delta(self, state, move):
+        # the tile in cell move.blank takes the blank's cell, and the 
+        # other way around
+        table = self.table if state.n == self.n else self.get_table(state.n)
+        tile, blank = table[state.moved_tile(move)], table[0]
+        return tile[state.blank] - tile[move.blank] + blank[move.blank] - blank[state.blank]
 
-class AStarManhattanHeuristicOuterEmphasis():
 
-    def __init__(self):
-        pass
+class AStarManhattanHeuristic(AStarTableHeuristic):
+
+    def tile_cost(self, val, pos, n):
+        # manhattan distance of tile val from its correct location. The 
+        # blank doesn't count, every move moves it anyway, and counting it
+        # would overestimate (A* then stops being optimal)
+        if val == 0:
+            return 0
+        row_diff = abs(val // n - pos // n) #* (val // n)
+        col_diff = abs(val %  n - pos % n) #* (val % n)
+        return row_diff + col_diff
+
+
+class AStarManhattanHeuristicOuterEmphasis(AStarTableHeuristic):
 
-    def compute_heuristic(self, tiles):
-        # returns sum of manhattan distances to the correct locations
-        d = {}
-        n = len(tiles)
-        for i in range(n):
-            for j in range(n):
-                val = tiles[i][j].val
-                d[val] = (i, j)
+    def tile_cost(self, val, pos, n):
+        # manhattan distance, weighted up for tiles far from the top left
+        row_diff = abs(val // n - pos // n) * (val // n)
+        col_diff = abs(val %  n - pos % n) * (val % n)
+        return row_diff + col_diff
 
-        summ = 0
-        for val in range(n * n):
-            row_diff = abs(val // n - d[val][0]) * (val // n)
-            col_diff = abs(val %  n - d[val][1]) * (val % n)
-            summ += row_diff + col_diff
-        return summ
+
+class AStarPatternDatabaseHeuristic(AStarBaseHeuristicComputer):
+
+    # sum of disjoint additive pattern databases (see pattern_db.py), 6-6-3
+    # on 4x4 by default. Admissible, and much closer to the real distance
+    # than manhattan distance, which is the same thing with 1 tile patterns.
+    # The databases are built the first time a board size is used (~20s 
+    # for 4x4) and memory-mapped from cache_dir after that
+    #
+    # delta: a move slides one tile, so only the lookup of that tile's
+    # pattern changes, O(pattern size ^ 2) to rank it again. That needs 
+    # the cells of the pattern's tiles: free on a FlatState (IDA*), whose
+    # positions() is its live list, but a PuzzleState (A*) has to unpack
+    # all n * n cells to find them
+
+    def __init__(self, patterns=None, cache_dir=DEFAULT_CACHE_DIR):
+        # patterns: lists of tiles, None for DEFAULT_PATTERNS of the size
+        self.patterns = patterns
+        self.cache_dir = cache_dir
+        self.n = None
+
+    def load(self, n):
+        patterns = self.patterns if self.patterns is not None else DEFAULT_PATTERNS[n]
+        tiles = [tile for pattern in patterns for tile in pattern]
+        if len(set(tiles)) != len(tiles) or not all(0 < t < n * n for t in tiles):
+            raise Exception("Patterns must be disjoint groups of tiles 1 to {}: {}"\
+                .format(n * n - 1, patterns))
+        
+        self.groups = [list(pattern) for pattern in patterns]
+        # memoryviews index straight to python ints, and leave the pages
+        # of the memory map unread until a lookup needs them
+        self.databases = [memoryview(load_database(n, pattern, self.cache_dir))
+                          for pattern in patterns]
+        
+        # pattern_of[tile]: (its pattern, its slot in it), None for the 
+        # blank and tiles outside every pattern
+        self.pattern_of = [None] * (n * n)
+        for ind, pattern in enumerate(self.groups):
+            for slot, tile in enumerate(pattern):
+                self.pattern_of[tile] = (ind, slot)
+        self.cells = n * n
+        self.n = n
+
+    def compute_heuristic(self, state):
+        if state.n != self.n:
+            self.load(state.n)
+        where, cells = state.positions(), self.cells
+        return sum([database[rank([where[tile] for tile in group], cells)]
+                    for group, database in zip(self.groups, self.databases)])
+
+    def delta(self, state, move):
+        if state.n != self.n:
+            self.load(state.n)
+        found = self.pattern_of[state.moved_tile(move)]
+        if found is None:
+            return 0
+        ind, slot = found
+        where = state.positions()
+        positions = [where[tile] for tile in self.groups[ind]]
+        database = self.databases[ind]
+        old = database[rank(positions, self.cells)]
+        positions[slot] = state.blank
+        return database[rank(positions, self.cells)] - old
 
 
 class UnidirectionalSolver:
     
+    # A*: expands states in order of f = g + h, where g is the number of 
+    # moves made so far, and among equal f the deepest state first (it is
+    # closest to a goal as far as h can tell). With an admissible h (e.g.
+    # AStarManhattanHeuristic) the solution has the fewest moves possible.
+    #
+    # best_g keeps the fewest moves found to each state, and parent the 
+    # state and move it was reached from, so heap entries are just 
+    # (f, -g, state) and the path is walked back from the goal at the end.
+    # Both are keyed by the packed int of the state.
+
+    # True: order by h alone (greedy best-first, see GreedySolver)
+    greedy = False
+
     def __init__(self, board, heuristic=AStarManhattanHeuristic):
+        # board: a Board, or a PuzzleState to search headless
         self.board = board
         self.heuristic_computer = heuristic()
+        self.nodes_expanded = 0
         print("Using solver: {}".format(self.name()))
 
 
-    def get_tile_tup(self, board):
-        tup = []
-        for row in range(self.board.rows):
-            for col in range(self.board.cols):
-                tup.append(board.tiles[row][col].val)
-        tup = tuple(tup)
-        return tup    
-
-    
     def get_solution(self):
+        """ Searches for a sequence of moves that solves the board
+
+            Returns:
+                (int, list) : the number of nodes expanded, and the moves 
+                              (names of MOVE_DIRS), or None if the board 
+                              has no solution
+        """
         
-        visited = set([])
-        new_h = self.heuristic_computer.compute_heuristic(self.board.tiles)
-        f = [((new_h, new_h, [], deepcopy(self.board)))]
+        # states are packed ints with the blank cached, so a child is a 
+        # couple of int operations instead of a deepcopy of the Board
+        heuristic = self.heuristic_computer
+        delta = getattr(heuristic, "delta", None)
+        greedy = self.greedy
+        start = self.get_start()
+        if not start.is_solvable():
+            return 0, None
+        h = heuristic.compute_heuristic(start)
+        best_g = {start.packed: 0}
+        parent = {start.packed: None}
+        f = [(h, 0, start)]
+        expanded = 0
         
         while(len(f) > 0):
 
-            h, cost, path, board = heappop(f)
-
-            if h == 0:
-                return len(visited), path
+            priority, g, state = heappop(f)
+            g = -g
 
-            tup = self.get_tile_tup(board)
-            if tup in visited:
+            # a cheaper way here was found after this entry was pushed
+            if g > best_g[state.packed]:
                 continue
-            visited.add(tup)
+
+            if state.is_goal():
+                self.nodes_expanded = expanded
+                return expanded, self.reconstruct_path(parent, state.packed)
+            expanded += 1
+            h = priority if greedy else priority - g
  
-            for move in ["RIGHT", "LEFT", "UP", "DOWN"]:
-                new_board = deepcopy(board)
-                if new_board.forecast_move(move) and \
-                                not self.get_tile_tup(new_board) in visited:
-                    new_h = self.heuristic_computer.compute_heuristic(\
-                                                new_board.tiles)
-                    heappush(f, (new_h, new_h, path + [move], new_board))
+            new_g = g + 1
+            for move in state.moves():
+                new_state = state.slide(move)
+                key = new_state.packed
+                
+                # greedy never goes back to a state it has seen, A* does 
+                # when it finds a shorter way there
+                if key in best_g and (greedy or best_g[key] <= new_g):
+                    continue
+                best_g[key] = new_g
+                parent[key] = (state.packed, move.name)
+                
+                if delta is not None:
+                    new_h = h + delta(state, move)
+                else:
+                    new_h = heuristic.compute_heuristic(new_state)
+                heappush(f, (new_h if greedy else new_g + new_h, -new_g, new_state))
+        
+        self.nodes_expanded = expanded
+        return expanded, None
+
+    def get_start(self):
+        return self.board if isinstance(self.board, PuzzleState) \
+                    else self.board.get_state()
+
+    def reconstruct_path(self, parent, key):
+        # follows the parent pointers from the goal back to the start
+        moves = []
+        while parent[key] is not None:
+            key, move = parent[key]
+            moves.append(move)
+        moves.reverse()
+        return moves
 
-    
     def name(self):
         return type(self).__name__ + '_' \
             + type(self.heuristic_computer).__name__
-     
 
 
+class GreedySolver(UnidirectionalSolver):
 
+    # greedy best-first: always expands the state that looks closest to 
+    # the goal. Far fewer expansions than A*, but the solutions are long
+    greedy = True
 
 
+class IDAStarSolver(UnidirectionalSolver):
 
+    # iterative deepening A*: depth first searches that give up on a path 
+    # once g + h passes a bound, starting from the bound h(start) and 
+    # raising it to the smallest f that passed it each round. Same 
+    # (optimal) solutions as A* with the same heuristic, but it only ever 
+    # holds the current path: one FlatState changed in place by make / 
+    # unmake, the moves so far and the recursion. Memory is O(depth), so 
+    # it handles the 4x4 and 5x5 boards that A*'s tables can't hold. 
+    #
+    # States are expanded again in every round and along different paths
+    # (there is no visited set), which costs less than it sounds: each 
+    # round is roughly b times the size of the one before. Undoing the 
+    # previous move is never tried, it only leads back.
+    #
+    # Past about 50 moves that still adds up to hours, so callers that
+    # can't wait set max_expansions and fall back to GreedySolver.
+
+    def __init__(self, board, heuristic=AStarManhattanHeuristic, max_expansions=None):
+        # max_expansions: give up after expanding this many nodes
+        UnidirectionalSolver.__init__(self, board, heuristic)
+        self.max_expansions = max_expansions
+
+    def get_solution(self):
+        """ Searches for a shortest sequence of moves that solves the board
+
+            Returns:
+                (int, list) : the number of nodes expanded over all rounds,
+                              and the moves (names of MOVE_DIRS), or None 
+                              if the board has no solution or the search
+                              ran past max_expansions
+        """
+        heuristic = self.heuristic_computer
+        delta = getattr(heuristic, "delta", None)
+        start = self.get_start()
+        if not start.is_solvable():
+            return 0, None
+        
+        if delta is None:
+            # heuristics without a delta are computed from scratch
+            def delta(board, move):
+                state = board.state()
+                return heuristic.compute_heuristic(state.slide(move)) - \
+                    heuristic.compute_heuristic(state)
+        
+        board = FlatState(start)
+        path = []
+        found, gave_up = -1, -2
+        expanded = 0
+        budget = self.max_expansions
+        if budget is None:
+            budget = float('inf')
+
+        def search(g, h, prev_blank, bound):
+            # returns found, or the smallest f over bound below this node
+            nonlocal expanded
+            if h == 0 and board.is_goal():
+                return found
+            if expanded >= budget:
+                return gave_up
+            expanded += 1
+            
+            blank = board.blank
+            minimum = float('inf')
+            for move in board.moves():
+                if move.blank == prev_blank:
+                    continue
+                new_h = h + delta(board, move)
+                f = g + 1 + new_h
+                if f > bound:
+                    # no need to go there to know it's over
+                    minimum = min(minimum, f)
+                    continue
+                
+                board.make(move)
+                path.append(move.name)
+                t = search(g + 1, new_h, blank, bound)
+                if t == found or t == gave_up:
+                    return t
+                path.pop()
+                board.unmake(move, blank)
+                minimum = min(minimum, t)
+            return minimum
+
+        h = heuristic.compute_heuristic(start)
+        bound = h
+        while(True):
+            t = search(0, h, -1, bound)
+            if t == found:
+                break
+            if t == gave_up:
+                path = None
+                break
+            bound = t
+        
+        self.nodes_expanded = expanded
+        return expanded, path
@@ -0,0 +1,257 @@
+"""
+    Headless puzzle states for the N-puzzle solvers by Matthew Schieber
+
+    Board and Tile own pygame surfaces and a grid of Tile objects, which is
+    what drawing needs and far too heavy for search. A PuzzleState is just
+    the permutation packed into one python int (4 bits per tile up to 4x4,
+    5 bits for 5x5, ...) plus the index of the blank, so copying, hashing
+    and comparing a state are all single int operations:
+
+        state = PuzzleState.from_board(board)
+        for move, child in state.children():
+            ...
+
+    Cell i is row i // n, column i % n, and the solved state has tile i in
+    cell i (the blank, 0, in the top left corner), same as Board.
+
+    Depth first searches, which only ever hold one state, use a FlatState
+    instead: plain lists changed in place by make / unmake.
+
+"""
+from functools import lru_cache
+from collections import namedtuple
+
+# the direction the blank slides in, as (row, col) steps
+MOVE_DIRS = {
+              "RIGHT" : (0, 1),
+              "LEFT"  : (0, -1),
+              "DOWN"  : (1, 0),
+              "UP"    : (-1, 0)
+            }
+
+# the order solvers try the moves in
+MOVES = ["RIGHT", "LEFT", "UP", "DOWN"]
+
+# a legal move from one blank position (see neighbor_table): the tile in
+# cell `blank` slides into the blank's cell, which is at bit blank_shift
+Move = namedtuple("Move", ["name", "blank", "shift", "blank_shift", "mask"])
+
+
+def bits_per_tile(n):
+    # enough bits for the biggest tile, n * n - 1
+    return max(4, (n * n - 1).bit_length())
+
+
+@lru_cache(maxsize=None)
+def neighbor_table(n):
+    """ The legal moves from every blank position, computed once per n
+
+        Args:
+            n (int): board size
+
+        Returns:
+            tuple: entry [blank] is a tuple of Moves, one for every legal 
+                   move, in MOVES order
+    """
+    bits = bits_per_tile(n)
+    mask = (1 << bits) - 1
+    table = []
+    for blank in range(n * n):
+        row, col = divmod(blank, n)
+        moves = []
+        for move in MOVES:
+            x, y = MOVE_DIRS[move]
+            row2, col2 = row + x, col + y
+            if 0 <= row2 < n and 0 <= col2 < n:
+                moves.append(Move(move, row2 * n + col2, bits * (row2 * n + col2), 
+                                  bits * blank, mask))
+        table.append(tuple(moves))
+    return tuple(table)
+
+
+class PuzzleState:
+
+    """
+        Immutable N-puzzle state: tile values packed into an int, the cell
+        of tile value v at position p takes bits [p * bits, (p + 1) * bits)
+    """
+
+    __slots__ = ("n", "packed", "blank")
+
+    def __init__(self, n, packed, blank):
+        self.n = n
+        self.packed = packed
+        self.blank = blank
+
+    @classmethod
+    def from_tiles(cls, n, tiles):
+        """ Packs a flat list of tile values (row by row, 0 is the blank) """
+        bits = bits_per_tile(n)
+        packed = 0
+        for pos, val in enumerate(tiles):
+            packed |= val << (bits * pos)
+        return cls(n, packed, list(tiles).index(0))
+
+    @classmethod
+    def from_board(cls, board):
+        return cls.from_tiles(board.rows,
+            [tile.val for row in board.tiles for tile in row])
+
+    @classmethod
+    def goal(cls, n):
+        return cls.from_tiles(n, range(n * n))
+
+    def tiles(self):
+        """ The tile values, row by row, as a tuple """
+        bits = bits_per_tile(self.n)
+        mask = (1 << bits) - 1
+        packed = self.packed
+        return tuple((packed >> (bits * pos)) & mask for pos in range(self.n * self.n))
+
+    def tile_at(self, pos):
+        bits = bits_per_tile(self.n)
+        return (self.packed >> (bits * pos)) & ((1 << bits) - 1)
+
+    def positions(self):
+        # positions()[tile] is the cell of a tile
+        where = [0] * (self.n * self.n)
+        for pos, val in enumerate(self.tiles()):
+            where[val] = pos
+        return where
+
+    def moves(self):
+        """ The legal Moves from this state """
+        return neighbor_table(self.n)[self.blank]
+
+    def moved_tile(self, move):
+        # the tile that a Move slides
+        return (self.packed >> move.shift) & move.mask
+
+    def slide(self, move):
+        # the state after a legal Move: the tile at the new blank moves 
+        # into the blank's cell. the blank is all zero bits, two xors
+        name, new_blank, shift, blank_shift, mask = move
+        packed = self.packed
+        tile = (packed >> shift) & mask
+        return PuzzleState(self.n, packed ^ (tile << shift) ^ (tile << blank_shift), new_blank)
+
+    def apply(self, move):
+        """ The state after sliding the blank in direction 'move'
+
+            Args:
+                move (str): one of MOVE_DIRS
+
+            Returns:
+                PuzzleState : the new state, or None if the move would slide
+                              the blank off the board
+        """
+        if not move in MOVE_DIRS:
+            raise Exception ("Illegal move name passed to apply: {}".format(move))
+        for legal in self.moves():
+            if legal.name == move:
+                return self.slide(legal)
+        return None
+
+    def children(self):
+        """ Yields (move, state) for every legal move, in MOVES order """
+        for move in self.moves():
+            yield move.name, self.slide(move)
+
+    def is_goal(self):
+        return self.packed == goal_packed(self.n)
+
+    def is_solvable(self):
+        """ Whether any sequence of moves solves this state
+
+            Every move swaps the blank with a tile, so the parity of the 
+            permutation always matches the parity of the blank's (manhattan)
+            distance from its solved cell, and half of all states can never
+            be solved.
+
+            Returns:
+                bool : True if the state can be solved
+        """
+        tiles = list(self.tiles())
+        swaps = 0
+        for pos in range(len(tiles)):
+            while tiles[pos] != pos:
+                val = tiles[pos]
+                tiles[pos], tiles[val] = tiles[val], val
+                swaps += 1
+        return swaps % 2 == (self.blank // self.n + self.blank % self.n) % 2
+
+    def __eq__(self, other):
+        return self.packed == other.packed and self.n == other.n
+
+    def __hash__(self):
+        return hash(self.packed)
+
+    def __lt__(self, other):
+        # only so heap entries with equal keys still compare
+        return self.packed < other.packed
+
+    def __repr__(self):
+        return "PuzzleState({}, {})".format(self.n, list(self.tiles()))
+
+
+@lru_cache(maxsize=None)
+def goal_packed(n):
+    return PuzzleState.goal(n).packed
+
+
+class FlatState:
+
+    """
+        Mutable N-puzzle state for depth first search: tiles[cell] is the
+        tile in a cell, where[tile] the cell of a tile. make() and unmake()
+        change it in place, so a search path needs one FlatState, however
+        deep it goes. It has the moves(), moved_tile() and blank of a 
+        PuzzleState, so heuristic deltas work on either.
+    """
+
+    __slots__ = ("n", "tiles", "where", "blank")
+
+    def __init__(self, state):
+        # state: the PuzzleState to start from
+        self.n = state.n
+        self.tiles = list(state.tiles())
+        self.where = [0] * len(self.tiles)
+        for pos, val in enumerate(self.tiles):
+            self.where[val] = pos
+        self.blank = state.blank
+
+    def positions(self):
+        # the live list, not a copy
+        return self.where
+
+    def moves(self):
+        return neighbor_table(self.n)[self.blank]
+
+    def moved_tile(self, move):
+        return self.tiles[move.blank]
+
+    def make(self, move):
+        # the tile in cell move.blank slides into the blank's cell
+        tiles, where, blank = self.tiles, self.where, self.blank
+        tile = tiles[move.blank]
+        tiles[blank] = tile
+        where[tile] = blank
+        tiles[move.blank] = 0
+        where[0] = move.blank
+        self.blank = move.blank
+
+    def unmake(self, move, blank):
+        # takes back make(move), blank is where the blank was before it
+        tiles, where = self.tiles, self.where
+        tile = tiles[blank]
+        tiles[move.blank] = tile
+        where[tile] = move.blank
+        tiles[blank] = 0
+        where[0] = blank
+        self.blank = blank
+
+    def is_goal(self):
+        return all(val == pos for pos, val in enumerate(self.tiles))
+
+    def state(self):
+        return PuzzleState.from_tiles(self.n, self.tiles)
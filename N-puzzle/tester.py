@@ -1,4 +1,5 @@
 
+import time
 from board import *
 from solvers import *
 from collections import namedtuple
@@ -20,13 +21,20 @@ test_set5 = TestSet(4, [1, 9, 2, 10, 11, 7, 4, 6, 13, 5, 3, 15, 0, 8, 14, 12])
 test_set6 = TestSet(4, [5, 1, 11, 15, 4, 3, 10, 14, 13, 9, 2, 6, 7, 12, 8, 0])
 
 test_sets_to_use = [test_set5, test_set6]
+# A* and IDA* with manhattan distance or pattern databases find the 
+# optimal (shortest) solutions, the others are faster but their solutions
+# are longer. The pattern databases are built on the first run (~20s)
 solvers_to_use = [
                     (UnidirectionalSolver, AStarManhattanHeuristic),
-                    (UnidirectionalSolver, AStarManhattanHeuristicOuterEmphasis)
+                    (UnidirectionalSolver, AStarManhattanHeuristicOuterEmphasis),
+                    (UnidirectionalSolver, AStarPatternDatabaseHeuristic),
+                    (IDAStarSolver, AStarManhattanHeuristic),
+                    (IDAStarSolver, AStarPatternDatabaseHeuristic),
+                    (GreedySolver, AStarManhattanHeuristic)
                  ]
 
 names = {}
-stats = [[0, 0] for i in range(len(solvers_to_use))]
+stats = [[0, 0, 0.] for i in range(len(solvers_to_use))]
 for test_set in test_sets_to_use:
     
     board = Board(test_set.n, test_set.board, random_shifts=0, board_prints=False)
@@ -36,19 +44,25 @@ for test_set in test_sets_to_use:
         solver = solver_and_heuristic[0](board, solver_and_heuristic[1])
         names[ind] = solver.name()
 
-        num_visited, moves = solver.get_solution()
+        t0 = time.time()
+        num_expanded, moves = solver.get_solution()
+        seconds = time.time() - t0
         num_moves = len(moves)
+        print("{} moves, {} nodes expanded, {:.2f}s".format(num_moves, 
+            num_expanded, seconds))
         
         stats[ind][0] += num_moves
-        stats[ind][1] += num_visited
+        stats[ind][1] += num_expanded
+        stats[ind][2] += seconds
 
 total_tests = len(test_sets_to_use)
 
 print("\n\nFinal Testing Results:")
 for i in range(len(solvers_to_use)):
     print("Solver Name: {}".format(names[i]))
-    print("Average path size: {}, Average nodes visited: {}\n", \
-            stats[i][0] / total_tests, stats[i][1] / total_tests)
+    print("Average path size: {}, Average nodes expanded: {}, Average time: {:.2f}s\n"\
+        .format(stats[i][0] / total_tests, stats[i][1] / total_tests, 
+                stats[i][2] / total_tests))
 
          
 
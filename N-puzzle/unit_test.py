@@ -0,0 +1,275 @@
+from solvers import *
+from state import *
+from pattern_db import *
+from random import randint, seed, choice
+import numpy as np
+import pytest
+
+# tests for the headless search side: states, heuristics and solvers.
+# None of it needs pygame, Board and Tile only draw
+
+
+def scramble(n, num_moves):
+    # a solvable state, num_moves random moves away from the goal
+    state = PuzzleState.goal(n)
+    for i in range(num_moves):
+        move, state = choice(list(state.children()))
+    return state
+
+
+def bfsDistance(start):
+    # fewest moves from start to the goal, by brute force breadth first search
+    dist = {start: 0}
+    frontier = [start]
+    while(frontier):
+        new_frontier = []
+        for state in frontier:
+            if state.is_goal():
+                return dist[state]
+            for move, child in state.children():
+                if child not in dist:
+                    dist[child] = dist[state] + 1
+                    new_frontier.append(child)
+        frontier = new_frontier
+    return None
+
+
+def solves(start, moves):
+    state = start
+    for move in moves:
+        state = state.apply(move)
+    return state.is_goal()
+
+
+def test_PuzzleState1():
+
+    # packing and unpacking give back the same tiles, for all bit widths
+    seed(1)
+    for n in [2, 3, 4, 5, 6]:
+        tiles = list(scramble(n, 200).tiles())
+        state = PuzzleState.from_tiles(n, tiles)
+        assert list(state.tiles()) == tiles
+        assert state.blank == tiles.index(0)
+        assert [state.tile_at(pos) for pos in range(n * n)] == tiles
+        assert state == PuzzleState.from_tiles(n, tiles)
+        assert hash(state) == hash(PuzzleState.from_tiles(n, tiles))
+
+    assert PuzzleState.goal(3).is_goal()
+    assert list(PuzzleState.goal(3).tiles()) == list(range(9))
+
+
+def test_PuzzleState2():
+
+    # sliding moves the tile next to the blank into the blank's cell
+    state = PuzzleState.from_tiles(3, [1, 2, 3,
+                                       4, 0, 5,
+                                       6, 7, 8])
+    assert [move.name for move in state.moves()] == ["RIGHT", "LEFT", "UP", "DOWN"]
+
+    right = state.apply("RIGHT")
+    assert list(right.tiles()) == [1, 2, 3, 4, 5, 0, 6, 7, 8] and right.blank == 5
+    up = state.apply("UP")
+    assert list(up.tiles()) == [1, 0, 3, 4, 2, 5, 6, 7, 8] and up.blank == 1
+
+    # no moves off the board, and moves are undone by their opposite
+    assert right.apply("RIGHT") is None
+    assert right.apply("LEFT") == state and up.apply("DOWN") == state
+    assert dict(state.children())["DOWN"] == state.apply("DOWN")
+
+    # the original state never changes
+    assert list(state.tiles()) == [1, 2, 3, 4, 0, 5, 6, 7, 8]
+
+    # every legal move from every blank position
+    seed(2)
+    for n in [3, 4, 5]:
+        state = scramble(n, 100)
+        for move in state.moves():
+            child = state.slide(move)
+            tiles, expected = list(child.tiles()), list(state.tiles())
+            expected[state.blank], expected[move.blank] = expected[move.blank], 0
+            assert tiles == expected and child.blank == move.blank
+            assert state.moved_tile(move) == tiles[state.blank]
+
+
+def test_delta1():
+
+    # incremental h always equals h computed from scratch, on any path
+    seed(3)
+    for heuristic in [AStarManhattanHeuristic(), AStarManhattanHeuristicOuterEmphasis()]:
+        for n in [3, 4, 5, 3]:
+            state = PuzzleState.goal(n)
+            h = heuristic.compute_heuristic(state)
+            assert h == 0
+            for i in range(500):
+                move = choice(state.moves())
+                h += heuristic.delta(state, move)
+                state = state.slide(move)
+                assert h == heuristic.compute_heuristic(state)
+
+
+def test_UnidirectionalSolver1():
+
+    # A* with manhattan distance finds shortest solutions, same length as
+    # brute force BFS
+    seed(4)
+    boards = [[7, 1, 2, 4, 5, 8, 3, 6, 0], [7, 0, 2, 1, 4, 8, 5, 3, 6],
+              [6, 0, 5, 8, 2, 1, 3, 7, 4], [0, 3, 4, 5, 6, 2, 7, 1, 8]]
+    starts = [PuzzleState.from_tiles(3, board) for board in boards] + \
+             [scramble(3, randint(5, 60)) for i in range(6)]
+    for start in starts:
+        num_expanded, moves = UnidirectionalSolver(start).get_solution()
+        assert solves(start, moves)
+        assert len(moves) == bfsDistance(start)
+        assert num_expanded > 0 or start.is_goal()
+
+        # greedy solves it too, just not in the fewest moves
+        num_expanded, moves = GreedySolver(start).get_solution()
+        assert solves(start, moves) and len(moves) >= bfsDistance(start)
+
+    # the blank doesn't count, so manhattan distance is admissible
+    state = PuzzleState.from_tiles(3, [1, 2, 0, 3, 4, 5, 6, 7, 8])
+    assert AStarManhattanHeuristic().compute_heuristic(state) == 2
+    assert UnidirectionalSolver(PuzzleState.goal(3)).get_solution() == (0, [])
+
+
+def test_is_solvable1():
+
+    # states reached by moves are solvable, swapping two tiles makes them
+    # unsolvable, wherever the blank is
+    seed(5)
+    for n in [2, 3, 4, 5]:
+        for i in range(10):
+            state = scramble(n, randint(0, 100))
+            assert state.is_solvable()
+            tiles = list(state.tiles())
+            a, b = [pos for pos in range(n * n) if tiles[pos] != 0][:2]
+            tiles[a], tiles[b] = tiles[b], tiles[a]
+            assert not PuzzleState.from_tiles(n, tiles).is_solvable()
+
+
+def test_FlatState1():
+
+    # make follows PuzzleState.slide step by step, unmake takes it all back
+    seed(6)
+    for n in [3, 4, 5]:
+        start = scramble(n, 50)
+        board = FlatState(start)
+        state, made = start, []
+        for i in range(200):
+            move = choice(board.moves())
+            assert board.moved_tile(move) == state.moved_tile(move)
+            made.append((move, board.blank))
+            board.make(move)
+            state = state.slide(move)
+            assert board.state() == state and board.blank == state.blank
+            assert board.positions() == state.positions()
+
+        for move, blank in reversed(made):
+            board.unmake(move, blank)
+        assert board.state() == start and board.positions() == start.positions()
+
+    assert FlatState(PuzzleState.goal(4)).is_goal()
+    assert not FlatState(scramble(4, 1)).is_goal()
+
+
+def test_IDAStarSolver1():
+
+    # IDA* finds solutions as short as A* and BFS
+    seed(7)
+    boards = [[7, 1, 2, 4, 5, 8, 3, 6, 0], [7, 0, 2, 1, 4, 8, 5, 3, 6],
+              [6, 0, 5, 8, 2, 1, 3, 7, 4], [0, 3, 4, 5, 6, 2, 7, 1, 8]]
+    starts = [PuzzleState.from_tiles(3, board) for board in boards] + \
+             [scramble(3, randint(5, 60)) for i in range(6)]
+    for start in starts:
+        num_expanded, moves = IDAStarSolver(start).get_solution()
+        assert solves(start, moves)
+        assert len(moves) == bfsDistance(start)
+    assert IDAStarSolver(PuzzleState.goal(3)).get_solution() == (0, [])
+
+    # unsolvable boards have no solution, for any solver
+    unsolvable = PuzzleState.from_tiles(3, [0, 2, 1, 3, 4, 5, 6, 7, 8])
+    for solver in [UnidirectionalSolver, GreedySolver, IDAStarSolver]:
+        assert solver(unsolvable).get_solution() == (0, None)
+
+    # past max_expansions it gives up
+    start = PuzzleState.from_tiles(3, boards[2])
+    assert IDAStarSolver(start, max_expansions=10).get_solution() == (10, None)
+    num_expanded, moves = IDAStarSolver(start).get_solution()
+    assert IDAStarSolver(start, max_expansions=num_expanded).get_solution() == \
+        (num_expanded, moves)
+    assert IDAStarSolver(start, max_expansions=num_expanded - 1).get_solution() == \
+        (num_expanded - 1, None)
+    num_expanded, moves = IDAStarSolver(start, max_expansions=10 ** 6).get_solution()
+    assert len(moves) == bfsDistance(start)
+
+
+def test_rank1():
+
+    # rank is a perfect hash of the k-permutations of the cells, and 
+    # unrank its inverse
+    from itertools import permutations
+    for cells, k in [(9, 1), (9, 3), (9, 4), (16, 2), (16, 3)]:
+        placements = list(permutations(range(cells), k))
+        ranks = [rank(list(p), cells) for p in placements]
+        assert sorted(ranks) == list(range(database_size(cells, k)))
+        assert len(placements) == database_size(cells, k)
+        for p, r in zip(placements, ranks):
+            assert unrank(r, cells, k) == list(p)
+        
+        # and rank_array agrees with rank
+        array = np.array(placements, dtype=np.int8)
+        assert list(rank_array(array, cells)) == ranks
+
+
+def test_AStarPatternDatabaseHeuristic1(tmp_path):
+
+    # pattern databases give a bound between manhattan distance and the 
+    # real distance, and incremental h always equals h from scratch
+    seed(8)
+    heuristic = AStarPatternDatabaseHeuristic(cache_dir=str(tmp_path))
+    manhattan = AStarManhattanHeuristic()
+    assert heuristic.compute_heuristic(PuzzleState.goal(3)) == 0
+    for i in range(30):
+        state = scramble(3, randint(1, 60))
+        h = heuristic.compute_heuristic(state)
+        assert manhattan.compute_heuristic(state) <= h <= bfsDistance(state)
+
+    for state in [PuzzleState.goal(3), FlatState(PuzzleState.goal(3))]:
+        h = 0
+        for i in range(300):
+            move = choice(state.moves())
+            h += heuristic.delta(state, move)
+            if isinstance(state, FlatState):
+                state.make(move)
+                assert h == heuristic.compute_heuristic(state.state())
+            else:
+                state = state.slide(move)
+                assert h == heuristic.compute_heuristic(state)
+
+    # saved the first time, loaded after that
+    assert len(list(tmp_path.iterdir())) == len(DEFAULT_PATTERNS[3])
+    again = AStarPatternDatabaseHeuristic(cache_dir=str(tmp_path))
+    assert again.compute_heuristic(state) == heuristic.compute_heuristic(state)
+
+    # tiles left out of every pattern count for nothing, overlaps are an error
+    partial = AStarPatternDatabaseHeuristic([[1, 2]], cache_dir=str(tmp_path))
+    state = PuzzleState.from_tiles(3, [0, 2, 1, 3, 4, 5, 6, 8, 7])
+    assert 0 < partial.compute_heuristic(state) <= heuristic.compute_heuristic(state)
+    with pytest.raises(Exception):
+        AStarPatternDatabaseHeuristic([[1, 2], [2, 3]], cache_dir=str(tmp_path)).load(3)
+
+
+def test_AStarPatternDatabaseHeuristic2(tmp_path):
+
+    # A* and IDA* with pattern databases still find the shortest solutions
+    seed(9)
+    class Heuristic(AStarPatternDatabaseHeuristic):
+        def __init__(self):
+            AStarPatternDatabaseHeuristic.__init__(self, cache_dir=str(tmp_path))
+
+    for i in range(8):
+        start = scramble(3, randint(5, 60))
+        for solver in [UnidirectionalSolver, IDAStarSolver]:
+            num_expanded, moves = solver(start, Heuristic).get_solution()
+            assert solves(start, moves)
+            assert len(moves) == bfsDistance(start)
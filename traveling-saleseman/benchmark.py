@@ -0,0 +1,360 @@
+"""
+    Headless benchmark harness for the TSP solvers by Matthew Schieber
+
+    tester.py is great for looking at tours, but it blocks on plt.show() and
+    only runs one solver on one test set. This runs a whole matrix of
+    solvers x test sets x seeds without any plotting, records
+
+        - wall time (best of --repeats runs)
+        - peak (python + numpy) memory, from a separate tracemalloc run
+        - tour length, and the gap to the best known length
+        - with --profile, the solver's per-phase times and counters (see
+          profiling.py), summed per solver over all of its cases
+
+    writes the results to JSON and/or CSV, and can compare them against a
+    stored baseline (a previous JSON output) to flag speed or quality
+    regressions. The exit code is 1 if anything regressed, so it can gate CI.
+
+    Example:
+        python benchmark.py \\
+            --solvers NearestNeighborSolver "LocalSearchSolver:time_budget=2." \\
+            --tests testSetRandomUniform4 testSetCircle1 --seeds 0 1 2 \\
+            --json results.json --baseline baseline.json
+
+"""
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+from ast import literal_eval
+import numpy as np
+import solvers
+import tester
+from utils import totalDistance, copyPoints
+from profiling import mergeReports, formatReport
+
+FIELDS = ['solver', 'test_set', 'seed', 'n_points', 'time', 'peak_memory_mb',
+          'length', 'best_known', 'gap', 'error', 'phases']
+
+
+def parseSolverSpec(spec: str):
+    """ Parses a solver spec of the form "Name" or "Name:key=value,key=value"
+
+        Values are python literals, or the name of another solver class
+        (e.g. "LocalSearchSolver:base_solver=ChristofidesAlgorithmSolver").
+
+        Args:
+            spec: the solver spec
+
+        Returns:
+            tuple: (solver class, dict of constructor keyword arguments)
+    """
+    name, _, arg_str = spec.partition(':')
+    solver_class = getattr(solvers, name.strip(), None)
+    if not isinstance(solver_class, type) or not issubclass(solver_class, solvers.BaseSolver):
+        raise ValueError("unknown solver: {}".format(name))
+
+    kwargs = {}
+    for item in filter(None, arg_str.split(',')):
+        key, _, value = item.partition('=')
+        value = value.strip()
+        try:
+            kwargs[key.strip()] = literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[key.strip()] = getattr(solvers, value, value)
+    return solver_class, kwargs
+
+
+def getTestSetFun(name: str):
+    """ Looks up a test set function from tester.py by name """
+    fun = getattr(tester, name, None)
+    if not name.startswith('testSet') or not callable(fun):
+        raise ValueError("unknown test set: {}".format(name))
+    return fun
+
+
+def solveOnce(solver_class, kwargs, test_set, random_seed, profile=False):
+    """ Builds and runs one solver, returns (path, seconds, profile report) 
+        where the report is None unless profile is set
+    """
+    # solvers that draw random numbers get the same stream for the same seed
+    random.seed(random_seed)
+    np.random.seed(random_seed)
+
+    t0 = time.perf_counter()
+    solver = solver_class(test_set.n, test_set.m, copyPoints(test_set.points), **kwargs)
+    profiler = solver.enableProfiling() if profile else None
+    path = solver.computePath()
+    seconds = time.perf_counter() - t0
+    return path, seconds, profiler.report() if profile else None
+
+
+def runCase(spec: str, test_set_name: str, random_seed: int, repeats: int=1,
+            measure_memory: bool=True, profile: bool=False) -> dict:
+    """ Runs one cell of the benchmark matrix
+
+        Args:
+            spec: solver spec, see parseSolverSpec
+            test_set_name: name of a test set function in tester.py
+            random_seed: seed for the test set and the solver
+            repeats: number of timed runs, the fastest one is reported
+            measure_memory: do one more run under tracemalloc for peak memory
+                            (tracemalloc slows python down, so that run is
+                            never timed)
+            profile: record the per-phase report of the fastest run in the
+                     'phases' field
+
+        Returns:
+            dict: one result row (see FIELDS), gap and best_known are filled
+                  in later by runBenchmark
+    """
+    test_set = getTestSetFun(test_set_name)(random_seed)
+    row = dict.fromkeys(FIELDS)
+    row.update(solver=spec, test_set=test_set_name, seed=random_seed,
+               n_points=len(test_set.points))
+
+    try:
+        solver_class, kwargs = parseSolverSpec(spec)
+        times = []
+        for r in range(max(repeats, 1)):
+            path, seconds, report = solveOnce(solver_class, kwargs, test_set, 
+                                              random_seed, profile)
+            if not times or seconds < min(times):
+                row['phases'] = report
+            times.append(seconds)
+
+        if sorted(map(tuple, path)) != sorted(map(tuple, test_set.points)):
+            raise ValueError("solver did not return a permutation of the points")
+
+        row['time'] = min(times)
+        row['length'] = totalDistance(path)
+
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                solveOnce(solver_class, kwargs, test_set, random_seed)
+                row['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            finally:
+                tracemalloc.stop()
+
+    except Exception as e:
+        # one broken solver should not take down the whole matrix
+        row['error'] = "{}: {}".format(type(e).__name__, e)
+
+    return row
+
+
+def runBenchmark(specs, test_set_names, seeds, repeats=1, measure_memory=True,
+                 best_known=None, verbose=False, profile=False) -> list:
+    """ Runs every solver on every test set with every seed
+
+        Args:
+            specs: list of solver specs
+            test_set_names: list of test set function names
+            seeds: list of integer seeds
+            repeats: timed runs per case
+            measure_memory: measure peak memory (one extra run per case)
+            best_known: dict mapping "test_set/seed" to the best known length,
+                        gaps are measured against the min of this and the
+                        best length found in this run
+            verbose: print every row as it finishes
+            profile: record every case's per-phase report (see runCase)
+
+        Returns:
+            list: result rows, one per case
+    """
+    rows = []
+    for test_set_name in test_set_names:
+        for random_seed in seeds:
+            for spec in specs:
+                row = runCase(spec, test_set_name, random_seed, repeats, 
+                              measure_memory, profile)
+                rows.append(row)
+                if verbose:
+                    print(formatRow(row))
+
+    best = dict(best_known or {})
+    for row in rows:
+        key = caseKey(row)
+        if row['length'] is not None:
+            best[key] = min(best.get(key, float('inf')), row['length'])
+
+    for row in rows:
+        if row['length'] is not None:
+            row['best_known'] = best[caseKey(row)]
+            row['gap'] = row['length'] / row['best_known'] - 1 if row['best_known'] else 0.
+
+    return rows
+
+
+def caseKey(row: dict) -> str:
+    return "{}/{}".format(row['test_set'], row['seed'])
+
+
+def formatRow(row: dict) -> str:
+    if row['error']:
+        return "{:<40} {:<26} seed {:<3} ERROR {}".format(
+            row['solver'], row['test_set'], row['seed'], row['error'])
+    memory = row['peak_memory_mb']
+    return "{:<40} {:<26} seed {:<3} {:9.3f}s {:>9} {:12.2f}{}".format(
+        row['solver'], row['test_set'], row['seed'], row['time'],
+        '-' if memory is None else '{:.1f}MB'.format(memory), row['length'],
+        '' if row['gap'] is None else '  (+{:.2f}%)'.format(100 * row['gap']))
+
+
+def phaseBreakdown(rows: list) -> dict:
+    """ Sums the per-phase reports of every case, per solver
+
+        Args:
+            rows: result rows of a run with profile=True
+
+        Returns:
+            dict: solver spec -> merged report (see profiling.mergeReports)
+    """
+    by_solver = {}
+    for row in rows:
+        if row.get('phases'):
+            by_solver.setdefault(row['solver'], []).append(row['phases'])
+    return {spec: mergeReports(reports) for spec, reports in by_solver.items()}
+
+
+def writeJSON(rows: list, filename: str) -> None:
+    meta = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'numpy': np.__version__}
+    with open(filename, 'w') as f:
+        json.dump({'meta': meta, 'results': rows}, f, indent=2)
+
+
+def writeCSV(rows: list, filename: str) -> None:
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            # the per-phase report is nested, so it goes in as JSON
+            if row.get('phases') is not None:
+                row = dict(row, phases=json.dumps(row['phases']))
+            writer.writerow(row)
+
+
+def loadResults(filename: str) -> list:
+    """ Loads the result rows of a previous JSON run """
+    with open(filename) as f:
+        return json.load(f)['results']
+
+
+def bestKnownFromResults(rows: list) -> dict:
+    """ The best length seen for each test set / seed in some result rows """
+    best = {}
+    for row in rows:
+        for length in [row.get('length'), row.get('best_known')]:
+            if length is not None:
+                best[caseKey(row)] = min(best.get(caseKey(row), float('inf')), length)
+    return best
+
+
+def compareToBaseline(rows: list, baseline: list, time_tolerance: float=.25,
+                      quality_tolerance: float=.01, min_time: float=.05) -> list:
+    """ Flags cases that got slower or produce longer tours than the baseline
+
+        Args:
+            rows: result rows of this run
+            baseline: result rows of the baseline run
+            time_tolerance: allowed relative slowdown (.25 = 25% slower)
+            quality_tolerance: allowed relative increase in tour length
+            min_time: slowdowns smaller than this many seconds are timer noise
+
+        Returns:
+            list: one human readable string per regression
+    """
+    base = {(r['solver'], r['test_set'], r['seed']): r for r in baseline}
+    regressions = []
+    for row in rows:
+        key = (row['solver'], row['test_set'], row['seed'])
+        if key not in base:
+            continue
+        old = base[key]
+        name = "{} on {} (seed {})".format(*key)
+
+        if row['error'] and not old.get('error'):
+            regressions.append("{}: now fails with {}".format(name, row['error']))
+            continue
+        if row['error'] or old.get('error'):
+            continue
+
+        if row['time'] > old['time'] * (1 + time_tolerance) and \
+                row['time'] - old['time'] > min_time:
+            regressions.append("{}: time {:.3f}s -> {:.3f}s (+{:.0f}%)".format(
+                name, old['time'], row['time'], 100 * (row['time'] / old['time'] - 1)))
+
+        if row['length'] > old['length'] * (1 + quality_tolerance):
+            regressions.append("{}: length {:.2f} -> {:.2f} (+{:.2f}%)".format(
+                name, old['length'], row['length'], 100 * (row['length'] / old['length'] - 1)))
+
+    return regressions
+
+
+def parseCLI(argv=None):
+    parser = argparse.ArgumentParser(description="Headless TSP solver benchmark")
+    parser.add_argument('--solvers', nargs='+', required=True,
+                        help='solver specs, e.g. NearestNeighborSolver or '
+                             '"LocalSearchSolver:time_budget=2.,n_neighbors=10"')
+    parser.add_argument('--tests', nargs='+', required=True,
+                        help='test set functions from tester.py')
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0])
+    parser.add_argument('--repeats', type=int, default=1,
+                        help='timed runs per case, the fastest is reported')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the (extra) tracemalloc run per case')
+    parser.add_argument('--profile', action='store_true',
+                        help='record per-phase times and counters, and print '
+                             'the breakdown per solver')
+    parser.add_argument('--json', help='write results to this JSON file')
+    parser.add_argument('--csv', help='write results to this CSV file')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--time-tolerance', type=float, default=.25)
+    parser.add_argument('--quality-tolerance', type=float, default=.01)
+    parser.add_argument('--min-time', type=float, default=.05)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+
+    args = parseCLI(argv)
+    baseline = loadResults(args.baseline) if args.baseline else None
+
+    # the baseline's best lengths count as best known, so gaps stay comparable
+    rows = runBenchmark(args.solvers, args.tests, args.seeds, args.repeats,
+                        not args.no_memory, bestKnownFromResults(baseline or []),
+                        profile=args.profile)
+    for row in rows:
+        print(formatRow(row))
+    if args.profile:
+        for spec, report in phaseBreakdown(rows).items():
+            print("\n{}, all cases:".format(spec))
+            print(formatReport(report))
+
+    if args.json:
+        writeJSON(rows, args.json)
+    if args.csv:
+        writeCSV(rows, args.csv)
+
+    if baseline is None:
+        return 0
+
+    regressions = compareToBaseline(rows, baseline, args.time_tolerance,
+                                    args.quality_tolerance, args.min_time)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+    if not regressions:
+        print("no regressions against {}".format(args.baseline))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
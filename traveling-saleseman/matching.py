@@ -0,0 +1,490 @@
+"""
+    Minimum weight perfect matching for TSP solvers by Matthew Schieber
+
+    Step 5 of Christofides' algorithm needs a minimum weight perfect
+    matching of the odd degree vertices of the MST, and the 1.5
+    approximation guarantee only holds if that matching is exact. Trying
+    every pairing (Graph.minCostPerfectMatching) is (k-1)!!, so this module
+    implements Edmonds' blossom algorithm, in the O(V^3) primal-dual form
+    described by Galil ("Efficient algorithms for finding maximum matching
+    in graphs", 1986). The structure follows Joris van Rantwijk's well
+    known mwmatching.py.
+
+"""
+import numpy as np
+
+
+def minWeightPerfectMatching(d):
+    """ Computes a minimum weight perfect matching of a complete graph
+
+        Args:
+            d: (r, r) symmetric matrix of edge weights, r even
+
+        Returns:
+            list: r / 2 pairs (i, j) of matched vertices, with i < j
+    """
+    d = np.asarray(d, dtype=np.float64)
+    r = len(d)
+    if r == 0:
+        return []
+    assert r % 2 == 0
+
+    # maximizing (C - weight) over perfect matchings minimizes the weight.
+    # the weights are scaled to integers, which keeps every comparison of
+    # the dual variables exact (floats would need tolerances everywhere)
+    rows, cols = np.triu_indices(r, 1)
+    weights = d[rows, cols]
+    top = weights.max() if len(weights) else 0.
+    scale = 1e9 / top if top > 0 else 1.
+    weights = (np.rint((top - weights) * scale)).astype(np.int64) + 1
+
+    edges = list(zip(rows.tolist(), cols.tolist(), weights.tolist()))
+    mate = maxWeightMatching(r, edges, maxcardinality=True)
+    return [(i, j) for i, j in enumerate(mate) if i < j]
+
+
+def maxWeightMatching(nvertex, edges, maxcardinality=False):
+    """ Computes a maximum weight matching of a general graph
+
+        Args:
+            nvertex: number of vertices
+            edges: list of (i, j, weight) with integer weights
+            maxcardinality: if True, only maximum cardinality matchings
+                            are considered
+
+        Returns:
+            list: mate[i] is the vertex matched to i, or -1 if unmatched
+    """
+
+    nedge = len(edges)
+    if nedge == 0:
+        return [-1] * nvertex
+    maxweight = max(0, max([wt for i, j, wt in edges]))
+
+    # endpoint p of edge k is endpoint[p], where k = p // 2 and p & 1 says
+    # which end. neighbend[v] lists the remote endpoints of v's edges
+    endpoint = [edges[p // 2][p % 2] for p in range(2 * nedge)]
+    neighbend = [[] for i in range(nvertex)]
+    for k, (i, j, wt) in enumerate(edges):
+        neighbend[i].append(2 * k + 1)
+        neighbend[j].append(2 * k)
+
+    # mate[v]: remote endpoint of v's matched edge, or -1
+    mate = [-1] * nvertex
+
+    # blossoms are numbered nvertex .. 2 * nvertex - 1, vertices are
+    # trivial blossoms. label: 0 free, 1 S (outer), 2 T (inner), and
+    # labelend is the endpoint through which the label was reached
+    label = [0] * (2 * nvertex)
+    labelend = [-1] * (2 * nvertex)
+    inblossom = list(range(nvertex))
+    blossomparent = [-1] * (2 * nvertex)
+    blossomchilds = [None] * (2 * nvertex)
+    blossombase = list(range(nvertex)) + [-1] * nvertex
+    blossomendps = [None] * (2 * nvertex)
+    bestedge = [-1] * (2 * nvertex)
+    blossombestedges = [None] * (2 * nvertex)
+    unusedblossoms = list(range(nvertex, 2 * nvertex))
+
+    # dual variables (doubled for vertices, so everything stays integer)
+    dualvar = [maxweight] * nvertex + [0] * nvertex
+    allowedge = [False] * nedge
+    queue = []
+
+    # the ends and doubled weights of every edge, as flat lists
+    edge_i = [i for i, j, wt in edges]
+    edge_j = [j for i, j, wt in edges]
+    edge_wt2 = [2 * wt for i, j, wt in edges]
+
+    def slack(k):
+        return dualvar[edge_i[k]] + dualvar[edge_j[k]] - edge_wt2[k]
+
+    def blossomLeaves(b):
+        if b < nvertex:
+            yield b
+        else:
+            for t in blossomchilds[b]:
+                if t < nvertex:
+                    yield t
+                else:
+                    for v in blossomLeaves(t):
+                        yield v
+
+    def assignLabel(w, t, p):
+        # labels w (and its top level blossom) with t, reached through p.
+        # a T blossom's mate becomes S, and S vertices go on the queue
+        b = inblossom[w]
+        label[w] = label[b] = t
+        labelend[w] = labelend[b] = p
+        bestedge[w] = bestedge[b] = -1
+        if t == 1:
+            queue.extend(blossomLeaves(b))
+        elif t == 2:
+            base = blossombase[b]
+            assignLabel(endpoint[mate[base]], 1, mate[base] ^ 1)
+
+    def scanBlossom(v, w):
+        # traces back from v and w towards the roots of their alternating
+        # trees. returns the base of the new blossom if the paths meet, or
+        # -1 if they reach two different roots (an augmenting path)
+        path = []
+        base = -1
+        while(v != -1 or w != -1):
+            b = inblossom[v]
+            if label[b] & 4:
+                base = blossombase[b]
+                break
+            path.append(b)
+            label[b] = 5
+            if labelend[b] == -1:
+                v = -1
+            else:
+                v = endpoint[labelend[b]]
+                b = inblossom[v]
+                v = endpoint[labelend[b]]
+            if w != -1:
+                v, w = w, v
+        for b in path:
+            label[b] = 1
+        return base
+
+    def addBlossom(base, k):
+        # edge k closes an odd cycle through base, shrink it into a blossom
+        v, w, wt = edges[k]
+        bb = inblossom[base]
+        bv = inblossom[v]
+        bw = inblossom[w]
+        b = unusedblossoms.pop()
+        blossombase[b] = base
+        blossomparent[b] = -1
+        blossomparent[bb] = b
+        blossomchilds[b] = path = []
+        blossomendps[b] = endps = []
+
+        # from v back to the base ...
+        while(bv != bb):
+            blossomparent[bv] = b
+            path.append(bv)
+            endps.append(labelend[bv])
+            v = endpoint[labelend[bv]]
+            bv = inblossom[v]
+        path.append(bb)
+        path.reverse()
+        endps.reverse()
+        endps.append(2 * k)
+
+        # ... and from w back to the base
+        while(bw != bb):
+            blossomparent[bw] = b
+            path.append(bw)
+            endps.append(labelend[bw] ^ 1)
+            w = endpoint[labelend[bw]]
+            bw = inblossom[w]
+
+        label[b] = 1
+        labelend[b] = labelend[bb]
+        dualvar[b] = 0
+        for v in blossomLeaves(b):
+            if label[inblossom[v]] == 2:
+                # T vertices inside the new blossom become S
+                queue.append(v)
+            inblossom[v] = b
+
+        # least slack edges from the new blossom to every other S blossom
+        bestedgeto = [-1] * (2 * nvertex)
+        for bv in path:
+            if blossombestedges[bv] is None:
+                nblists = [[p // 2 for p in neighbend[v]] for v in blossomLeaves(bv)]
+            else:
+                nblists = [blossombestedges[bv]]
+            for nblist in nblists:
+                for k in nblist:
+                    i, j, wt = edges[k]
+                    if inblossom[j] == b:
+                        i, j = j, i
+                    bj = inblossom[j]
+                    if bj != b and label[bj] == 1 and \
+                            (bestedgeto[bj] == -1 or slack(k) < slack(bestedgeto[bj])):
+                        bestedgeto[bj] = k
+            blossombestedges[bv] = None
+            bestedge[bv] = -1
+
+        blossombestedges[b] = [k for k in bestedgeto if k != -1]
+        bestedge[b] = -1
+        for k in blossombestedges[b]:
+            if bestedge[b] == -1 or slack(k) < slack(bestedge[b]):
+                bestedge[b] = k
+
+    def expandBlossom(b, endstage):
+        # turns the children of blossom b back into top level blossoms
+        for s in blossomchilds[b]:
+            blossomparent[s] = -1
+            if s < nvertex:
+                inblossom[s] = s
+            elif endstage and dualvar[s] == 0:
+                expandBlossom(s, endstage)
+            else:
+                for v in blossomLeaves(s):
+                    inblossom[v] = s
+
+        # expanding a T blossom mid stage: relabel its children, starting
+        # from the child through which b got its label, around to the base
+        if not endstage and label[b] == 2:
+            entrychild = inblossom[endpoint[labelend[b] ^ 1]]
+            j = blossomchilds[b].index(entrychild)
+            if j & 1:
+                # odd start index, go forward and wrap
+                j -= len(blossomchilds[b])
+                jstep = 1
+                endptrick = 0
+            else:
+                # even start index, go backward
+                jstep = -1
+                endptrick = 1
+
+            p = labelend[b]
+            while(j != 0):
+                # relabel the T child
+                label[endpoint[p ^ 1]] = 0
+                label[endpoint[blossomendps[b][j - endptrick] ^ endptrick ^ 1]] = 0
+                assignLabel(endpoint[p ^ 1], 2, p)
+                # step to the next S child
+                allowedge[blossomendps[b][j - endptrick] // 2] = True
+                j += jstep
+                p = blossomendps[b][j - endptrick] ^ endptrick
+                # step to the next T child
+                allowedge[p // 2] = True
+                j += jstep
+
+            # the base child becomes T, without labeling through its mate
+            bv = blossomchilds[b][j]
+            label[endpoint[p ^ 1]] = label[bv] = 2
+            labelend[endpoint[p ^ 1]] = labelend[bv] = p
+            bestedge[bv] = -1
+
+            # the remaining children only get a label if one of their
+            # vertices was reached from outside
+            j += jstep
+            while(blossomchilds[b][j] != entrychild):
+                bv = blossomchilds[b][j]
+                if label[bv] == 1:
+                    j += jstep
+                    continue
+                for v in blossomLeaves(bv):
+                    if label[v] != 0:
+                        break
+                if label[v] != 0:
+                    label[v] = 0
+                    label[endpoint[mate[blossombase[bv]]]] = 0
+                    assignLabel(v, 2, labelend[v])
+                j += jstep
+
+        # recycle the blossom number
+        label[b] = labelend[b] = -1
+        blossomchilds[b] = blossomendps[b] = None
+        blossombase[b] = -1
+        blossombestedges[b] = None
+        bestedge[b] = -1
+        unusedblossoms.append(b)
+
+    def augmentBlossom(b, v):
+        # swaps matched and unmatched edges along the even path from v to
+        # the base of blossom b, so v becomes the new base
+
+        # bubble up to the child of b that holds v
+        t = v
+        while(blossomparent[t] != b):
+            t = blossomparent[t]
+        if t >= nvertex:
+            augmentBlossom(t, v)
+
+        i = j = blossomchilds[b].index(t)
+        if i & 1:
+            j -= len(blossomchilds[b])
+            jstep = 1
+            endptrick = 0
+        else:
+            jstep = -1
+            endptrick = 1
+
+        while(j != 0):
+            j += jstep
+            t = blossomchilds[b][j]
+            p = blossomendps[b][j - endptrick] ^ endptrick
+            if t >= nvertex:
+                augmentBlossom(t, endpoint[p])
+            j += jstep
+            t = blossomchilds[b][j]
+            if t >= nvertex:
+                augmentBlossom(t, endpoint[p ^ 1])
+            mate[endpoint[p]] = p ^ 1
+            mate[endpoint[p ^ 1]] = p
+
+        # rotate the children, so the new base comes first
+        blossomchilds[b] = blossomchilds[b][i:] + blossomchilds[b][:i]
+        blossomendps[b] = blossomendps[b][i:] + blossomendps[b][:i]
+        blossombase[b] = blossombase[blossomchilds[b][0]]
+
+    def augmentMatching(k):
+        # flips the augmenting path through edge k, from both of its ends
+        # back to the roots of their trees
+        v, w, wt = edges[k]
+        for s, p in [(v, 2 * k + 1), (w, 2 * k)]:
+            while(True):
+                bs = inblossom[s]
+                if bs >= nvertex:
+                    augmentBlossom(bs, s)
+                mate[s] = p
+                if labelend[bs] == -1:
+                    # reached a root
+                    break
+                t = endpoint[labelend[bs]]
+                bt = inblossom[t]
+                s = endpoint[labelend[bt]]
+                j = endpoint[labelend[bt] ^ 1]
+                if bt >= nvertex:
+                    augmentBlossom(bt, j)
+                mate[j] = labelend[bt]
+                p = labelend[bt] ^ 1
+
+    # every stage either augments the matching by one edge, or proves
+    # that it is optimal
+    for stage in range(nvertex):
+
+        label[:] = [0] * (2 * nvertex)
+        bestedge[:] = [-1] * (2 * nvertex)
+        blossombestedges[nvertex:] = [None] * nvertex
+        allowedge[:] = [False] * nedge
+        queue[:] = []
+
+        # every free vertex is the root of an alternating tree
+        for v in range(nvertex):
+            if mate[v] == -1 and label[inblossom[v]] == 0:
+                assignLabel(v, 1, -1)
+
+        augmented = False
+        while(True):
+
+            # grow the trees along tight edges (zero slack)
+            while(queue and not augmented):
+                v = queue.pop()
+                for p in neighbend[v]:
+                    k = p >> 1
+                    w = endpoint[p]
+                    if inblossom[v] == inblossom[w]:
+                        continue
+                    if not allowedge[k]:
+                        # (slack(k), inlined, this is the hot loop)
+                        kslack = dualvar[v] + dualvar[w] - edge_wt2[k]
+                        if kslack <= 0:
+                            allowedge[k] = True
+
+                    if allowedge[k]:
+                        if label[inblossom[w]] == 0:
+                            # free vertex, label it T (and its mate S)
+                            assignLabel(w, 2, p ^ 1)
+                        elif label[inblossom[w]] == 1:
+                            # two S vertices: a blossom or an augmenting path
+                            base = scanBlossom(v, w)
+                            if base >= 0:
+                                addBlossom(base, k)
+                            else:
+                                augmentMatching(k)
+                                augmented = True
+                                break
+                        elif label[w] == 0:
+                            # w is inside a T blossom, but not yet reached
+                            label[w] = 2
+                            labelend[w] = p ^ 1
+
+                    elif label[inblossom[w]] == 1:
+                        # remember the least slack S to S edge of v's blossom
+                        b = inblossom[v]
+                        if bestedge[b] == -1 or kslack < slack(bestedge[b]):
+                            bestedge[b] = k
+                    elif label[w] == 0:
+                        # and the least slack edge into free vertex w
+                        if bestedge[w] == -1 or kslack < slack(bestedge[w]):
+                            bestedge[w] = k
+
+            if augmented:
+                break
+
+            # no tight edge left to grow along: change the duals by delta
+            # type 1: a dual of an S vertex reaches 0 (we are done)
+            # type 2: an S to free edge becomes tight
+            # type 3: an S to S edge becomes tight
+            # type 4: a dual of a T blossom reaches 0 (expand it)
+            deltatype = -1
+            delta = deltaedge = deltablossom = None
+
+            if not maxcardinality:
+                deltatype = 1
+                delta = min(dualvar[:nvertex])
+
+            for v in range(nvertex):
+                if label[inblossom[v]] == 0 and bestedge[v] != -1:
+                    dv = slack(bestedge[v])
+                    if deltatype == -1 or dv < delta:
+                        delta = dv
+                        deltatype = 2
+                        deltaedge = bestedge[v]
+
+            for b in range(2 * nvertex):
+                if blossomparent[b] == -1 and label[b] == 1 and bestedge[b] != -1:
+                    dv = slack(bestedge[b]) // 2
+                    if deltatype == -1 or dv < delta:
+                        delta = dv
+                        deltatype = 3
+                        deltaedge = bestedge[b]
+
+            for b in range(nvertex, 2 * nvertex):
+                if blossombase[b] >= 0 and blossomparent[b] == -1 and label[b] == 2 \
+                        and (deltatype == -1 or dualvar[b] < delta):
+                    delta = dualvar[b]
+                    deltatype = 4
+                    deltablossom = b
+
+            if deltatype == -1:
+                # no further improvement possible, the maximum cardinality
+                # optimum is reached
+                deltatype = 1
+                delta = max(0, min(dualvar[:nvertex]))
+
+            for v in range(nvertex):
+                if label[inblossom[v]] == 1:
+                    dualvar[v] -= delta
+                elif label[inblossom[v]] == 2:
+                    dualvar[v] += delta
+            for b in range(nvertex, 2 * nvertex):
+                if blossombase[b] >= 0 and blossomparent[b] == -1:
+                    if label[b] == 1:
+                        dualvar[b] += delta
+                    elif label[b] == 2:
+                        dualvar[b] -= delta
+
+            if deltatype == 1:
+                break
+            elif deltatype == 2:
+                allowedge[deltaedge] = True
+                i, j, wt = edges[deltaedge]
+                if label[inblossom[i]] == 0:
+                    i, j = j, i
+                queue.append(i)
+            elif deltatype == 3:
+                allowedge[deltaedge] = True
+                i, j, wt = edges[deltaedge]
+                queue.append(i)
+            else:
+                expandBlossom(deltablossom, False)
+
+        if not augmented:
+            break
+
+        # S blossoms whose dual dropped to 0 are expanded between stages
+        for b in range(nvertex, 2 * nvertex):
+            if blossomparent[b] == -1 and blossombase[b] >= 0 and \
+                    label[b] == 1 and dualvar[b] == 0:
+                expandBlossom(b, True)
+
+    return [endpoint[p] if p >= 0 else -1 for p in mate]
@@ -0,0 +1,264 @@
+"""
+    Distance metrics for the TSP solvers by Matthew Schieber
+
+    Solvers get their distances from a metric (BaseSolver.metric), which is
+    Euclidean unless set otherwise:
+
+        solver = NearestNeighborSolver(n, m, points).useMetric(ManhattanMetric())
+
+    - EuclideanMetric, ManhattanMetric: plain (x, y) coordinates
+    - HaversineMetric: great circle distances, points are (longitude,
+      latitude) in degrees (x, y on a map)
+    - MatrixMetric: any precomputed (k, k) matrix, e.g. road network travel
+      times, which may be asymmetric (matrix[i, j] is the cost of going
+      from points[i] to points[j])
+
+    Every metric builds whole distance matrices vectorized, a block of rows
+    at a time, so no (k, k, 2) temporaries are ever allocated. With a cache
+    directory, matrices are written straight to .npy files there and
+    memory-mapped, and later runs on the same points reuse them.
+
+"""
+import os
+import abc
+import hashlib
+from math import sqrt, sin, cos, asin, radians
+import numpy as np
+
+# rows per block when filling a matrix: keeps every temporary at ~32MB
+BLOCK_ELEMENTS = 1 << 22
+
+
+class Metric(abc.ABC):
+
+    name = "metric"
+
+    # False if distance(u, v) may differ from distance(v, u)
+    symmetric = True
+
+    @abc.abstractmethod
+    def pairwise(self, A: np.ndarray, B: np.ndarray) -> np.ndarray:
+        """ All distances from the points in A to the points in B
+
+            Args:
+                A: (a, 2) array of points
+                B: (b, 2) array of points
+
+            Returns:
+                np.ndarray: (a, b) float64 array, entry [i, j] is the
+                            distance from A[i] to B[j]
+        """
+        pass
+
+    @abc.abstractmethod
+    def pairs(self, A: np.ndarray, B: np.ndarray) -> np.ndarray:
+        """ Distances from A[i] to B[i], for every i (A and B are (r, 2)) """
+        pass
+
+    @abc.abstractmethod
+    def scalar(self):
+        """ A plain python function (x1, y1, x2, y2) -> distance, for the
+            solvers that look up single distances in tight loops
+        """
+        pass
+
+    def key(self) -> str:
+        # identifies the metric (and its parameters) in matrix caches
+        return self.name
+
+    def bound(self, points) -> float:
+        """ An upper bound on the distance between any two of the points
+            (twice the farthest from the first point, by the triangle
+            inequality)
+        """
+        coords = asCoords(points)
+        if len(coords) < 2:
+            return 0.
+        return 2 * float(self.pairwise(coords[:1], coords).max())
+
+    def distance(self, u, v) -> float:
+        return float(self.pairs(asCoords([u]), asCoords([v]))[0])
+
+    def pathLength(self, path) -> float:
+        """ Total distance along a path of points (an open path) """
+        coords = asCoords(path)
+        if len(coords) < 2:
+            return 0.
+        return float(self.pairs(coords[:-1], coords[1:]).sum())
+
+    def matrix(self, points, dtype=np.float64, out=None) -> np.ndarray:
+        """ The (k, k) distance matrix of some points, built block by block
+
+            Args:
+                points: list of points or a (k, 2) array
+                dtype: float type of the matrix
+                out: (k, k) array (e.g. a memory map) to fill instead of a
+                     new one
+
+            Returns:
+                np.ndarray: entry [i, j] is the distance from points[i] to
+                            points[j]
+        """
+        coords = asCoords(points)
+        k = len(coords)
+        if out is None:
+            out = np.empty((k, k), dtype=dtype)
+        rows = max(1, BLOCK_ELEMENTS // max(k, 1))
+        for start in range(0, k, rows):
+            out[start:start + rows] = self.pairwise(coords[start:start + rows], coords)
+        return out
+
+
+class CoordinateMetric(Metric):
+
+    # metrics that are a formula of the coordinates. elementwise works
+    # on arrays of any (broadcastable) shapes, so one formula gives both
+    # whole blocks of the matrix and distances between pairs
+
+    @abc.abstractmethod
+    def elementwise(self, ax, ay, bx, by):
+        pass
+
+    def pairwise(self, A, B):
+        return self.elementwise(A[:, 0, None], A[:, 1, None], B[None, :, 0], B[None, :, 1])
+
+    def pairs(self, A, B):
+        return self.elementwise(A[:, 0], A[:, 1], B[:, 0], B[:, 1])
+
+
+class EuclideanMetric(CoordinateMetric):
+
+    name = "euclidean"
+
+    def elementwise(self, ax, ay, bx, by):
+        return np.sqrt((ax - bx) ** 2 + (ay - by) ** 2)
+
+    def scalar(self):
+        return lambda x1, y1, x2, y2: sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+
+
+class ManhattanMetric(CoordinateMetric):
+
+    name = "manhattan"
+
+    def elementwise(self, ax, ay, bx, by):
+        return np.abs(ax - bx) + np.abs(ay - by)
+
+    def scalar(self):
+        return lambda x1, y1, x2, y2: abs(x1 - x2) + abs(y1 - y2)
+
+
+class HaversineMetric(CoordinateMetric):
+
+    name = "haversine"
+
+    # great circle distance between (longitude, latitude) points in
+    # degrees, in kilometers by default (the mean earth radius)
+
+    def __init__(self, radius=6371.0088):
+        self.radius = radius
+
+    def key(self):
+        return "{}:{!r}".format(self.name, self.radius)
+
+    def elementwise(self, ax, ay, bx, by):
+        ax, ay, bx, by = np.radians(ax), np.radians(ay), np.radians(bx), np.radians(by)
+        h = np.sin((ay - by) / 2) ** 2 + np.cos(ay) * np.cos(by) * np.sin((ax - bx) / 2) ** 2
+        return 2 * self.radius * np.arcsin(np.sqrt(np.minimum(h, 1.)))
+
+    def scalar(self):
+        R = self.radius
+        def haversine(x1, y1, x2, y2):
+            x1, y1, x2, y2 = radians(x1), radians(y1), radians(x2), radians(y2)
+            h = sin((y1 - y2) / 2) ** 2 + cos(y1) * cos(y2) * sin((x1 - x2) / 2) ** 2
+            return 2 * R * asin(sqrt(min(h, 1.)))
+        return haversine
+
+
+class MatrixMetric(Metric):
+
+    name = "matrix"
+
+    # a precomputed matrix over a fixed set of points. The coordinates
+    # only label the points: distances are looked up by finding each point
+    # in `points`, so every point must be distinct, and only those points
+    # can be measured
+
+    def __init__(self, matrix, points):
+        self.dist = np.asarray(matrix, dtype=np.float64)
+        coords = asCoords(points)
+        assert self.dist.shape == (len(coords), len(coords)), \
+            "the matrix must be (k, k) for k points"
+        self.index = {point: ind for ind, point in enumerate(map(tuple, coords.tolist()))}
+        assert len(self.index) == len(coords), "the points must be distinct"
+        self.symmetric = bool(np.allclose(self.dist, self.dist.T))
+        self._key = None
+
+    def key(self):
+        if self._key is None:
+            digest = hashlib.sha1(np.ascontiguousarray(self.dist).tobytes()).hexdigest()
+            self._key = "{}:{}".format(self.name, digest)
+        return self._key
+
+    def indices(self, A):
+        try:
+            return np.array([self.index[point] for point in map(tuple, A.tolist())],
+                            dtype=np.intp)
+        except KeyError as e:
+            raise KeyError("point {} is not in the matrix".format(e.args[0]))
+
+    def pairwise(self, A, B):
+        return self.dist[np.ix_(self.indices(A), self.indices(B))]
+
+    def pairs(self, A, B):
+        return self.dist[self.indices(A), self.indices(B)]
+
+    def bound(self, points):
+        # no triangle inequality to lean on
+        return float(self.dist.max()) if self.dist.size else 0.
+
+    def scalar(self):
+        index, dist = self.index, self.dist.tolist()
+        return lambda x1, y1, x2, y2: dist[index[(x1, y1)]][index[(x2, y2)]]
+
+
+EUCLIDEAN = EuclideanMetric()
+
+
+def asCoords(points) -> np.ndarray:
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def diskCachedMatrix(points, metric: Metric, dtype, cache_dir: str) -> np.ndarray:
+    """ The metric's distance matrix of the points, from a .npy file in
+        cache_dir if an earlier run built it, otherwise built straight into
+        a new file there (block by block, so it never has to fit in memory)
+
+        Args:
+            points: list of points or a (k, 2) array
+            metric: the metric
+            dtype: float type of the matrix
+            cache_dir: directory of the cached matrices (created if missing)
+
+        Returns:
+            np.ndarray: (k, k) read-only memory-mapped matrix
+    """
+    coords = np.ascontiguousarray(asCoords(points))
+    digest = hashlib.sha1()
+    for part in [metric.key().encode(), np.dtype(dtype).str.encode(), coords.tobytes()]:
+        digest.update(part)
+    filename = os.path.join(cache_dir, "dist-{}.npy".format(digest.hexdigest()))
+
+    if not os.path.exists(filename):
+        os.makedirs(cache_dir, exist_ok=True)
+        # written under a temporary name, so a crash never leaves a
+        # half-built matrix behind to be reused
+        tmp = "{}.{}.tmp".format(filename, os.getpid())
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=dtype,
+                                        shape=(len(coords), len(coords)))
+        metric.matrix(coords, dtype, out=out)
+        out.flush()
+        del out
+        os.replace(tmp, filename)
+
+    return np.load(filename, mmap_mode='r')
@@ -0,0 +1,157 @@
+"""
+    Reading and writing point sets by Matthew Schieber
+
+    Two formats:
+
+    - a compact binary format, which is just the .npy format: a short text
+      header (dtype and shape) followed by the raw (k, 2) coordinates, as
+      int32 when every coordinate is a small integer and float64 otherwise.
+      Loading memory-maps the file, so a million points open instantly and
+      only the pages a solver touches are read. np.load reads these too.
+
+    - TSPLIB .tsp files (NODE_COORD_SECTION only), to swap instances with 
+      other TSP codes, e.g. mona-lisa100K.tsp in this directory.
+
+    Every solver takes the resulting (k, 2) arrays directly.
+
+"""
+import numpy as np
+
+COORD_TYPES = ['EUC_2D', 'CEIL_2D', 'ATT', 'GEO', 'MAN_2D', 'MAX_2D']
+
+
+def pointsToArray(points) -> np.ndarray:
+    """ Converts points to a (k, 2) array, int32 if every coordinate is a
+        small integer, float64 otherwise
+
+        Args:
+            points: list of (x, y) points, or an array of them
+
+        Returns:
+            np.ndarray: (k, 2) array of the points
+    """
+    arr = np.asarray(points)
+    if arr.dtype == np.int32:
+        return arr.reshape(-1, 2)
+    arr = arr.astype(np.float64).reshape(-1, 2)
+    info = np.iinfo(np.int32)
+    if len(arr) and np.isfinite(arr).all() and (arr == np.round(arr)).all() and \
+            arr.min() >= info.min and arr.max() <= info.max:
+        return arr.astype(np.int32)
+    return arr
+
+
+def savePoints(filename: str, points) -> None:
+    """ Saves points in the binary (.npy) format
+
+        Args:
+            filename: where to save them (np.save adds .npy if missing)
+            points: list of (x, y) points, or a (k, 2) array
+    """
+    np.save(filename, np.ascontiguousarray(pointsToArray(points)))
+
+
+def loadPoints(filename: str, mmap: bool=True) -> np.ndarray:
+    """ Loads points saved with savePoints (or any (k, 2) int32 / float64 
+        .npy file)
+
+        Args:
+            filename: .npy file
+            mmap: memory-map the file (read only) instead of reading it all
+
+        Returns:
+            np.ndarray: (k, 2) array of the points
+    """
+    points = np.load(filename, mmap_mode='r' if mmap else None, allow_pickle=False)
+    if points.ndim != 2 or points.shape[1] != 2 or \
+            points.dtype not in [np.dtype(np.int32), np.dtype(np.float64)]:
+        raise ValueError("{} does not hold a (k, 2) int32 or float64 array, "
+                         "but {} {}".format(filename, points.dtype, points.shape))
+    return points
+
+
+def gridSize(points) -> tuple:
+    """ The smallest n x m grid holding every point (x in [0, m), y in 
+        [0, n)), like the ones tester.py builds its test sets on
+
+        Args:
+            points: (k, 2) array, or list of points
+
+        Returns:
+            tuple: (n, m)
+    """
+    arr = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(arr) == 0:
+        return 1, 1
+    m, n = np.floor(arr.max(axis=0)).astype(np.int64) + 1
+    return max(int(n), 1), max(int(m), 1)
+
+
+def readTSPLIB(filename: str) -> tuple:
+    """ Reads the coordinates of a TSPLIB .tsp file
+
+        Args:
+            filename: .tsp file with a NODE_COORD_SECTION 
+
+        Returns:
+            tuple: ((k, 2) array of the points (see pointsToArray), in node
+                   order, and a dict of the header, e.g. {'NAME': ..., 
+                   'DIMENSION': '100000', 'EDGE_WEIGHT_TYPE': 'EUC_2D'})
+    """
+    with open(filename) as f:
+        text = f.read()
+
+    head, sep, body = text.partition('NODE_COORD_SECTION')
+    header = {}
+    for line in head.splitlines():
+        key, colon, value = line.partition(':')
+        if colon:
+            header[key.strip()] = value.strip()
+    
+    if not sep:
+        raise ValueError("{} has no NODE_COORD_SECTION (only coordinate "
+                         "instances are supported)".format(filename))
+    if header.get('EDGE_WEIGHT_TYPE', 'EUC_2D') not in COORD_TYPES:
+        raise ValueError("{}: unsupported EDGE_WEIGHT_TYPE {}".format(
+            filename, header['EDGE_WEIGHT_TYPE']))
+
+    # the section runs until EOF (or the end of the file): "id x y" lines
+    body = body.split('EOF')[0]
+    values = np.array(body.split(), dtype=np.float64)
+    if len(values) % 3:
+        raise ValueError("{}: malformed NODE_COORD_SECTION".format(filename))
+    nodes = values.reshape(-1, 3)
+    nodes = nodes[np.argsort(nodes[:, 0], kind='stable')]
+    
+    if 'DIMENSION' in header and int(header['DIMENSION']) != len(nodes):
+        raise ValueError("{}: DIMENSION is {}, but there are {} nodes".format(
+            filename, header['DIMENSION'], len(nodes)))
+    
+    return pointsToArray(nodes[:, 1:]), header
+
+
+def writeTSPLIB(filename: str, points, name: str=None, comment: str=None) -> None:
+    """ Writes points as a TSPLIB .tsp file (EUC_2D)
+
+        Args:
+            filename: .tsp file to write
+            points: list of (x, y) points, or a (k, 2) array
+            name: NAME of the instance (the file name by default)
+            comment: optional COMMENT line
+    """
+    arr = pointsToArray(points)
+    if name is None:
+        name = filename.split('/')[-1].rsplit('.', 1)[0]
+    
+    lines = ["NAME : {}".format(name)]
+    if comment:
+        lines.append("COMMENT : {}".format(comment))
+    lines += ["TYPE : TSP", "DIMENSION : {}".format(len(arr)), 
+              "EDGE_WEIGHT_TYPE : EUC_2D", "NODE_COORD_SECTION"]
+    
+    # repr keeps floats exact, ints stay ints
+    lines += ["{} {} {}".format(i + 1, x, y) for i, (x, y) in enumerate(arr.tolist())]
+    lines.append("EOF")
+    
+    with open(filename, 'w') as f:
+        f.write("\n".join(lines) + "\n")
@@ -0,0 +1,150 @@
+"""
+    Per-phase profiling for the TSP solvers by Matthew Schieber
+
+    Multi-stage solvers (ChristofidesAlgorithmSolver's numbered steps,
+    LocalSearchSolver's base solver / setup / passes, ...) wrap their phases
+    in spans and bump counters:
+
+        with self.span("2 mst"):
+            mst = denseMST(d, self.profiler)
+        self.count("odd vertices", len(odds))
+
+    Profiling is off by default: every solver starts with NULL_PROFILER,
+    whose span() hands back one shared do-nothing context manager and whose
+    count() returns right away, so the cost is a couple of method calls per
+    phase. Counters in inner loops are summed into locals and reported once
+    per phase, never per iteration.
+
+        profiler = solver.enableProfiling()
+        path = solver.computePath()
+        print(profiler.format())
+
+    Spans nest, a span opened inside another is reported as "outer/inner".
+    benchmark.py --profile collects report() for every case and sums the
+    phases per solver.
+
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Profiler():
+
+    # wall time and number of calls per phase, plus named counters
+
+    enabled = True
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = defaultdict(int)
+        self.stack = []
+
+    @contextmanager
+    def span(self, name: str):
+        """ Times the body of a with statement as the phase `name` """
+        self.stack.append(name)
+        key = "/".join(self.stack)
+        # registered on entry, so phases are listed outer before inner
+        self.phases.setdefault(key, (0., 0))
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - t0
+            self.stack.pop()
+            total, calls = self.phases[key]
+            self.phases[key] = (total + seconds, calls + 1)
+
+    def count(self, name: str, n: int=1) -> None:
+        """ Adds n to the counter `name` """
+        self.counters[name] += n
+
+    def report(self) -> dict:
+        """ The phases and counters so far, as plain (JSON friendly) dicts
+
+            Returns:
+                dict: {"phases": {name: {"time": seconds, "calls": calls}},
+                       "counters": {name: value}}
+        """
+        return {'phases': {name: {'time': seconds, 'calls': calls}
+                           for name, (seconds, calls) in self.phases.items()},
+                'counters': dict(self.counters)}
+
+    def format(self) -> str:
+        return formatReport(self.report())
+
+
+class NullProfiler():
+
+    # the default: looks like a Profiler, records nothing
+
+    enabled = False
+
+    class NullSpan():
+        def __enter__(self):
+            return self
+        def __exit__(self, *args):
+            return False
+
+    null_span = NullSpan()
+
+    def span(self, name):
+        return self.null_span
+
+    def count(self, name, n=1):
+        pass
+
+    def report(self):
+        return {'phases': {}, 'counters': {}}
+
+    def format(self):
+        return ""
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def mergeReports(reports) -> dict:
+    """ Sums the phases and counters of several reports
+
+        Args:
+            reports: iterable of Profiler.report() dicts (None is skipped)
+
+        Returns:
+            dict: one report, with the times, calls and counters summed
+    """
+    phases, counters = {}, defaultdict(int)
+    for report in reports:
+        if not report:
+            continue
+        for name, phase in report['phases'].items():
+            total = phases.setdefault(name, {'time': 0., 'calls': 0})
+            total['time'] += phase['time']
+            total['calls'] += phase['calls']
+        for name, value in report['counters'].items():
+            counters[name] += value
+    return {'phases': phases, 'counters': dict(counters)}
+
+
+def formatReport(report: dict) -> str:
+    """ A per-phase breakdown, one line per phase (in the order they first
+        ran) with its share of the top level time, then the counters
+
+        Args:
+            report: a Profiler.report() dict
+
+        Returns:
+            str: the breakdown
+    """
+    phases = report['phases']
+    total = sum(phase['time'] for name, phase in phases.items() if '/' not in name)
+    lines = []
+    for name, phase in phases.items():
+        share = 100 * phase['time'] / total if total else 0.
+        lines.append("  {:<36} {:10.4f}s {:6.1f}% {:8d} calls".format(
+            '  ' * name.count('/') + name.rsplit('/', 1)[-1], phase['time'],
+            share, phase['calls']))
+    for name, value in sorted(report['counters'].items()):
+        lines.append("  {:<36} {:11d}".format(name, value))
+    return "\n".join(lines)
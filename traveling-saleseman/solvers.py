@@ -16,6 +16,8 @@
             - HorizontalSortSolver
             - VerticalSortSolver
             - OriginSortSolver
+            - HilbertCurveSolver
+            - MortonCurveSolver
             - RandomSampleSolver
 
         Greedy Solvers:
@@ -23,29 +25,159 @@
             - NearestNeighborSolverParallel
             - ChristofidesAlgorithmSolver 
 
+        Improvement Solvers (wrap any other solver):
+            - LocalSearchSolver (2-opt + Or-opt)
+            - LinKernighanSolver (Or-3opt + kicks, no distance matrix)
+            - SimulatedAnnealingSolver (2-opt / swap moves, reheats, multi-start)
+
+        Divide and Conquer Solvers (for huge instances):
+            - ClusterSolver (k-means + any improvement solver, in parallel)
+
+        Dynamic Solvers (points come and go):
+            - IncrementalTourSolver (cheapest insertion + local LinKernighan repair)
+
 """
 import abc
-from math import ceil
+import os
+import time
+from math import ceil, hypot, exp, log, cos, pi
 import concurrent.futures
 from copy import deepcopy
+import numpy as np
 import multiprocessing as mp
+from multiprocessing import shared_memory
+import weakref
 from heapq import heappush, heappop
-from random import shuffle, seed, randint
+from random import shuffle, seed, randint, Random
 from collections import defaultdict, deque
 from utils import *
+from spatial import SpatialGrid, NeighborCache, nearestNeighborLists, hilbertIndex, mortonIndex, kMeans
+from matching import minWeightPerfectMatching
+from profiling import Profiler, NULL_PROFILER
+from metrics import EUCLIDEAN, diskCachedMatrix
 from itertools import permutations, combinations
 
 class BaseSolver(abc.ABC):
 
+    # float type of the shared distance matrix (np.float32 halves the memory)
+    dtype = np.float64
+
+    # if True, solvers constructed on the same points (e.g. repeated runs on 
+    # one TestSet) reuse a single distance matrix instead of rebuilding it
+    cache_distances = False
+
+    # per-phase timings and counters, off (NULL_PROFILER) unless 
+    # enableProfiling is called. see profiling.py
+    profiler = NULL_PROFILER
+
+    # where distances come from, see useMetric and metrics.py. With a 
+    # distance_cache_dir, distance matrices are stored there as .npy files
+    # (memory-mapped, and reused by later runs on the same points)
+    metric = EUCLIDEAN
+    distance_cache_dir = None
+
     def __init__(self, n, m, points):
         self.n = n
         self.m = m
         self.points = points
+        self._dist = None
 
     @abc.abstractmethod
     def computePath(self):
         pass
 
+    def iterSolutions(self, time_budget=None):
+        # anytime interface: yields (length, path) pairs, each one shorter 
+        # than the last, as the solver finds them. Callers can stop 
+        # iterating at any point and keep the last path. Solvers that can't
+        # report anything before they are done yield their final path once
+        # (and ignore the time budget)
+        path = self.computePath()
+        yield self.pathCost(path), path
+
+    def computePathWithin(self, time_budget, callback=None):
+        # runs iterSolutions for (at most) time_budget seconds, calling 
+        # callback(length, path) on every improvement. returns the best path
+        best = None
+        for length, path in self.iterSolutions(time_budget):
+            best = path
+            if callback is not None:
+                callback(length, path)
+        return best
+
+    def enableProfiling(self, profiler=None):
+        # records spans and counters from now on, returns the profiler
+        self.profiler = Profiler() if profiler is None else profiler
+        return self.profiler
+
+    def span(self, name):
+        # with self.span("phase"): ... times the phase (when profiling)
+        return self.profiler.span(name)
+
+    def count(self, name, n=1):
+        self.profiler.count(name, n)
+
+    def useMetric(self, metric):
+        # measures distances with another metrics.Metric from now on, 
+        # returns the solver (so it chains onto the constructor)
+        self.metric = metric
+        self._dist = None
+        return self
+
+    def requireSymmetric(self):
+        # for solvers whose moves or bounds assume d[i][j] == d[j][i]
+        if not self.metric.symmetric:
+            raise ValueError("{} needs a symmetric metric".format(self.name))
+
+    def pathCost(self, path):
+        # length of a path of points under the solver's metric
+        if self.metric is EUCLIDEAN:
+            return totalDistance(path)
+        return self.metric.pathLength(path)
+
+    def shortTour(self, k):
+        # the best tour of k < 3 points, which is only a question of 
+        # direction (on asymmetric instances)
+        tour = list(range(k))
+        if k == 2 and not self.metric.symmetric:
+            d = self.getDistanceMatrix()
+            if d[1, 0] < d[0, 1]:
+                tour.reverse()
+        return tour
+
+    def getDistanceMatrix(self):
+        # built once (vectorized) and shared by every stage of a solver.
+        # entry [i, j] is the distance from points[i] to points[j]
+        if self._dist is None:
+            if self.distance_cache_dir is not None:
+                self._dist = diskCachedMatrix(self.points, self.metric, self.dtype,
+                                              self.distance_cache_dir)
+            elif self.cache_distances:
+                self._dist = cachedDistanceMatrix(self.points, self.dtype, self.metric)
+            else:
+                self._dist = self.metric.matrix(self.points, self.dtype)
+        return self._dist
+
+    def pathFromTour(self, tour):
+        # converts a tour of point indices back to the points themselves.
+        # (k, 2) arrays of points give back a (k, 2) array
+        if isinstance(self.points, np.ndarray):
+            return self.points[np.asarray(tour, dtype=np.int64)]
+        return [self.points[i] for i in tour]
+
+    def pointList(self):
+        # the points as a list of (x, y) tuples, for solvers that shuffle or
+        # sort them as a list. list input is returned as is
+        if isinstance(self.points, np.ndarray):
+            return list(map(tuple, self.points.tolist()))
+        return self.points
+
+    def asPath(self, path):
+        # the inverse of pointList: (k, 2) array input gets an array back
+        if isinstance(self.points, np.ndarray):
+            return np.array(path, dtype=self.points.dtype).reshape(-1, 2)
+        return path
+
 
 class HorizontalSortSolver(BaseSolver):
 
@@ -58,8 +190,9 @@ class HorizontalSortSolver(BaseSolver):
         BaseSolver.__init__(self, n, m, points)
 
     def computePath(self):
-        self.points.sort(key=lambda x:x[0])
-        return self.points
+        points = self.pointList()
+        points.sort(key=lambda x:x[0])
+        return self.asPath(points)
 
 
 class VerticalSortSolver(BaseSolver):
@@ -73,8 +206,9 @@ class VerticalSortSolver(BaseSolver):
         BaseSolver.__init__(self, n, m, points)
 
     def computePath(self):
-        self.points.sort(key=lambda x:x[1])
-        return self.points
+        points = self.pointList()
+        points.sort(key=lambda x:x[1])
+        return self.asPath(points)
 
 
 class OriginSortSolver(BaseSolver):
@@ -88,8 +222,61 @@ class OriginSortSolver(BaseSolver):
         BaseSolver.__init__(self, n, m, points)
 
     def computePath(self):
-        self.points.sort(key=lambda x:(x[0]**2 + x[1]**2))
-        return self.points
+        points = self.pointList()
+        points.sort(key=lambda x:(x[0]**2 + x[1]**2))
+        return self.asPath(points)
+
+
+class HilbertCurveSolver(BaseSolver):
+
+    name = "HilbertCurve"
+
+    # approximate (~35-40% longer than optimal on uniform points), but fast:
+    # under a second for a million points, so a good seed for the 
+    # improvement solvers
+    # TC: O(nlogn)
+    #
+    # The n x m grid is covered by a 2**order x 2**order Hilbert curve, and
+    # the points are visited in the order the curve passes through them. 
+    # The curve never jumps, so points close on the curve are close in 
+    # the plane.
+
+    def __init__(self, n, m, points, order=16):
+        BaseSolver.__init__(self, n, m, points)
+        self.order = order
+
+    def curveIndex(self, x, y):
+        return hilbertIndex(x, y, self.order)
+
+    def computeTour(self):
+        # the point indices, in curve order
+        coords = np.asarray(self.points, dtype=np.float64).reshape(-1, 2)
+        if len(coords) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # points off the grid (negative, or past n / m) stretch it
+        lo = min(0., coords.min())
+        side = max(self.n, self.m, coords.max() - lo, 1e-9)
+        cells = 1 << self.order
+        grid = np.minimum(((coords - lo) * (cells / side)).astype(np.int64), cells - 1)
+        
+        return np.argsort(self.curveIndex(grid[:, 0], grid[:, 1]), kind='stable')
+
+    def computePath(self):
+        return self.pathFromTour(self.computeTour().tolist())
+
+
+class MortonCurveSolver(HilbertCurveSolver):
+
+    name = "MortonCurve"
+
+    # same as HilbertCurveSolver, with the Z-order curve (the bits of x and
+    # y interleaved). It jumps between quadrants, so its tours are about 
+    # twice as long as optimal
+    # TC: O(nlogn)
+
+    def curveIndex(self, x, y):
+        return mortonIndex(x, y, self.order)
 
 
 class BruteForceSolver(BaseSolver):
@@ -105,12 +292,12 @@ class BruteForceSolver(BaseSolver):
     def computePath(self):
         
         best = [float('inf'), None]
-        for perm in permutations(self.points):
+        for perm in permutations(self.pointList()):
             perm = list(perm)
-            dist = totalDistance(perm)
+            dist = self.pathCost(perm)
             if dist < best[0]:
                 best = [dist, perm]
-        return best[1]
+        return self.asPath(best[1])
 
 
 class RandomSampleSolver(BaseSolver):
@@ -125,13 +312,21 @@ class RandomSampleSolver(BaseSolver):
         self.samples = samples
 
     def computePath(self):
-        best = [float('inf'), None]
+        return self.computePathWithin(None)
+
+    def iterSolutions(self, time_budget=None):
+        # stops after self.samples samples, or after time_budget seconds
+        deadline = time.time() + (float('inf') if time_budget is None else time_budget)
+        best = float('inf')
+        points = self.pointList()
         for i in range(self.samples):
-            shuffle(self.points)            
-            dist = totalDistance(self.points)
-            if dist < best[0]:
-                best = [dist, deepcopy(self.points)]
-        return best[1]
+            if i and time.time() > deadline:
+                break
+            shuffle(points)            
+            dist = self.pathCost(points)
+            if dist < best:
+                best = dist
+                yield dist, self.asPath(deepcopy(points))
 
 
 class BBSolver(BaseSolver):
@@ -139,44 +334,144 @@ class BBSolver(BaseSolver):
     name = "BranchAndBound"
     
     # exact 
-    # TC: O(N!) (but prunes a lot. do not use past ~30 points)
-
-    def __init__(self, n, m, points):
+    # TC: O(N!) (but prunes a lot. ~35 points take seconds)
+    #
+    # DFS over partial paths, pruned with a lower bound on the rest of the
+    # path: the cheapest edge out of the last city, plus the weight of the
+    # minimum spanning tree over the cities left (any path through them is
+    # a spanning tree). The incumbent starts from a nearest neighbor path
+    # polished with local search, and children are tried nearest first.
+
+    def __init__(self, n, m, points, verbose=False):
         BaseSolver.__init__(self, n, m, points)
+        self.verbose = verbose
+        self.nodes_expanded = 0
+        self.nodes_pruned = 0
 
     def computePath(self):
-        
-        self.best = [float('inf'), None]
-        self.curr = []
-
-        def dfs(last, todo, dist=0):
-
-            # prune if this branch cannot beat an already logged optima            
-            if dist >= self.best[0]:
-                return
+        return self.computePathWithin(None)
 
-            if len(todo) == 0:
-                self.best = [dist, deepcopy(self.curr)]
-                # every time we get here, we have something better :)
-                print(self.best)
-
-            # try all remaining points
-            vals = list(todo)
-            for i in vals:
-                todo.remove(i)
-                self.curr.append(i)
-                dfs(i, todo, dist + distance(self.points[last], self. points[i]))
-                todo.add(i)
-                self.curr.pop()
+    def iterSolutions(self, time_budget=None):
+        
+        # the seeded incumbent comes first, then every better path the DFS 
+        # finds. Once the time budget runs out, the search just unwinds (so
+        # the last path is the best found, not necessarily optimal)
+        t0 = time.time()
+        self.deadline = t0 + (float('inf') if time_budget is None else time_budget)
+        self.timed_out = False
+        
+        k = len(self.points)
+        if k < 3:
+            path = self.pathFromTour(self.shortTour(k))
+            yield self.pathCost(path), path
+            return
 
-        # iterate over all starting points
-        for i in range(len(self.points)):
-            todo = set([j for j in range(len(self.points))])
-            todo.remove(i)
-            self.curr = [i]
-            dfs(i, todo)            
+        d = self.getDistanceMatrix()
+        self.c = d.tolist()
+        
+        # a path is a spanning tree whatever the direction of its edges, so
+        # on asymmetric instances the tree bound uses the cheaper direction
+        self.c_tree = self.c if self.metric.symmetric else np.minimum(d, d.T).tolist()
+        self.order = np.argsort(d, axis=1, kind='stable').tolist()
+        self.mst_weights = {}
+        self.nodes_expanded = 0
+        self.nodes_pruned = 0
+
+        # seed the incumbent, so pruning bites from the very first branch
+        seeder = LocalSearchSolver(self.n, self.m, self.points, 
+            time_budget=min(1., self.deadline - t0)).useMetric(self.metric)
+        tour = seeder.tourFromPath(seeder.computePath())
+        self.best = [pathLength(tour, d), tour]
+        self.log()
+        yield self.best[0], self.pathFromTour(self.best[1])
+        
+        # our paths are open, so the first city is free. Instead of 
+        # restarting the DFS from every city, the search starts from a
+        # virtual city and picks the first real city like any other step.
+        # The first cities are tried in order of their lower bounds
+        everything = (1 << k) - 1
+        firsts = [(self.mstWeight(everything ^ (1 << i)), i) for i in range(k)]
+        firsts.sort()
+        
+        self.curr = []
+        for bound, i in firsts:
+            if bound >= self.best[0]:
+                self.nodes_pruned += 1
+                continue
+            if self.timed_out:
+                break
+            self.curr.append(i)
+            yield from self.dfs(i, everything ^ (1 << i), 0.)
+            self.curr.pop()
+
+        if self.verbose:
+            print("Nodes expanded: {}, nodes pruned: {}{}".format(
+                self.nodes_expanded, self.nodes_pruned, 
+                " (out of time)" if self.timed_out else ""))
+
+    def log(self):
+        if self.verbose:
+            print(self.best)
+
+    def mstWeight(self, todo):
+        # weight of the minimum spanning tree over the cities in bitmask
+        # todo, with Prim's algorithm. memoized, since many branches share
+        # the same set of remaining cities
+        if todo in self.mst_weights:
+            return self.mst_weights[todo]
+
+        # (plain lists beat numpy at these sizes)
+        c = self.c_tree
+        rest = [i for i in range(len(c)) if (todo >> i) & 1]
+        row = c[rest.pop()]
+        keys = [row[j] for j in rest]
+        weight = 0.
+        while(rest):
+            ind = min(range(len(keys)), key=keys.__getitem__)
+            weight += keys[ind]
+            row = c[rest[ind]]
+            rest[ind], keys[ind] = rest[-1], keys[-1]
+            rest.pop()
+            keys.pop()
+            keys = [min(key, row[j]) for key, j in zip(keys, rest)]
+        
+        self.mst_weights[todo] = weight
+        return weight
 
-        return [self.points[i] for i in self.best[1]]
+    def dfs(self, last, todo, dist):
+        
+        # a generator, yielding every better path it finds
+        self.nodes_expanded += 1
+        if self.nodes_expanded & 1023 == 0 and time.time() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return
+        
+        if todo == 0:
+            # every time we get here, we have something better :)
+            self.best = [dist, list(self.curr)]
+            self.log()
+            yield dist, self.pathFromTour(self.curr)
+            return
+
+        # lower bound on the rest of the path
+        c = self.c[last]
+        cheapest = min([c[j] for j in self.order[last] if (todo >> j) & 1][:1])
+        if dist + cheapest + self.mstWeight(todo) >= self.best[0]:
+            self.nodes_pruned += 1
+            return
+
+        # try all remaining points, nearest first
+        for i in self.order[last]:
+            if not (todo >> i) & 1:
+                continue
+            if dist + c[i] >= self.best[0]:
+                # all the others are even further away
+                self.nodes_pruned += 1
+                break
+            self.curr.append(i)
+            yield from self.dfs(i, todo ^ (1 << i), dist + c[i])
+            self.curr.pop()
 
 
 class NearestNeighborSolver(BaseSolver):
@@ -184,30 +479,51 @@ class NearestNeighborSolver(BaseSolver):
     name = "NearestNeighbor"
     
     # approximate
-    # TC: O(N^3) 
+    # TC: O(N^3) with the distance matrix, 
+    #     O(N^2 logN) with the spatial grid (O(NlogN) per start)
+    
+    # past this many points, "auto" switches from the matrix to the grid
+    max_matrix_points = 5000
 
-    def __init__(self, n, m, points):
+    def __init__(self, n, m, points, index="auto", n_starts=None):
         BaseSolver.__init__(self, n, m, points)
+        
+        # index: "matrix" (k x k sorted distance rows), "grid" (SpatialGrid, 
+        #        O(k) memory) or "auto"
+        # n_starts: how many start cities to try. by default, every city 
+        #           with the matrix, and just the first with the grid
+        self.index = index
+        self.n_starts = n_starts
+
+    def getStarts(self, k, default):
+        n_starts = min(k, default if self.n_starts is None else self.n_starts)
+        return [i * k // n_starts for i in range(n_starts)]
 
     def computePath(self):
         
-        seed(0)
-        
-        c = []
         k = len(self.points)
-        for i in range(k):
-            c.append([])
-            for j in range(k):
-                # note: randint here is just used as a tiebreaker in the event that two cities
-                # are equidistant from curr. Without seeding, this would be nondeterministic
-                c[i].append((distance(self.points[i], self.points[j]), randint(1, 100), j)) 
+        index = self.index
+        # the grid only knows euclidean distances
+        if index == "auto":
+            index = "matrix" if k <= self.max_matrix_points or \
+                self.metric is not EUCLIDEAN else "grid"
+        
+        if index == "grid":
+            if self.metric is not EUCLIDEAN:
+                raise ValueError("the grid index needs the euclidean metric")
+            return self.computePathGrid()
+        elif index != "matrix":
+            raise Exception("Unknown nearest neighbor index: {}".format(index))
 
-        for i in range(k):
-            c[i].sort()
+        d = self.getDistanceMatrix()
+
+        # every row sorted by distance. the stable sort breaks ties between
+        # equidistant cities by index, so results are deterministic
+        c = np.argsort(d, axis=1, kind='stable').tolist()
+        d = d.tolist()
 
-        seed(0)
         best = [float('inf'), None]
-        for start in range(k):
+        for start in self.getStarts(k, k):
 
             dist = 0      
             used = set([start])
@@ -216,9 +532,9 @@ class NearestNeighborSolver(BaseSolver):
 
             while(len(used) != k):
 
-                for this_dist, tiebreaker, j in c[curr]:
+                for j in c[curr]:
                     if not j in used:
-                        dist += this_dist
+                        dist += d[curr][j]
                         curr = j
                         break
 
@@ -228,7 +544,94 @@ class NearestNeighborSolver(BaseSolver):
             if dist < best[0]:
                 best = [dist, res]
 
-        return [self.points[i] for i in best[1]]
+        return self.pathFromTour(best[1])
+
+    def computePathGrid(self):
+        
+        # the grid holds the unvisited cities, so "nearest unvisited" is a
+        # single query, and visiting a city just removes it from the grid
+        coords = np.asarray(self.points, dtype=np.float64).reshape(-1, 2)
+        k = len(coords)
+
+        best = [float('inf'), None]
+        for start in self.getStarts(k, 1):
+
+            grid = SpatialGrid(coords)
+            grid.remove(start)
+            
+            dist = 0
+            curr = start
+            res = [start]
+            while(len(grid)):
+                curr, this_dist = grid.nearest(grid.xs[curr], grid.ys[curr])
+                grid.remove(curr)
+                dist += this_dist
+                res.append(curr)
+
+            if dist < best[0]:
+                best = [dist, res]
+
+        return self.pathFromTour(best[1])
+
+
+# arrays in shared memory, attached once per worker process
+_shared_arrays = {}
+
+def attachSharedArray(name, shape, dtype):
+    if not name in _shared_arrays:
+        shm = shared_memory.SharedMemory(name=name)
+        _shared_arrays[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    return _shared_arrays[name][1]
+
+
+def nearestNeighborChunk(d_spec, c_spec, starts):
+    # worker side of NearestNeighborSolverParallel: runs nearest neighbor
+    # from every start of this chunk, and only sends back the best path 
+    d = attachSharedArray(*d_spec)
+    c = attachSharedArray(*c_spec)
+    k = len(d)
+
+    # the nearest few of each row as python lists, they are usually enough
+    head = c[:, :8].tolist()
+
+    best = (float('inf'), None)
+    for start in starts:
+
+        # a bytearray is fast to poke one city at a time, and the numpy
+        # view of it lets us scan a whole row at once
+        used = bytearray(k)
+        used_view = np.frombuffer(used, dtype=bool)
+        used[start] = True
+        curr = start
+        res = [start]
+        for step in range(k - 1):
+            
+            # the nearest few are usually free, otherwise scan the whole row
+            for j in head[curr]:
+                if not used[j]:
+                    break
+            else:
+                row = c[curr]
+                j = int(row[np.argmin(used_view[row])])
+            
+            used[j] = True
+            curr = j
+            res.append(j)
+
+        dist = pathLength(res, d)
+        if dist < best[0]:
+            best = (dist, res)
+
+    return best
+
+
+def releaseSharedResources(executor, shared):
+    if executor:
+        executor.shutdown()
+    for shm in shared:
+        shm.close()
+        shm.unlink()
+    shared.clear()
 
 
 class NearestNeighborSolverParallel(BaseSolver):
@@ -238,59 +641,82 @@ class NearestNeighborSolverParallel(BaseSolver):
     # approximate
     # TC: O(N^3 / p)
     # This algorithm is pleasantly parallel 
-
-    def __init__(self, n, m, points):
+    #
+    # The distance matrix and the sorted neighbor rows are put in shared 
+    # memory once, the workers get chunks of start cities, and only the
+    # best (dist, path) of each chunk comes back. The process pool lives
+    # as long as the solver (or until close()), so repeated computePath
+    # calls reuse it.
+
+    def __init__(self, n, m, points, n_threads=4, chunks_per_thread=4):
         BaseSolver.__init__(self, n, m, points)
-
-    def computeNNPathFromHere(self, start, k, c):
+        self.n_threads = n_threads
+        self.chunks_per_thread = chunks_per_thread
+        self.executor = None
+        self.shared = []
+        self.specs = None
+        self.finalizer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        # shuts the pool down and frees the shared memory
+        if self.finalizer:
+            self.finalizer()
+        self.executor = None
+        self.specs = None
+        self.finalizer = None
+
+    def shareArray(self, arr):
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+        self.shared.append(shm)
+        return (shm.name, arr.shape, arr.dtype.str)
+
+    def setup(self, n_threads):
         
-        dist = 0      
-        used = set([start])
-        curr = start
-        res = [start]
-        while(len(used) != k):
-
-            for this_dist, tiebreaker, j in c[curr]:
-                if not j in used:
-                    dist += this_dist
-                    curr = j
-                    break
+        if self.executor and self.executor._max_workers != n_threads:
+            self.close()
 
-            used.add(curr)
-            res.append(curr)
-    
-        return (dist, res)
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(n_threads, 
+                mp_context=mp.get_context('fork'))
+            self.finalizer = weakref.finalize(self, releaseSharedResources, 
+                self.executor, self.shared)
 
+        if self.specs is None:
+            d = self.getDistanceMatrix()
+            c = np.argsort(d, axis=1, kind='stable').astype(np.int32)
+            self.specs = (self.shareArray(d), self.shareArray(c))
 
-    def computePath(self, n_threads=4):
+    def computePath(self, n_threads=None):
         
-        seed(0)
-        
-        c = []
         k = len(self.points)
-        for i in range(k):
-            c.append([])
-            for j in range(k):
-                # note: randint here is just used as a tiebreaker in the event that two cities
-                # are equidistant from curr. Without seeding, this would be nondeterministic
-                c[i].append((distance(self.points[i], self.points[j]), randint(1, 100), j)) 
+        if k < 3:
+            return self.pathFromTour(range(k))
 
-        for i in range(k):
-            c[i].sort()
+        n_threads = self.n_threads if n_threads is None else n_threads
+        self.setup(n_threads)
 
-        items = [(start, k, c) for start in range(k)]
-        executor = concurrent.futures.ProcessPoolExecutor(n_threads, mp_context=mp.get_context('fork'))
-        futures = [executor.submit(self.computeNNPathFromHere, *item) for item in items]
-        concurrent.futures.wait(futures) 
+        # contiguous chunks of start cities, a few per worker to balance load
+        n_chunks = min(k, n_threads * self.chunks_per_thread)
+        chunks = [range(i * k // n_chunks, (i + 1) * k // n_chunks) 
+                  for i in range(n_chunks)]
+        futures = [self.executor.submit(nearestNeighborChunk, *self.specs, chunk) 
+                   for chunk in chunks]
 
-        # get best result
+        # get best result (chunks in order, so ties resolve like the serial solver)
         best = [float('inf'), None]
         for future in futures:
             dist, res = future.result()
             if dist < best[0]:
                 best = [dist, res]
 
-        return [self.points[i] for i in best[1]]
+        return self.pathFromTour(best[1])
 
 
 class HeldKarpSolver(BaseSolver):
@@ -298,66 +724,64 @@ class HeldKarpSolver(BaseSolver):
     name = "Held-Karp"
     
     # exact 
-    # TC: O(2^nsqrt(n))
+    # TC: O(2^n n^2), memory O(2^n n) (fine up to ~22 points)
 
     def __init__(self, n, m, points):
         BaseSolver.__init__(self, n, m, points)
 
     def computePath(self):
-
-        # NOTE: this algorithm is assuming first postion is starting point
-        # A workaround is required: 
-        # 1) iterate over all points or
-        # 2) add this assumption to other algorithms.
-        for i in range(len(self.points)):
-            points = self.points[i:] + self.points[:i]
-            self.hk(points)
-
-
-    def hk(self, points):
-
-        # TODO not working, circle back to this
-        # .. it's not quite right, and currently does not return path. 
-        # so needs worked up.
-
-        # init the distance matrix
-        k = len(points)
-        c = [[0] * k for i in range(k)]
-        for i in range(k):
+        
+        if len(self.points) < 3:
+            return self.pathFromTour(self.shortTour(len(self.points)))
+        return self.pathFromTour(self.hk(self.getDistanceMatrix()))
+
+
+    def hk(self, d):
+
+        # Our paths are open (see totalDistance), so the DP starts from a
+        # virtual city that is 0 away from all others. This fixes the start
+        # once, instead of rerunning the DP for every rotation, and the 
+        # real path may still begin at any city.
+        #
+        # cost[S][j]  : shortest path visiting exactly the cities in bitmask S,
+        #               ending at city j (j must be in S)
+        # parent[S][j]: the city visited right before j on that path
+        k = len(d)
+        n_sets = 1 << k
+        cities = np.arange(k)
+        cost = np.full((n_sets, k), np.inf, dtype=d.dtype)
+        parent = np.full((n_sets, k), -1, dtype=np.int8)
+        cost[1 << cities, cities] = 0.
+
+        # group the subsets by size, each layer of the DP only reads the last
+        subsets = np.arange(n_sets)
+        sizes = np.zeros(n_sets, dtype=np.int8)
+        for j in range(k):
+            sizes += (subsets >> j) & 1
+        order = np.argsort(sizes, kind='stable')
+        bounds = np.searchsorted(sizes[order], np.arange(k + 2))
+
+        for s in range(2, k + 1):
+            layer = order[bounds[s]:bounds[s+1]]
             for j in range(k):
-                c[i][j] = distance(points[i], points[j])
-
-        g = defaultdict(dict)
-        for i in range(1, k):
-            g[tuple([i])][i] = c[i][0]
-
-        inds = [i for i in range(1, k)]
-        for s in range(2, k):
-            for combo in combinations(inds, s):
-                for k in combo:
-                    best = float('inf')
-                    for m in combo:
-                        if m == k:
-                            continue
-                        
-                        # here I take the set difference, keeping
-                        # in mind that the tuple must be lexographically
-                        # sorted in order for the DP to work correctly
-                        diff = list(set(combo) - set([k]))
-                        diff.sort()
-                        diff = tuple(diff)
-                        
-                        best = min(best, g[diff][m] + c[m][k])
-                    
-                    g[combo][k] = best
+                
+                # all subsets of this size ending at j, vectorized over the 
+                # subsets and over every candidate predecessor i at once
+                S = layer[((layer >> j) & 1) == 1]
+                candidates = cost[S ^ (1 << j)] + d[:, j]
+                best = np.argmin(candidates, axis=1)
+                cost[S, j] = candidates[np.arange(len(S)), best]
+                parent[S, j] = best
+
+        # walk the back pointers from the best end point
+        S = n_sets - 1
+        j = int(np.argmin(cost[S]))
+        path = [j]
+        while(parent[S, j] != -1):
+            S, j = S ^ (1 << j), int(parent[S, j])
+            path.append(j)
         
-        best = float('inf')
-        for i in range(1, k):
-            best = min(best, g[tuple(inds)][i] + c[i][0])
-
-        # whoops, need to return the path associated with best, 
-        # but that info was lost along the way. need to circle back to this
-        return points
+        return path[::-1]
 
 
 class Graph():
@@ -380,20 +804,23 @@ class Graph():
     def addDirectedEdge(self, i, j, c):
         self.edges[i][j] = min(self.edges[i].get(j, float('inf')), c)
 
-    def PrimsMST(self):
+    def PrimsMST(self, profiler=NULL_PROFILER):
         # return the MST using Prim's algorithm
         
         # initialize unconnected graph
         mst = Graph(self.n)
+        pushed = 0
 
         # special heappush for efficiency
         def push(h, node1, active_set):
+            nonlocal pushed
             if node1 in active_set:
                 return
             for node2 in self.edges[node1]:
                 if node2 in active_set:
                     continue
                 heappush(h, (self.edges[node1][node2], node1, node2))            
+                pushed += 1
 
         # all candidate edges, sorted    
         h = []
@@ -421,7 +848,8 @@ class Graph():
             
             # add edge to mst
             mst.addUndirectedEdge(node1, node2, dist)
-                
+        
+        profiler.count("edges pushed", pushed)
         return mst
 
 
@@ -596,9 +1024,10 @@ class MultiGraph():
         return odds
 
  
-    def EulerTour(self):
+    def EulerTour(self, profiler=NULL_PROFILER):
         
         # Fleury's Algorithm ~~
+        bridge_tests = 0
         
         # pick our starting point wisely
         odds = self.getOddVertices()
@@ -609,9 +1038,11 @@ class MultiGraph():
         while(self.edges[start]):
         
             next_edge = None
-            for node2 in self.edges[start]:
+            # (isBridge removes and re-adds edges, so iterate over a copy)
+            for node2 in list(self.edges[start]):
 
                 # if this edge forms a bridge, we must not use it
+                bridge_tests += 1
                 if self.isBridge(start, node2):
                     continue
 
@@ -636,6 +1067,7 @@ class MultiGraph():
             # restart from destination
             start = node2
 
+        profiler.count("bridges tested", bridge_tests)
         return tour 
 
 
@@ -654,109 +1086,197 @@ def shortcutEulerTour(tour):
     return shorted_tour 
  
 
+def denseMST(d, profiler=NULL_PROFILER):
+    # Prim's algorithm straight on a (k, k) distance matrix, O(k^2). For a
+    # complete graph this beats any heap: every step is one argmin plus one
+    # vectorized update of the cheapest connection into the tree.
+    # Returns the k - 1 tree edges as (parent, child) pairs. Profiling
+    # counts the key updates (edges that got a node closer to the tree)
+    k = len(d)
+    edges = []
+    if k < 2:
+        return edges
+
+    in_tree = np.zeros(k, dtype=bool)
+    in_tree[0] = True
+    key = np.array(d[0], dtype=np.float64)
+    key[0] = np.inf
+    parent = np.zeros(k, dtype=np.intp)
+    updates = 0
+    for step in range(k - 1):
+        j = int(np.argmin(key))
+        edges.append((int(parent[j]), j))
+        in_tree[j] = True
+        key[j] = np.inf
+        closer = (d[j] < key) & ~in_tree
+        key[closer] = d[j][closer]
+        parent[closer] = j
+        if profiler.enabled:
+            updates += int(np.count_nonzero(closer))
+    
+    profiler.count("mst key updates", updates)
+    return edges
+
+
+def greedyMatching(d, profiler=NULL_PROFILER):
+    # same idea as Graph.lowCostPerfectMatching: take the cheapest edges 
+    # first, skipping anything already matched. The pairs are sorted once 
+    # with numpy instead of going through a heap.
+    # d: (r, r) distances, r even. Returns r / 2 pairs of indices into d
+    r = len(d)
+    rows, cols = np.triu_indices(r, 1)
+    order = np.argsort(d[rows, cols], kind='stable')
+    rows, cols = rows[order].tolist(), cols[order].tolist()
+    
+    matched = bytearray(r)
+    pairs = []
+    scanned = 0
+    for i, j in zip(rows, cols):
+        scanned += 1
+        if matched[i] or matched[j]:
+            continue
+        matched[i] = matched[j] = True
+        pairs.append((i, j))
+        if 2 * len(pairs) == r:
+            break
+    profiler.count("matching pairs scanned", scanned)
+    return pairs
+
+
+class ArrayMultiGraph():
+
+    # multigraph kept as flat edge arrays plus, for every vertex, the ids
+    # of the edges touching it. Parallel edges are just distinct ids, so 
+    # nothing needs to be merged or counted
+
+    def __init__(self, n):
+        self.n = n
+        self.ends = []
+        self.adj = [[] for i in range(n)]
+
+    def addEdge(self, i, j):
+        # stores i + j, so the other end of an edge seen from i is just a
+        # subtraction away
+        self.adj[i].append(len(self.ends))
+        self.adj[j].append(len(self.ends))
+        self.ends.append(i + j)
+
+    def degrees(self):
+        return [len(edges) for edges in self.adj]
+
+    def EulerTour(self, start=0, profiler=NULL_PROFILER):
+        
+        # Hierholzer's Algorithm ~~ O(E)
+        # walk unused edges until stuck, and back out onto the circuit. 
+        # every edge is looked at a constant number of times
+        used = bytearray(len(self.ends))
+        nxt = [0] * self.n
+        stack = [start]
+        circuit = []
+        while(stack):
+            node = stack[-1]
+            edges = self.adj[node]
+            while(nxt[node] < len(edges) and used[edges[nxt[node]]]):
+                nxt[node] += 1
+            if nxt[node] == len(edges):
+                circuit.append(stack.pop())
+            else:
+                edge = edges[nxt[node]]
+                used[edge] = True
+                stack.append(self.ends[edge] - node)
+
+        profiler.count("euler edges walked", len(circuit) - 1)
+        return circuit[::-1]
+
+
 class ChristofidesAlgorithmSolver(BaseSolver):
     
     name = "ChristofidesAlgorithm"
     
-    # approximate
+    # approximate (1.5 approximation of the cycle with exact matching)
+    # TC: O(N^2) with the greedy matching, O(N^3) with the blossom matching
     
-    def __init__(self, n, m, points):
+    def __init__(self, n, m, points, matching="greedy"):
         BaseSolver.__init__(self, n, m, points)
         
+        # matching: "greedy" (cheapest edges first, fast but approximate) or
+        #           "blossom" (exact, Edmonds' blossom algorithm)
+        assert matching in ["greedy", "blossom"]
+        self.matching = matching
+        
         # needed this for sanity. testing to follow
         self.debug = False
 
     def computePath(self):
         
+        self.requireSymmetric()
         k = len(self.points)
+        if k < 3:
+            return self.pathFromTour(range(k))
        
         if self.debug:
             print("\nPrinting points")
             for i in range(k):
                 print(i, self.points[i])
  
-        # 1) construct complete graph
-        g = Graph(k)
-        for i in range(k):
-            for j in range(i+1, k):
-                g.addUndirectedEdge(i, j, distance(self.points[i], self.points[j]))
+        # every numbered step is a profiling span (see enableProfiling)
+        # 1) the complete graph is just the distance matrix
+        with self.span("1 distance matrix"):
+            d = self.getDistanceMatrix()
 
         # 2) find MSP 
-        mst = g.PrimsMST()
-       
+        with self.span("2 mst"):
+            mst = denseMST(d, self.profiler)
+        
         # 3) find set of verticies, O, with odd degree in mst
-        odds = mst.getOddVertices()
+        with self.span("3 odd vertices"):
+            degrees = np.bincount(np.asarray(mst).ravel(), minlength=k)
+            odds = np.nonzero(degrees % 2)[0]
+        self.count("odd vertices", len(odds))
 
-        # 4) form complete subgraph using nodes in odds
         if self.debug:
             print("\nPrinting mst of completely connected graph")
-            for edge in mst.edges:
-                print(edge, mst.edges[edge])
+            print(mst)
             
             print("\nOdd vertices:")
             print(odds)
 
-        # need some indexing to convert back and form from reduced form to full
-        odds = list(odds)
-        mapper = {ind : val for ind, val in enumerate(odds)}
-        
-        odds_subgraph = Graph(len(mapper))
-        for i in range(len(odds)):
-            for j in range(i+1, len(odds)):
-                odds_subgraph.addUndirectedEdge(i, j, 
-                    distance(self.points[mapper[i]], self.points[mapper[j]])) 
-
+        # 4) form complete subgraph using nodes in odds
         # 5) contruct minimum-weight perfect matching of this subgraph 
-        M = odds_subgraph.lowCostPerfectMatching()
+        with self.span("4-5 matching"):
+            if self.matching == "blossom":
+                matching = minWeightPerfectMatching(d[np.ix_(odds, odds)])
+            else:
+                matching = greedyMatching(d[np.ix_(odds, odds)], self.profiler)
+            matching = [(int(odds[i]), int(odds[j])) for i, j in matching]
 
         if self.debug:
-            print("\nMapping from full to subgraph:")
-            print(mapper)
-
             print("\nPrinting perfect matching:")
-            for edge in M.edges:
-                print(edge, M.edges[edge])
+            print(matching)
 
         # 6) Unite matching and spanning trees (mst U M)
-        united_multigraph = MultiGraph(k, mst)
-        for node1 in mapper:
-            for node2 in M.edges[node1]:
-                # apply symmetry so we don't duplicate
-                if mapper[node1] < mapper[node2]:
-                    united_multigraph.addUndirectedEdge(mapper[node1], 
-                        mapper[node2], M.edges[node1][node2])
-        
-        if self.debug:
-            print("\nPrinting united graph of MST and perfect matching")
-            for edge in mst.edges:
-                print(edge, united_multigraph.edges[edge])
+        with self.span("6 union"):
+            united_multigraph = ArrayMultiGraph(k)
+            for node1, node2 in mst + matching:
+                united_multigraph.addEdge(node1, node2)
  
         # 7) Calculate the Euler tour    
-        Etour = united_multigraph.EulerTour()
+        with self.span("7 euler tour"):
+            circuit = united_multigraph.EulerTour(profiler=self.profiler)
 
         # 8) take out duplicates, shortcut
-        ans = [self.points[ind] for ind in shortcutEulerTour(Etour)]
-
-        # 9) (my addition) return the best cyclic permutation of the tour
-        best = [float("inf"), None]
-        for i in range(len(ans)):
-            this_perm = ans[i:] + ans[:i] 
-            dist = totalDistance(this_perm)
-            if dist < best[0]:
-                best = [dist, this_perm]
-        
-        return best[1]
-
-class TSPGACreature():
-
-    def __init__(self, points):
+        with self.span("8 shortcut"):
+            ans = shortcutEulerTour(zip(circuit, circuit[1:]))
+
+        # 9) (my addition) return the best cyclic permutation of the tour.
+        # the open path of a rotation is the cycle minus one edge, so the 
+        # best rotation starts right after the longest edge of the cycle
+        with self.span("9 best rotation"):
+            ans = np.array(ans)
+            cut = int(np.argmax(d[ans, np.roll(ans, -1)])) + 1
         
-        # random generation of paths
-        self.path = [val for val in range(len(points))]
-        shuffle(self.path)
+        return self.pathFromTour(np.roll(ans, -cut).tolist())
 
-    def getPath(self, points):
-        return [points[i] for i in self.path]
 
 class TSPBaseHeuristic(abc.ABC):
 
@@ -767,83 +1287,1583 @@ class TSPBaseHeuristic(abc.ABC):
     def computeHeuristic(self, path):
         pass
 
+    def computeHeuristics(self, population):
+        # scores a whole (popsize, k) population of tours at once. 
+        # override this with something vectorized where possible
+        return np.array([self.computeHeuristic(tour) for tour in population])
+
 
 class TSPEuclidianDitanceHueristic(TSPBaseHeuristic):        
 
-    def __init__(self):
+    def __init__(self, dist=None):
         TSPBaseHeuristic.__init__(self)
+        self.dist = dist
 
     def computeHeuristic(self, path):
         return totalDistance(path)
 
+    def computeHeuristics(self, population):
+        # every tour of the population at once, straight from the matrix
+        return self.dist[population[:, :-1], population[:, 1:]].sum(axis=1)
+
 
 class TSPGAPopulation():
 
-    def __init__(self, n, m, points, popsize=100, cullrate=.9):
+    # The population is a (popsize, k) array, one permutation of the city 
+    # indices per row, and a generation is a handful of array operations:
+    # 1) score every tour at once against the distance matrix
+    # 2) cull the worst, the rest become parents
+    # 3) the best few (elites) survive unchanged
+    # 4) everybody else is a child of two parents (crossover), and some 
+    #    children mutate
+
+    def __init__(self, n, m, points, popsize=100, cullrate=.9, dist=None, 
+            elite=2, mutation_rate=.3, crossover="OX", seed=0):
         
         # population parameters
         self.n = n
         self.m = m
         self.points = points
-        self.popsize = 100
+        self.popsize = popsize
         self.cullrate = cullrate
-
-        assert self.cullrate <= 1.0 and self.cullrate > 0.
-        self.cull_amount = ceil(self.cullrate * self.popsize)
+        self.elite = elite
+        self.mutation_rate = mutation_rate
+        self.crossover = crossover
+        self.rng = np.random.default_rng(seed)
+
+        assert self.cullrate < 1.0 and self.cullrate >= 0.
+        assert self.crossover in ["OX", "ERX"]
+        assert self.popsize >= 1
+        # at least two parents are left, where there are two
+        self.cull_amount = max(0, min(ceil(self.cullrate * self.popsize), 
+                                      self.popsize - 2))
+        self.elite = min(self.elite, self.popsize - self.cull_amount)
+
+        if dist is None:
+            dist = computeDistanceMatrix(points)
+        self.k = len(dist)
 
         # generate population
-        self.population = []
-        for creature in range(self.popsize):
-            self.population.append(TSPGACreature(points))
+        self.population = self.rng.permuted(
+            np.tile(np.arange(self.k, dtype=np.int32), (self.popsize, 1)), axis=1)
 
         # this could be a parameter..
-        self.heuristic_computer = TSPEuclidianDitanceHueristic()
+        self.heuristic_computer = TSPEuclidianDitanceHueristic(dist)
+        self.fitness = self.heuristic_computer.computeHeuristics(self.population)
+        self.generation = 0
 
 
     def getSortedCreatures(self):
-        
-        heuristics_and_creatures = [
-            (self.heuristic_computer.computeHeuristic(
-            creature.getPath(self.points)), creature) 
-            for creature in self.population
-                                   ]
-        heuristics_and_creatures.sort(key=lambda x : x[0])
-        return heuristics_and_creatures
+        # returns the fitness and the population, best tour first
+        order = np.argsort(self.fitness, kind='stable')
+        return self.fitness[order], self.population[order]
+
+
+    def getTopTour(self):
+        best = np.argmin(self.fitness)
+        return self.fitness[best], self.population[best].tolist()
 
 
     def getTopCreature(self):
-        return self.getSortedCreatures()[-1][1].getPath(self.points)      
+        return [self.points[i] for i in self.getTopTour()[1]]
+
+
+    def receiveMigrants(self, migrants):
+        # migrants from other populations replace our worst tours
+        worst = np.argsort(self.fitness, kind='stable')[::-1][:len(migrants)]
+        self.population[worst] = migrants[:len(worst)]
+        self.fitness[worst] = self.heuristic_computer.computeHeuristics(
+            self.population[worst])
 
     
     def propogate(self):
 
         # 1) get sorted creatures by designated heuristic
-        heuristics_and_creatures = self.getSortedCreatures()
+        fitness, population = self.getSortedCreatures()
 
         # 2) cull the lower ranked creatures of the populations
-        remaining_creatures = [creature for heuristic, creature in 
-                                heuristics_and_creatures[self.cull_amount:]]
+        parents = population[:self.popsize - self.cull_amount]
+
+        # 3) crossing over and mutations 
+        n_children = self.popsize - self.elite
+        moms = parents[self.rng.integers(len(parents), size=n_children)]
+        dads = parents[self.rng.integers(len(parents), size=n_children)]
+        if self.crossover == "OX":
+            children = self.orderCrossover(moms, dads)
+        else:
+            children = np.array([self.edgeRecombination(mom, dad) 
+                for mom, dad in zip(moms, dads)], dtype=np.int32).reshape(n_children, self.k)
+        self.mutate(children)
+
+        # 4) the elites make it to the next generation as they are
+        self.population = np.concatenate([population[:self.elite], children])
+        self.fitness = np.concatenate([fitness[:self.elite],
+                            self.heuristic_computer.computeHeuristics(children)])
+        self.generation += 1
+
+
+    def randomSegments(self, size):
+        # random [i, j) position ranges, one per row
+        i = self.rng.integers(self.k, size=size)
+        j = self.rng.integers(self.k, size=size)
+        return np.minimum(i, j), np.maximum(i, j) + 1
+
+
+    def orderCrossover(self, moms, dads):
+        
+        # OX, for every pair at once: the child keeps a segment of mom in
+        # place, and the other cities follow in dad's order, starting 
+        # right after the segment and wrapping around
+        B, k = moms.shape
+        rows = np.arange(B)[:, None]
+        cols = np.arange(k)[None, :]
+        i, j = self.randomSegments(B)
+        in_segment = (cols >= i[:, None]) & (cols < j[:, None])
+
+        # which cities each child already got from mom
+        taken = np.zeros((B, k), dtype=bool)
+        taken[rows, moms] = in_segment
+
+        # dad's cities and the free positions, both read from j onwards
+        rotated = (cols + j[:, None]) % k
+        from_dad = dads[rows, rotated]
+        keep = ~taken[rows, from_dad]
+        free = ~in_segment[rows, rotated]
+
+        # both masks have k - (j - i) entries per row, and row-major order
+        # lines them up row by row
+        children = np.where(in_segment, moms, 0)
+        children[np.nonzero(free)[0], rotated[free]] = from_dad[keep]
+        return children
+
+
+    def edgeRecombination(self, mom, dad):
+        
+        # ERX: the child walks the union of both parents' edges, always
+        # moving on to the neighbor with the fewest edges left (ties and
+        # dead ends are broken at random)
+        k = self.k
+        edges = [set() for i in range(k)]
+        for parent in [mom.tolist(), dad.tolist()]:
+            for a, b in zip(parent, parent[1:]):
+                edges[a].add(b)
+                edges[b].add(a)
+
+        child = []
+        left = set(range(k))
+        curr = int(mom[0])
+        while(True):
+            child.append(curr)
+            left.discard(curr)
+            if not left:
+                break
+            for node in edges[curr]:
+                edges[node].discard(curr)
+            
+            if edges[curr]:
+                fewest = min([len(edges[node]) for node in edges[curr]])
+                options = [node for node in edges[curr] if len(edges[node]) == fewest]
+            else:
+                options = list(left)
+            curr = options[self.rng.integers(len(options))]
+        
+        return child
 
-        # 3) crossing over and mutations (rather strange in this context)
+
+    def mutate(self, children):
+        
+        # in place: some children get two cities swapped, others a random
+        # segment reversed (inversion)
+        B, k = children.shape
+        mutants = np.nonzero(self.rng.random(B) < self.mutation_rate)[0]
+        inversions = self.rng.random(len(mutants)) < .5
         
+        swaps = mutants[~inversions]
+        a = self.rng.integers(k, size=len(swaps))
+        b = self.rng.integers(k, size=len(swaps))
+        children[swaps, a], children[swaps, b] = children[swaps, b], children[swaps, a]
+
+        inverts = mutants[inversions]
+        i, j = self.randomSegments(len(inverts))
+        cols = np.arange(k)[None, :]
+        inside = (cols >= i[:, None]) & (cols < j[:, None])
+        source = np.where(inside, i[:, None] + j[:, None] - 1 - cols, cols)
+        children[inverts] = children[inverts[:, None], source]
+        
+
+def runIsland(conn, n, m, points, dist, generations, n_migrants, population_kwargs):
+
+    # one island of GenticAlgorithmSolver's island model, in its own process.
+    # after every `generations` generations it reports its best fitness and
+    # its best tours to the solver, and gets back migrants from its 
+    # neighbor, plus whether to keep going
+    population = TSPGAPopulation(n, m, points, dist=dist, **population_kwargs)
+    while(True):
+        for gen in range(generations):
+            population.propogate()
+        
+        fitness, tours = population.getSortedCreatures()
+        conn.send((float(fitness[0]), tours[:n_migrants]))
+        
+        keep_going, migrants = conn.recv()
+        if not keep_going:
+            break
+        population.receiveMigrants(migrants)
+
+    conn.send(population.getTopTour())
+    conn.close()
+
 
 class GenticAlgorithmSolver(BaseSolver):
     
     name = "GenticAlgorithmSolver"
     
     # approximate
+    # TC: O(popsize * N) per generation
+    #
+    # With n_islands > 1, this runs the island model: every island is a 
+    # separate population evolving in its own process, and every 
+    # migration_interval generations the best n_migrants tours of each 
+    # island replace the worst tours of the next island (a ring).
     
-    def __init__(self, n, m, points, max_generations=5):
+    def __init__(self, n, m, points, max_generations=2000, time_budget=30., 
+            patience=300, popsize=100, verbose=False, n_islands=1, 
+            migration_interval=50, n_migrants=2, **population_kwargs):
         BaseSolver.__init__(self, n, m, points)
         
+        # stops after max_generations, after time_budget seconds, or after
+        # patience generations without improving the best tour
         self.max_generations = max_generations
-        self.population = TSPGAPopulation(n, m, points)
+        self.time_budget = time_budget
+        self.patience = patience
+        self.verbose = verbose
+        self.popsize = popsize
+        self.n_islands = n_islands
+        self.migration_interval = migration_interval
+        self.n_migrants = n_migrants
+        self.population_kwargs = population_kwargs
+        self.population = TSPGAPopulation(n, m, points, popsize=popsize, 
+            dist=self.getDistanceMatrix(), **population_kwargs)
+        self.generations_per_second = 0.
+        
+        # island model only: the best fitness of every island, after every
+        # migration (so premature convergence shows up as flat lines)
+        self.island_history = []
+
+    def useMetric(self, metric):
+        # the population scores tours against the distance matrix, so it 
+        # starts over with the new one
+        BaseSolver.useMetric(self, metric)
+        self.population = TSPGAPopulation(self.n, self.m, self.points, 
+            popsize=self.popsize, dist=self.getDistanceMatrix(), 
+            **self.population_kwargs)
+        return self
 
     def computePath(self):
+        return self.computePathWithin(None)
+
+    def iterSolutions(self, time_budget=None):
+        
+        # yields the best tour whenever a generation improves on it. 
+        # time_budget (if given) replaces self.time_budget
+        if time_budget is None:
+            time_budget = self.time_budget
+        if self.n_islands > 1:
+            yield from self.iterSolutionsIslands(time_budget)
+            return
        
+        t0 = time.time()
+        best, tour = self.population.getTopTour()
+        yield float(best), self.pathFromTour(tour)
+        
+        stale = gen = 0
         for gen in range(self.max_generations):
             self.population.propogate()
+            
+            this_best, tour = self.population.getTopTour()
+            stale = 0 if this_best < best else stale + 1
+            if this_best < best:
+                best = this_best
+                yield float(best), self.pathFromTour(tour)
+            if stale >= self.patience or time.time() - t0 > time_budget:
+                break
+
+        total_time = time.time() - t0
+        self.generations_per_second = (gen + 1) / max(total_time, 1e-9)
+        if self.verbose:
+            print("{} generations in {:.2f}s ({:.1f} generations/sec), best {:.2f}".format(
+                gen + 1, total_time, self.generations_per_second, best))
+
+    def iterSolutionsIslands(self, time_budget):
+        
+        t0 = time.time()
+        d = self.getDistanceMatrix()
+        ctx = mp.get_context('fork')
+        
+        # the islands only talk to this process, which routes the migrants
+        # around the ring and decides when everyone stops
+        conns, processes = [], []
+        for island in range(self.n_islands):
+            kwargs = dict(self.population_kwargs, popsize=self.popsize)
+            kwargs['seed'] = kwargs.get('seed', 0) + island
+            conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=runIsland, args=(child_conn, self.n, 
+                self.m, self.points, d, self.migration_interval, self.n_migrants, 
+                kwargs), daemon=True)
+            process.start()
+            conns.append(conn)
+            processes.append(process)
+
+        # if the caller stops iterating early, the islands are killed
+        finished = False
+        try:
+            self.island_history = []
+            best = reported = float('inf')
+            stale = generations = 0
+            while(True):
+                
+                reports = [conn.recv() for conn in conns]
+                generations += self.migration_interval
+                island_bests = [fitness for fitness, migrants in reports]
+                self.island_history.append(island_bests)
+                if self.verbose:
+                    print("Generation {}: island bests {}".format(generations, 
+                        ", ".join(["{:.2f}".format(val) for val in island_bests])))
+
+                stale = 0 if min(island_bests) < best else stale + self.migration_interval
+                keep_going = generations < self.max_generations and \
+                    stale < self.patience and time.time() - t0 < time_budget
+
+                # the migrants are each island's best tours, best first
+                island = int(np.argmin(island_bests))
+                if island_bests[island] < reported and len(reports[island][1]):
+                    reported = island_bests[island]
+                    yield reported, self.pathFromTour(reports[island][1][0].tolist())
+                best = min(best, island_bests[island])
+
+                for island, conn in enumerate(conns):
+                    conn.send((keep_going, reports[island - 1][1]))
+                if not keep_going:
+                    break
+
+            finals = [conn.recv() for conn in conns]
+            for process in processes:
+                process.join()
+            finished = True
+        finally:
+            if not finished:
+                for process in processes:
+                    process.terminate()
+                    process.join()
+
+        total_time = time.time() - t0
+        self.generations_per_second = generations * self.n_islands / max(total_time, 1e-9)
+        if self.verbose:
+            print("{} islands x {} generations in {:.2f}s ({:.1f} generations/sec)".format(
+                self.n_islands, generations, total_time, self.generations_per_second))
+
+        fitness, tour = min(finals, key=lambda x: x[0])
+        if fitness < reported:
+            yield float(fitness), self.pathFromTour(tour)
+
+
+class LocalSearchSolver(BaseSolver):
+
+    name = "LocalSearch"
+
+    # approximate, improves the path of any other solver 
+    # TC: O(N * neighbors) per pass, stops once no move improves the path
+    #     or the time budget runs out
+    #
+    # The base solver builds a path, which is then improved with 2-opt and
+    # Or-opt moves. Only moves towards the nearest neighbors of a city are
+    # tried, and cities whose surroundings did not change are skipped 
+    # ("don't-look bits"). Solvers compose, e.g.:
+    #   LocalSearchSolver(n, m, points, base_solver=ChristofidesAlgorithmSolver)
+
+    # if True, improve() keeps the first and last city of the tour it is
+    # given at the ends (e.g. for pieces of a bigger path)
+    fixed_ends = False
+
+    # set by setup: True on asymmetric instances (see improveCity)
+    directed = False
+
+    def __init__(self, n, m, points, base_solver=NearestNeighborSolver, 
+            time_budget=10., n_neighbors=8, verbose=False):
+        BaseSolver.__init__(self, n, m, points)
+        
+        # either a solver class, or an already constructed solver. the base
+        # solver gets its own copy of the points, since some sort in place
+        if isinstance(base_solver, BaseSolver):
+            self.base_solver = base_solver
+        else:
+            self.base_solver = base_solver(n, m, copyPoints(points))
+        self.name = self.base_solver.name + "+" + LocalSearchSolver.name
+       
+        self.time_budget = time_budget
+        self.n_neighbors = n_neighbors
+        self.verbose = verbose
+        
+        # one entry per pass over the active cities:
+        # (pass, seconds elapsed, path length, improvement over last pass)
+        self.history = []
+
+    def computePath(self):
+        return self.computePathWithin(None)
+
+    def iterSolutions(self, time_budget=None):
+        
+        # the base solver's path first, then the path after every pass that
+        # improved it. time_budget (if given) replaces self.time_budget
+        t0 = time.time()
+        if time_budget is None:
+            time_budget = self.time_budget
+        
+        with self.span("base solver"):
+            path = self.base_solver.computePath()
+        best = self.pathCost(path)
+        yield best, path
+        
+        for length, tour in self.iterImprove(self.tourFromPath(path), t0 + time_budget):
+            if length < best:
+                best = length
+                yield length, self.pathFromTour(tour)
+
+    def enableProfiling(self, profiler=None):
+        # the base solver's phases show up inside the "base solver" span
+        profiler = BaseSolver.enableProfiling(self, profiler)
+        self.base_solver.enableProfiling(profiler)
+        return profiler
+
+    def useMetric(self, metric):
+        # the base solver measures the same way
+        self.base_solver.useMetric(metric)
+        return BaseSolver.useMetric(self, metric)
+
+    def tourFromPath(self, path):
+        # maps the points of a path back to their indices in self.points
+        lookup = defaultdict(list)
+        for ind, point in enumerate(self.pointList()):
+            lookup[tuple(point)].append(ind)
+        if isinstance(path, np.ndarray):
+            path = path.tolist()
+        return [lookup[tuple(point)].pop() for point in path]
+
+    def improve(self, tour, deadline=float('inf')):
+        # returns the improved tour (of point indices)
+        tour = list(tour)
+        for length, tour in self.iterImprove(tour, deadline):
+            pass
+        return tour
+
+    def iterImprove(self, tour, deadline=float('inf')):
+        
+        # a generator, yielding (length, tour) after every pass over the
+        # active cities
+        #
+        # Paths are open, but the moves are much simpler on a cycle. So I
+        # add a virtual city that is 0 away from every other city and close
+        # the tour through it. Cutting the cycle there gives back the path.
+        k = len(tour)
+        if k < 4:
+            return
+        
+        with self.span("setup"):
+            length = self.setup(tour)
+        
+        # don't-look bits: only cities in the queue are searched from
+        queue = deque(self.tour)
+        queued = [True] * (k + 1)
+
+        t0 = time.time()
+        self.history = [(0, 0., length, 0.)]
+        if self.verbose:
+            print("Pass 0: path length {:.2f}".format(length))
+        
+        iteration = 0
+        while(queue and time.time() < deadline):
+            
+            iteration += 1
+            last_length = length
+            moves = 0
+            with self.span("passes"):
+                for step in range(len(queue)):
+                    
+                    if time.time() > deadline:
+                        break
+
+                    a = queue.popleft()
+                    queued[a] = False
+                    
+                    # keep improving around a, and wake up the cities whose
+                    # edges changed along the way
+                    gain, touched = self.improveCity(a)
+                    while(gain > 0):
+                        moves += 1
+                        length -= gain
+                        for node in touched:
+                            if node != a and not queued[node]:
+                                queued[node] = True
+                                queue.append(node)
+                        gain, touched = self.improveCity(a)
+            self.count("improving moves", moves)
+           
+            self.history.append((iteration, time.time() - t0, length, 
+                last_length - length))
+            if self.verbose:
+                print("Pass {}: path length {:.2f}, improved by {:.2f}".format(
+                    iteration, length, last_length - length))
+            yield length, self.cutTour()
+    
+    def setup(self, tour):
+        
+        # builds the distances and candidate lists, and the cycle through 
+        # the virtual city. returns the length of the tour
+        k = len(tour)
+        d = self.getDistanceMatrix()
+        self.dummy = k
+        closed = np.zeros((k + 1, k + 1), dtype=np.float64)
+        closed[:k, :k] = d
+        if self.fixed_ends:
+            # the virtual city is too far from everything but the two ends
+            # for any move to ever connect it to another city
+            closed[k, :k] = closed[:k, k] = 4 * float(d.max()) + 1.
+            closed[k, tour[0]] = closed[tour[0], k] = 0.
+            closed[k, tour[-1]] = closed[tour[-1], k] = 0.
+        self.d = closed.tolist()
+
+        # candidate lists: the nearest cities, plus the virtual city so the
+        # ends of the path may move as well. on asymmetric instances, 
+        # nearest in either direction
+        self.directed = not self.metric.symmetric
+        if self.directed:
+            d = np.minimum(d, d.T)
+        n_neighbors = min(self.n_neighbors, k - 1)
+        neighbors = np.argpartition(d, n_neighbors, axis=1)[:, :n_neighbors + 1]
+        self.neighbors = []
+        for i in range(k):
+            row = [j for j in neighbors[i].tolist() if j != i][:n_neighbors]
+            dists = d[i, row].tolist()
+            row = [row[ind] for ind in sorted(range(len(row)), key=dists.__getitem__)]
+            self.neighbors.append(row + [self.dummy])
+        self.neighbors.append([])
+        
+        self.setTour(tour)
+        return pathLength(self.tour, closed, closed=True)
+
+    def setTour(self, tour):
+        # the cycle through the virtual city, and where each city sits on it
+        self.tour = list(tour) + [self.dummy]
+        self.first = self.tour[0]
+        self.pos = [0] * len(self.tour)
+        for ind, node in enumerate(self.tour):
+            self.pos[node] = ind
+
+    def cutTour(self):
+        # cut the cycle at the virtual city
+        ind = self.pos[self.dummy]
+        path = self.tour[ind+1:] + self.tour[:ind]
+        if self.fixed_ends and path[0] != self.first:
+            path.reverse()
+        return path
+
+    def succ(self, node):
+        return self.tour[(self.pos[node] + 1) % len(self.tour)]
+
+    def pred(self, node):
+        return self.tour[self.pos[node] - 1]
+
+    def reverse(self, i, j):
+        # reverses the tour between positions i and j (inclusive, walking
+        # forward, may wrap around). On a cycle, reversing the complement 
+        # gives the same edges, so I reverse whichever side is shorter. 
+        # Except on asymmetric instances: that also flips the direction the
+        # whole tour is read in
+        N = len(self.tour)
+        length = (j - i) % N + 1
+        if 2 * length > N and not self.directed:
+            i, j = (j + 1) % N, (i - 1) % N
+            length = N - length
+        
+        tour, pos = self.tour, self.pos
+        if i <= j and length:
+            # no wrap around, so the list does the reversing for us
+            tour[i:j+1] = tour[j:i-1 if i else None:-1]
+            for ind in range(i, j + 1):
+                pos[tour[ind]] = ind
+            return
+        
+        for step in range(length // 2):
+            tour[i], tour[j] = tour[j], tour[i]
+            pos[tour[i]] = i
+            pos[tour[j]] = j
+            i = (i + 1) % N
+            j = (j - 1) % N
+
+    def move2Opt(self, a, b, c, d):
+        # replaces edges (a, b) and (c, d) with (a, c) and (b, d), where
+        # a -> b ... c -> d are in the same direction around the cycle
+        if self.succ(a) == b:
+            self.reverse(self.pos[b], self.pos[c])
+        else:
+            self.reverse(self.pos[c], self.pos[b])
+
+    def improveCity(self, a, eps=1e-9):
+        
+        # returns the gain of the first improving move found around a, and
+        # the cities whose edges that move changed.
+        #
+        # On asymmetric instances only moves that keep the direction of 
+        # every edge are made: Or-opt without reversing the segment. (2-opt
+        # reverses a whole stretch of the path, whose length then changes.)
+        # The candidate lists are no longer sorted by the distance used in
+        # the gain, so they are scanned to the end
+        d = self.d
+        directed = self.directed
+        
+        # 2-opt, for both tour neighbors of a
+        for succ in ([] if directed else [self.succ, self.pred]):
+            b = succ(a)
+            for c in self.neighbors[a]:
+                g1 = d[a][b] - d[a][c]
+                if g1 <= eps:
+                    break
+                e = succ(c)
+                if c == b or e == a:
+                    continue
+                gain = g1 + d[c][e] - d[b][e]
+                if gain > eps:
+                    self.move2Opt(a, b, c, e)
+                    return gain, (a, b, c, e)
+
+        # Or-opt, move a segment of 1 to 3 cities starting at a elsewhere
+        s = e = a
+        for seg_len in range(1, 4):
+            if seg_len > 1:
+                e = self.succ(e)
+            p, nx = self.pred(s), self.succ(e)
+            if e == self.pred(p) or nx == p:
+                break
+            
+            segment = set(self.tour[(self.pos[s] + i) % len(self.tour)] 
+                          for i in range(seg_len))
+            removal = d[p][s] + d[e][nx] - d[p][nx]
+            for c in self.neighbors[s]:
+                if d[s][c] >= removal and not directed:
+                    break
+                if c in segment:
+                    continue
+
+                for x, y in [(c, self.succ(c)), (self.pred(c), c)]:
+                    if x in segment or y in segment:
+                        continue
+                    forward = d[x][s] + d[e][y] - d[x][y]
+                    backward = float('inf') if directed else d[x][e] + d[s][y] - d[x][y]
+                    gain = removal - min(forward, backward)
+                    if gain > eps:
+                        self.moveOrOpt(p, s, e, nx, x, y, forward <= backward)
+                        return gain, (p, s, e, nx, x, y)
+
+        return 0, ()
+
+    def moveOrOpt(self, p, s, e, nx, x, y, keep_direction):
+        # moves the segment s..e (between p and nx) in between x and y, as a
+        # sequence of 2-opt moves. y must follow x in the direction of p -> s
+        self.move2Opt(p, s, x, y)     # p x .. nx e .. s y
+        self.move2Opt(p, x, nx, e)    # p nx .. x e .. s y
+        if keep_direction:
+            self.move2Opt(x, e, s, y) # p nx .. x s .. e y
+
+
+class LinKernighanSolver(LocalSearchSolver):
+
+    name = "LinKernighan"
+
+    # approximate, improves the path of any other solver
+    # TC: O(N * neighbors^2) per pass
+    #
+    # Lin-Kernighan moves, cut off at depth 3 (the "Or-3opt" variant). 
+    # From a city t1, drop one of its tour edges (t1, t2), add an edge from
+    # t2 to a nearby city t3 and drop one of t3's edges (t3, t4). Then 
+    # either close the tour with (t4, t1) (a 2-opt move), or add an edge 
+    # from t4 to a nearby t5, drop (t5, t6) and close with (t6, t1). This
+    # covers 2-opt, Or-opt (moving a segment, reversed or not) and all the 
+    # sequential 3-opt moves, and only chains whose partial gain stays 
+    # positive are followed, so every search is short.
+    #
+    # Unlike LocalSearchSolver there is no distance matrix: distances are
+    # computed from the coordinates when needed, and the candidate lists 
+    # come from a spatial grid, so this runs on 10k+ points.
+    #
+    # Once no move improves the tour, the rest of the time budget goes to
+    # kicks (iterated local search): swap two short neighboring segments 
+    # of the tour (a "double bridge", which the moves above can't undo), 
+    # re-optimize around it, and keep the result only if it is shorter.
+
+    def __init__(self, n, m, points, base_solver=NearestNeighborSolver, 
+            time_budget=60., n_neighbors=8, verbose=False, n_kicks=None, 
+            max_segment=50, seed=0):
+        LocalSearchSolver.__init__(self, n, m, points, base_solver, 
+            time_budget, n_neighbors, verbose)
+        self.name = self.base_solver.name + "+" + LinKernighanSolver.name
+        
+        # kicks to try (one per city by default, 0 for none), and the 
+        # longest segment a kick moves
+        self.n_kicks = len(points) if n_kicks is None else n_kicks
+        self.max_segment = max_segment
+        self.seed = seed
+        
+        # while kicking, every reversal is logged so a bad kick can be undone
+        self.journal = None
+
+    def iterImprove(self, tour, deadline=float('inf')):
+        
+        # Or-3opt passes until nothing improves, then rounds of (up to) one
+        # kick per city. yields after every pass or round that improved
+        length = None
+        for length, tour in LocalSearchSolver.iterImprove(self, tour, deadline):
+            yield length, tour
+        if length is None:
+            return
+        
+        rng = Random(self.seed)
+        k = len(self.tour)
+        t0 = time.time() - self.history[-1][1]
+        kicks = 0
+        while(kicks < self.n_kicks and time.time() < deadline):
+            
+            last_length = length
+            tried, kept = kicks, 0
+            with self.span("kicks"):
+                for step in range(min(k, self.n_kicks - kicks)):
+                    if time.time() > deadline:
+                        break
+                    kicks += 1
+                    
+                    self.journal = []
+                    delta, touched = self.kick(rng)
+                    gain = self.reoptimize(touched, deadline) - delta
+                    if gain > 1e-9:
+                        length -= gain
+                        kept += 1
+                    else:
+                        self.undo()
+            self.journal = None
+            self.count("kicks tried", kicks - tried)
+            self.count("kicks kept", kept)
+            
+            self.history.append((len(self.history), time.time() - t0, length, 
+                last_length - length))
+            if self.verbose:
+                print("Kicks {}: path length {:.2f}, improved by {:.2f}".format(
+                    kicks, length, last_length - length))
+            if length < last_length:
+                yield length, self.cutTour()
+
+    def kick(self, rng):
+        
+        # t1 [t2 .. t5] [t6 .. t3] t4  ->  t1 [t6 .. t3] [t2 .. t5] t4
+        # returns how much longer the tour got, and the cities touched
+        tour, N = self.tour, len(self.tour)
+        max_segment = max(1, min(self.max_segment, (N - 2) // 2))
+        p1 = rng.randrange(N)
+        p2 = p1 + rng.randint(1, max_segment)
+        p3 = p2 + rng.randint(1, max_segment)
+        t1, t2 = tour[p1], tour[(p1 + 1) % N]
+        t5, t6 = tour[p2 % N], tour[(p2 + 1) % N]
+        t3, t4 = tour[p3 % N], tour[(p3 + 1) % N]
+        
+        dist = self.dist
+        delta = dist(t1, t6) + dist(t3, t2) + dist(t5, t4) - \
+                dist(t1, t2) - dist(t5, t6) - dist(t3, t4)
+        self.move2Opt(t1, t2, t3, t4)
+        self.move2Opt(t1, t3, t6, t5)
+        self.move2Opt(t3, t5, t2, t4)
+        return delta, (t1, t2, t3, t4, t5, t6)
+
+    def reoptimize(self, cities, deadline):
+        # improves around the given cities (and whatever that touches) until
+        # nothing improves, returns the total gain
+        queue = deque(cities)
+        queued = set(cities)
+        total = 0.
+        while(queue and time.time() < deadline):
+            a = queue.popleft()
+            queued.discard(a)
+            gain, touched = self.improveCity(a)
+            while(gain > 0):
+                total += gain
+                for node in touched:
+                    if node != a and node not in queued:
+                        queued.add(node)
+                        queue.append(node)
+                gain, touched = self.improveCity(a)
+        return total
+
+    def reverse(self, i, j):
+        if self.journal is not None:
+            self.journal.append((i, j))
+        LocalSearchSolver.reverse(self, i, j)
+
+    def undo(self):
+        # reversing the same positions again restores them, so the logged
+        # reversals are undone in the opposite order
+        for i, j in reversed(self.journal):
+            LocalSearchSolver.reverse(self, i, j)
+        self.journal = []
+
+    def setup(self, tour):
+        
+        # the moves (and the kicks) assume d[i][j] == d[j][i]. Other metrics
+        # than euclidean work, but the candidates still come from the 
+        # (euclidean) spatial grid, so they should be close to euclidean
+        self.requireSymmetric()
+        k = len(tour)
+        coords = np.asarray(self.points, dtype=np.float64).reshape(-1, 2)
+        xs, ys = coords[:, 0].tolist(), coords[:, 1].tolist()
+        self.dummy = dummy = k
+        measure = None if self.metric is EUCLIDEAN else self.metric.scalar()
+        
+        # see LocalSearchSolver.fixed_ends
+        ends = set([tour[0], tour[-1]]) if self.fixed_ends else None
+        far = 4 * self.metric.bound(coords) + 1.
+
+        def dist(a, b):
+            if a == dummy or b == dummy:
+                if ends is None or a in ends or b in ends:
+                    return 0.
+                return far
+            if measure is not None:
+                return measure(xs[a], ys[a], xs[b], ys[b])
+            return hypot(xs[a] - xs[b], ys[a] - ys[b])
+        self.dist = dist
+
+        # candidate lists of (city, distance), nearest first, plus the 
+        # virtual city so the ends of the path may move as well
+        self.neighbors = []
+        for i, row in enumerate(nearestNeighborLists(coords, min(self.n_neighbors, k - 1))):
+            row = [(j, dist(i, j)) for j in row]
+            if measure is not None:
+                # improveCity stops at the first candidate that is too far
+                row.sort(key=lambda pair: pair[1])
+            self.neighbors.append(row + [(dummy, dist(i, dummy))])
+        self.neighbors.append([])
+
+        self.setTour(tour)
+        return sum([dist(a, b) for a, b in zip(self.tour, self.tour[1:])])
+
+    def improveCity(self, t1, eps=1e-9):
+
+        # returns the gain of the first improving move found from t1, and
+        # the cities whose edges that move changed
+        dist, pos, N = self.dist, self.pos, len(self.tour)
+        
+        # both tour neighbors of t1 may play t2. nxt walks away from t1
+        # through t2, and between(a, b, c) is True if b is met on the way
+        # from a to c in that direction
+        for step in [1, -1]:
+            nxt, prv = (self.succ, self.pred) if step == 1 else (self.pred, self.succ)
+            between = lambda a, b, c: \
+                (step * (pos[b] - pos[a])) % N <= (step * (pos[c] - pos[a])) % N
+            
+            t2 = nxt(t1)
+            g0 = dist(t1, t2)
+            for t3, d23 in self.neighbors[t2]:
+                g1 = g0 - d23
+                if g1 <= eps:
+                    break
+                if t3 == t1 or t3 == nxt(t2):
+                    continue
+                
+                # dropping (t3, prv(t3)) lets the tour close right away,
+                # dropping (t3, nxt(t3)) needs the third exchange to
+                for t4, closes in [(prv(t3), True), (nxt(t3), False)]:
+                    if t4 == t1:
+                        continue
+                    g2 = g1 + dist(t3, t4)
+                    if closes:
+                        gain = g2 - dist(t4, t1)
+                        if gain > eps:
+                            self.move2Opt(t1, t2, t4, t3)
+                            return gain, (t1, t2, t3, t4)
+
+                    for t5, d45 in self.neighbors[t4]:
+                        g3 = g2 - d45
+                        if g3 <= eps:
+                            break
+                        if t5 == t1 or t5 == t3:
+                            continue
+
+                        if closes:
+                            # t6 is the neighbor of t5 on t4's side of it
+                            t6 = nxt(t5) if between(t2, t5, t4) else prv(t5)
+                            if t6 == t4:
+                                continue
+                            t6s = [t6]
+                        else:
+                            # t5 must break up the cycle t2 .. t3
+                            if not between(t2, t5, t3):
+                                continue
+                            t6s = [nxt(t5)] if t5 == t2 else [prv(t5)] if t5 == t3 \
+                                else [nxt(t5), prv(t5)]
+
+                        for t6 in t6s:
+                            gain = g3 + dist(t5, t6) - dist(t6, t1)
+                            if gain <= eps:
+                                continue
+                            
+                            if closes:
+                                self.move2Opt(t1, t2, t4, t3)
+                                self.move2Opt(t1, t4, t6, t5)
+                            elif t6 == prv(t5):
+                                # t1 [t2 .. t6] [t5 .. t3] t4, both reversed
+                                self.move2Opt(t1, t2, t6, t5)
+                                self.move2Opt(t2, t5, t3, t4)
+                            else:
+                                # t1 [t2 .. t5] [t6 .. t3] t4, swapped
+                                self.move2Opt(t1, t2, t3, t4)
+                                self.move2Opt(t1, t3, t6, t5)
+                                self.move2Opt(t3, t5, t2, t4)
+                            return gain, (t1, t2, t3, t4, t5, t6)
+
+        return 0, ()
+
+
+def annealStart(solver, tour, start_seed, deadline):
+    # one start of SimulatedAnnealingSolver, in its own process. returns
+    # (length, tour, moves tried, seconds)
+    t0 = time.time()
+    length, best = None, list(tour)
+    for length, best in solver.iterAnneal(tour, Random(start_seed), deadline):
+        pass
+    return length, best, solver.n_moves, time.time() - t0
+
+
+class SimulatedAnnealingSolver(LocalSearchSolver):
+
+    name = "SimulatedAnnealing"
+
+    # approximate, improves the path of any other solver
+    # TC: O(max_moves) move evaluations per start, plus O(N) per accepted
+    #     2-opt move (the reversal)
+    #
+    # Random moves towards the nearest neighbors of a random city: a 2-opt
+    # move (add the edge to the neighbor) or a swap of the two cities. Each
+    # move's change in length is O(1) from the distance matrix, and a move
+    # is taken if it makes the path shorter, or with probability 
+    # exp(-delta / T) if it makes it longer. The temperature T falls from
+    # t_start to t_end along the cooling schedule, in epochs of 
+    # epoch_length moves at a fixed temperature.
+    #
+    # The move budget is split into n_reheats + 1 cooling cycles. Every 
+    # cycle after the first restarts from the best path so far, at 
+    # reheat_factor times the last cycle's starting temperature.
+    #
+    # The best path is finally polished with LocalSearchSolver's moves.
+    #
+    # n_starts independent runs (with different seeds) are spread over 
+    # n_workers processes, and the best path wins. self.n_moves and 
+    # self.moves_per_second count the moves tried over all starts.
+
+    cooling_schedules = {
+        "geometric": lambda t_start, t_end, frac: t_start * (t_end / t_start) ** frac,
+        "linear": lambda t_start, t_end, frac: t_start + (t_end - t_start) * frac,
+        "cosine": lambda t_start, t_end, frac: t_end + (t_start - t_end) * (1 + cos(pi * frac)) / 2,
+    }
+
+    def __init__(self, n, m, points, base_solver=NearestNeighborSolver, 
+            time_budget=60., n_neighbors=8, verbose=False, max_moves=None, 
+            t_start=None, t_end=None, cooling="geometric", epoch_length=None, 
+            swap_rate=.1, n_reheats=2, reheat_factor=.3, n_starts=1, 
+            n_workers=1, seed=0):
+        LocalSearchSolver.__init__(self, n, m, points, base_solver, 
+            time_budget, n_neighbors, verbose)
+        self.name = self.base_solver.name + "+" + SimulatedAnnealingSolver.name
+        
+        # max_moves: moves tried per start (2000 per city by default). the 
+        #            time budget is shared by the starts a worker runs
+        # t_start / t_end: temperatures, by default t_start accepts the
+        #                  average uphill move with probability 1/2, and 
+        #                  t_end is 1000 times colder
+        # cooling: a name from cooling_schedules, or any function 
+        #          (t_start, t_end, fraction of the cycle done) -> T
+        # epoch_length: moves per temperature (10 per city by default)
+        # swap_rate: fraction of the moves that are swaps instead of 2-opt
+        self.max_moves = 2000 * len(points) if max_moves is None else max_moves
+        self.t_start = t_start
+        self.t_end = t_end
+        self.cooling = self.cooling_schedules.get(cooling, cooling)
+        self.epoch_length = epoch_length
+        self.swap_rate = swap_rate
+        self.n_reheats = n_reheats
+        self.reheat_factor = reheat_factor
+        self.n_starts = n_starts
+        self.n_workers = n_workers
+        self.seed = seed
+        assert callable(self.cooling), "Unknown cooling schedule: {}".format(cooling)
+
+        # one entry per start: (start, path length, moves tried, seconds).
+        # self.history has one entry per cooling cycle of the last start
+        # that ran in this process: (cycle, seconds, best length, moves)
+        self.starts = []
+        self.history = []
+        self.n_moves = 0
+        self.moves_per_second = 0.
+
+    def __getstate__(self):
+        # what a worker process needs: the settings and the points. it 
+        # builds its own distances, and the cooling schedule may be a lambda
+        state = self.__dict__.copy()
+        for key in ['base_solver', '_dist', 'd', 'neighbors', 'tour', 'pos']:
+            state.pop(key, None)
+        for name, schedule in self.cooling_schedules.items():
+            if state['cooling'] is schedule:
+                state['cooling'] = name
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cooling = self.cooling_schedules.get(self.cooling, self.cooling)
+        self._dist = None
+
+    def iterSolutions(self, time_budget=None):
+        
+        # the base solver's path first, then every start that beat it
+        t0 = time.time()
+        if time_budget is None:
+            time_budget = self.time_budget
+        
+        with self.span("base solver"):
+            path = self.base_solver.computePath()
+        best = self.pathCost(path)
+        yield best, path
+        
+        tour = self.tourFromPath(path)
+        seeds = [self.seed + start for start in range(self.n_starts)]
+        n_workers = min(self.n_workers, self.n_starts)
+        rounds = int(ceil(self.n_starts / n_workers))
+        self.starts = []
+        n_moves = 0
+        
+        def record(start, result):
+            # moves_per_second is the throughput of all the workers together
+            nonlocal n_moves
+            length, tour, moves, seconds = result
+            n_moves += moves
+            self.count("moves tried", moves)
+            self.starts.append((start, length, moves, seconds))
+            self.n_moves = n_moves
+            self.moves_per_second = n_moves / max(time.time() - t0, 1e-9)
+            if self.verbose:
+                print("Start {}: path length {:.2f}, {:.0f} moves/s".format(
+                    start, best if length is None else length, 
+                    moves / max(seconds, 1e-9)))
+
+        if n_workers <= 1:
+            for start, start_seed in enumerate(seeds):
+                deadline = t0 + time_budget * (start + 1) / self.n_starts
+                result = annealStart(self, tour, start_seed, deadline)
+                record(start, result)
+                if result[0] is not None and result[0] < best:
+                    best = result[0]
+                    yield best, self.pathFromTour(result[1])
+            return
+
+        # every worker runs `rounds` starts, one after the other
+        executor = concurrent.futures.ProcessPoolExecutor(n_workers, 
+            mp_context=mp.get_context('fork'))
+        try:
+            futures = {}
+            for start, start_seed in enumerate(seeds):
+                deadline = t0 + time_budget * (start // n_workers + 1) / rounds
+                future = executor.submit(annealStart, self, tour, start_seed, deadline)
+                futures[future] = start
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                record(futures[future], result)
+                if result[0] is not None and result[0] < best:
+                    best = result[0]
+                    yield best, self.pathFromTour(result[1])
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def iterImprove(self, tour, deadline=float('inf')):
+        # a single start, so improve() (and fixed_ends) work as usual
+        return self.iterAnneal(tour, Random(self.seed), deadline)
+
+    def setup(self, tour):
+        # 2-opt moves on asymmetric instances would need the cost of every
+        # reversed stretch, not O(1) deltas
+        self.requireSymmetric()
+        length = LocalSearchSolver.setup(self, tour)
+        if self.fixed_ends:
+            # LocalSearchSolver only needs the virtual city to be too far
+            # for an improving move. Here even uphill moves must never 
+            # connect it, so it is infinitely far
+            ends = (tour[0], tour[-1])
+            row = self.d[self.dummy]
+            for j in range(len(tour)):
+                if j not in ends:
+                    row[j] = self.d[j][self.dummy] = float('inf')
+        return length
+
+    def initialTemperature(self, rng, samples=1000):
+        # the temperature that accepts the average uphill 2-opt move (from
+        # the starting path) with probability 1/2
+        d, tour, pos, neighbors = self.d, self.tour, self.pos, self.neighbors
+        N = len(tour)
+        uphill = []
+        for step in range(samples):
+            i = rng.randrange(N)
+            a, b = tour[i], tour[(i + 1) % N]
+            if not neighbors[a]:
+                continue
+            c = rng.choice(neighbors[a])
+            e = tour[(pos[c] + 1) % N]
+            delta = d[a][c] + d[b][e] - d[a][b] - d[c][e]
+            if 0 < delta < float('inf'):
+                uphill.append(delta)
+        return sum(uphill) / len(uphill) / log(2) if uphill else 1.
+
+    def iterAnneal(self, tour, rng, deadline=float('inf')):
+        
+        # a generator, yielding (length, tour) at the end of every epoch
+        # that found a new best path. self.n_moves counts the moves tried
+        self.n_moves = 0
+        k = len(tour)
+        if k < 4:
+            return
+        
+        t0 = time.time()
+        with self.span("setup"):
+            length = self.setup(tour)
+        best_length, best_tour = length, self.cutTour()
+
+        t_start = self.t_start or self.initialTemperature(rng)
+        t_end = self.t_end or t_start / 1000.
+        epoch_length = self.epoch_length or 10 * k
+        n_cycles = self.n_reheats + 1
+        cycle_moves = self.max_moves / n_cycles
+        cycle_time = (deadline - t0) / n_cycles
+
+        d, neighbors = self.d, self.neighbors
+        N = k + 1
+        random = rng.random
+        reverse = self.reverse
+        swap_rate = self.swap_rate
+        self.history = []
+        
+        moves = 0
+        for cycle in range(n_cycles):
+            
+            if cycle:
+                self.setTour(best_tour)
+                length = best_length
+            tour, pos = self.tour, self.pos
+            hot = t_start * self.reheat_factor ** cycle
+            cycle_start, cycle_t0 = moves, time.time()
+            
+            while(True):
+                frac = max((moves - cycle_start) / cycle_moves, 
+                           (time.time() - cycle_t0) / cycle_time)
+                if frac >= 1 or time.time() > deadline:
+                    break
+                T = self.cooling(hot, t_end, frac)
+                
+                with self.span("anneal"):
+                    for step in range(epoch_length):
+                    
+                        i = int(random() * N)
+                        a = tour[i]
+                        row = neighbors[a]
+                        if not row:
+                            continue
+                        c = row[int(random() * len(row))]
+                    
+                        if random() < swap_rate:
+                            # swap a and c
+                            j = pos[c]
+                            pa, na = tour[i - 1], tour[i + 1 if i + 1 < N else 0]
+                            pc, nc = tour[j - 1], tour[j + 1 if j + 1 < N else 0]
+                            if na == c:
+                                delta = d[pa][c] + d[a][nc] - d[pa][a] - d[c][nc]
+                            elif nc == a:
+                                delta = d[pc][a] + d[c][na] - d[pc][c] - d[a][na]
+                            else:
+                                delta = d[pa][c] + d[c][na] + d[pc][a] + d[a][nc] - \
+                                        d[pa][a] - d[a][na] - d[pc][c] - d[c][nc]
+                            if delta <= 0 or random() < exp(-delta / T):
+                                tour[i], tour[j] = c, a
+                                pos[a], pos[c] = j, i
+                                length += delta
+                        else:
+                            # 2-opt, replace (a, b) and (c, e) with (a, c) and (b, e)
+                            b = tour[i + 1 if i + 1 < N else 0]
+                            j = pos[c]
+                            e = tour[j + 1 if j + 1 < N else 0]
+                            if c == b or e == a:
+                                continue
+                            delta = d[a][c] + d[b][e] - d[a][b] - d[c][e]
+                            if delta <= 0 or random() < exp(-delta / T):
+                                reverse(pos[b], j)
+                                length += delta
+
+                moves += epoch_length
+                self.n_moves = moves
+                if length < best_length - 1e-9:
+                    best_length, best_tour = length, self.cutTour()
+                    yield best_length, best_tour
+            
+            self.history.append((cycle, time.time() - t0, best_length, moves))
+            if self.verbose:
+                print("Cycle {}: path length {:.2f}, {} moves".format(
+                    cycle, best_length, moves))
+
+        # finally a quench: plain local search from the best path, since 
+        # the last random moves rarely leave it exactly at a local optimum
+        cycles = self.history
+        for length, tour in LocalSearchSolver.iterImprove(self, best_tour, deadline):
+            if length < best_length - 1e-9:
+                best_length, best_tour = length, tour
+                yield best_length, best_tour
+        self.history = cycles
+
+
+def solveSubpath(n, m, points, first, last, solver_class, solver_kwargs, 
+        metric=EUCLIDEAN, tour=None):
+
+    # one piece of ClusterSolver's path, in its own process: a path through
+    # points (a (k, 2) array) from points[first] to points[last], as point
+    # indices. Without a tour to start from, the base solver makes one
+    solver = solver_class(n, m, points, **solver_kwargs).useMetric(metric)
+    if tour is None:
+        tour = solver.tourFromPath(solver.base_solver.computePath())
+        if first != last:
+            tour = [first] + [i for i in tour if i != first and i != last] + [last]
+    solver.fixed_ends = True
+    return solver.improve(tour, time.time() + solver.time_budget)
+
+
+class ClusterSolver(BaseSolver):
+
+    name = "Cluster"
+
+    # approximate, divide and conquer for huge instances
+    # TC: O(N * N / cluster_size) for the clustering, plus the cluster 
+    #     solver on every cluster, spread over n_workers processes
+    #
+    # 1) k-means splits the points into clusters of ~cluster_size points
+    # 2) a path through the cluster centers decides the order of the clusters
+    # 3) consecutive clusters are joined at their (roughly) closest pair of
+    #    points, which fixes where the path enters and leaves each cluster
+    # 4) every cluster is solved as a path from its entry to its exit, by
+    #    cluster_solver (any LocalSearchSolver), in a process pool
+    # 5) boundary repair: the last / first `window` points on both sides of
+    #    every join are re-optimized together (in the pool again), which 
+    #    fixes the detours that forced entries and exits cause
+    # 6) with repair=True, one LinKernighan pass without kicks over the
+    #    whole stitched path. everything but the joins is already locally
+    #    optimal, so this is cheap (~1s per 10k points) and it removes
+    #    what the windows can't see, e.g. clusters that touch without
+    #    being consecutive
+    #
+    # The clusters, their order and the portals are always euclidean (they
+    # only have to be good guesses), the solves and repairs use the metric
+
+    def __init__(self, n, m, points, cluster_size=1000, n_workers=None, 
+            window=50, repair=True, cluster_solver=LinKernighanSolver, 
+            verbose=False, **solver_kwargs):
+        BaseSolver.__init__(self, n, m, points)
+        self.cluster_size = cluster_size
+        self.n_workers = os.cpu_count() if n_workers is None else n_workers
+        self.window = window
+        self.repair = repair
+        self.cluster_solver = cluster_solver
+        
+        # the kicks make up for a bad start, and NearestNeighbor's O(N^3) 
+        # all-starts search would cost more than the cluster solve itself
+        self.solver_kwargs = dict(solver_kwargs)
+        self.solver_kwargs.setdefault('base_solver', HilbertCurveSolver)
+        self.verbose = verbose
+        assert issubclass(cluster_solver, LocalSearchSolver)
 
-        return self.population.getTopCreature()
+    def log(self, msg, t0):
+        if self.verbose:
+            print("{:.2f}s: {}".format(time.time() - t0, msg))
 
+    def computePath(self):
+        
+        t0 = time.time()
+        self.requireSymmetric()
+        coords = np.asarray(self.points, dtype=np.float64).reshape(-1, 2)
+        k = len(coords)
+        
+        # 1) clusters, as arrays of point indices
+        with self.span("1 k-means"):
+            labels, centers = kMeans(coords, int(ceil(k / self.cluster_size)))
+        if len(centers) < 2:
+            solver = self.cluster_solver(self.n, self.m, self.points, **self.solver_kwargs)
+            solver.useMetric(self.metric).enableProfiling(self.profiler)
+            return solver.computePath()
+        by_label = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[by_label], np.arange(len(centers) + 1))
+        clusters = [by_label[bounds[c]:bounds[c+1]] for c in range(len(centers))]
+        self.count("clusters", len(clusters))
+        self.log("{} clusters".format(len(clusters)), t0)
+
+        # 2) the order of the clusters
+        with self.span("2 cluster order"):
+            if len(centers) > 3:
+                order = LocalSearchSolver(self.n, self.m, centers)
+                clusters = [clusters[c] for c in order.tourFromPath(order.computePath())]
+        
+        # 3) where the path enters and leaves each cluster
+        with self.span("3 portals"):
+            entries, exits = self.findPortals(coords, clusters)
+        self.log("cluster order and portals", t0)
+
+        executor = None
+        if self.n_workers > 1:
+            executor = concurrent.futures.ProcessPoolExecutor(self.n_workers, 
+                mp_context=mp.get_context('fork'))
+        try:
+            # 4) solve the clusters, biggest first to balance the load
+            jobs = []
+            for ids, entry, exit in zip(clusters, entries, exits):
+                jobs.append((self.n, self.m, coords[ids], int(np.nonzero(ids == entry)[0][0]), 
+                    int(np.nonzero(ids == exit)[0][0]), self.cluster_solver, self.solver_kwargs,
+                    self.metric))
+            with self.span("4 clusters"):
+                paths = [ids[np.asarray(tour, dtype=np.int64)] for ids, tour in 
+                         zip(clusters, self.runJobs(executor, jobs))]
+            self.log("clusters solved", t0)
+            
+            # 5) boundary repair, the windows around the joins never overlap
+            tour = np.concatenate(paths)
+            seams = np.cumsum([len(path) for path in paths])[:-1]
+            jobs, spans = [], []
+            for i, seam in enumerate(seams):
+                w = min(self.window, len(paths[i]) // 2, len(paths[i+1]) // 2)
+                if w >= 2:
+                    ids = tour[seam - w:seam + w]
+                    jobs.append((self.n, self.m, coords[ids], 0, 2 * w - 1, 
+                        self.cluster_solver, self.solver_kwargs, self.metric, list(range(2 * w))))
+                    spans.append((seam - w, ids))
+            with self.span("5 joins"):
+                for (start, ids), window_tour in zip(spans, self.runJobs(executor, jobs)):
+                    tour[start:start + len(ids)] = ids[np.asarray(window_tour, dtype=np.int64)]
+            self.log("{} joins repaired".format(len(jobs)), t0)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        # 6) one global pass
+        if self.repair:
+            solver = LinKernighanSolver(self.n, self.m, coords, n_kicks=0)
+            solver.useMetric(self.metric).enableProfiling(self.profiler)
+            with self.span("6 global repair"):
+                tour = solver.improve(tour.tolist(), float('inf'))
+            self.log("global repair", t0)
+
+        return self.pathFromTour(tour)
+
+    def runJobs(self, executor, jobs):
+        # solveSubpath on every job, in the pool if there is one. jobs are
+        # submitted biggest first, results come back in order
+        if executor is None:
+            return [solveSubpath(*job) for job in jobs]
+        futures = [None] * len(jobs)
+        for ind in sorted(range(len(jobs)), key=lambda i: -len(jobs[i][2])):
+            futures[ind] = executor.submit(solveSubpath, *jobs[ind])
+        return [future.result() for future in futures]
+
+    def findPortals(self, coords, clusters):
+        
+        # returns the entry and exit point of every cluster (in path order)
+        def nearest(ids, point):
+            diff = coords[ids] - point
+            return ids[np.argmin((diff * diff).sum(axis=1))]
+
+        def farthest(ids, point):
+            diff = coords[ids] - point
+            return ids[np.argmax((diff * diff).sum(axis=1))]
+        
+        entries = [None] * len(clusters)
+        exits = [None] * len(clusters)
+        for i in range(len(clusters) - 1):
+            
+            # a cluster can't be left where it was entered (unless it's
+            # a single point)
+            A, B = clusters[i], clusters[i+1]
+            if entries[i] is not None and len(A) > 1:
+                A = A[A != entries[i]]
+            
+            # nearest to B's center, the nearest in B to that, and back
+            a = nearest(A, coords[B].mean(axis=0))
+            b = nearest(B, coords[a])
+            exits[i] = nearest(A, coords[b])
+            entries[i+1] = b
+
+        # the path starts and ends as far as possible from its first exit 
+        # and last entry
+        entries[0] = farthest(clusters[0], coords[exits[0]])
+        exits[-1] = farthest(clusters[-1], coords[entries[-1]])
+        return entries, exits
+
+
+class IncrementalTourSolver(LinKernighanSolver):
+
+    name = "IncrementalTour"
+
+    # approximate, keeps a path up to date while points come and go
+    # TC: O(N) per addPoint / removePoint (the list insert / delete), plus 
+    #     a local repair bounded by repair_budget seconds
+    #
+    # The initial path is the base solver's, improved by LinKernighan moves
+    # (no kicks). After that, every change is local:
+    #   addPoint: cheapest insertion, into one of the path edges at the K
+    #             nearest points (found with a SpatialGrid), including the
+    #             ends of the path
+    #   removePoint: its two path neighbors are joined
+    # and then LinKernighan moves repair the path around the change, only
+    # following the cities that the moves touch. The candidate lists come
+    # from a NeighborCache over the grid, so only the lists near a change
+    # are recomputed. Points get an id: 0 .. k-1 for the initial points,
+    # and addPoint returns the id of a new one.
+
+    def __init__(self, n, m, points, base_solver=HilbertCurveSolver, 
+            time_budget=60., n_neighbors=8, verbose=False, repair_budget=.05):
+        LinKernighanSolver.__init__(self, n, m, points, base_solver, 
+            time_budget, n_neighbors, verbose, n_kicks=0)
+        self.name = self.base_solver.name + "+" + IncrementalTourSolver.name
+        self.repair_budget = repair_budget
+
+        # points by id (removed points keep their slot), always as a list
+        self.array_input = isinstance(points, np.ndarray)
+        self.points = list(self.pointList())
+        
+        # the virtual city (see LocalSearchSolver) can't be a list index
+        # any more, ids keep growing. so pos is a dict, and it is -1
+        self.dummy = dummy = -1
+        self.grid = SpatialGrid(np.asarray(self.points, dtype=np.float64).reshape(-1, 2))
+        self.neighbors = NeighborCache(self.grid, n_neighbors, extra=dummy)
+        self.setDist()
 
+        t0 = time.time()
+        tour = self.tourFromPath(self.base_solver.computePath()) if self.points else []
+        self.setTour(tour)
+        self.length = self.tourLength()
+        self.repair(tour, t0 + time_budget)
+
+    # the path is there as soon as the solver is, so there is nothing to
+    # report along the way
+    iterSolutions = BaseSolver.iterSolutions
+
+    def __len__(self):
+        return len(self.tour) - 1
+
+    def __contains__(self, i):
+        return i in self.pos and i != self.dummy
+
+    def computePath(self):
+        # the current path
+        path = [self.points[i] for i in self.cutTour()]
+        if self.array_input:
+            return np.array(path, dtype=np.float64).reshape(-1, 2)
+        return path
+
+    def setTour(self, tour):
+        self.tour = list(tour) + [self.dummy]
+        self.pos = {node: ind for ind, node in enumerate(self.tour)}
+
+    def setDist(self):
+        # the metric (with its scalar version) over the grid's coordinates,
+        # the dummy is 0 away from everything
+        self.requireSymmetric()
+        dummy, xs, ys = self.dummy, self.grid.xs, self.grid.ys
+        measure = None if self.metric is EUCLIDEAN else self.metric.scalar()
+
+        def dist(a, b):
+            if a == dummy or b == dummy:
+                return 0.
+            if measure is not None:
+                return measure(xs[a], ys[a], xs[b], ys[b])
+            return hypot(xs[a] - xs[b], ys[a] - ys[b])
+        self.dist = dist
+        self.neighbors.remeasure(None if measure is None else dist)
+
+    def tourLength(self):
+        # the tour is a cycle, the dummy can be anywhere in it
+        dist, tour = self.dist, self.tour
+        return sum([dist(a, b) for a, b in zip(tour, tour[1:] + tour[:1])])
+
+    def useMetric(self, metric):
+        # the path was built with the old metric, so it is measured again 
+        # and repaired everywhere
+        LinKernighanSolver.useMetric(self, metric)
+        self.setDist()
+        self.length = self.tourLength()
+        self.repair(self.cutTour(), time.time() + self.time_budget)
+        return self
+
+    def repair(self, cities, deadline):
+        # LinKernighan moves around the given cities, tiny paths are left 
+        # alone (there is nothing to gain, and the moves assume 4+ cities)
+        if len(self.tour) > 4:
+            self.length -= self.reoptimize(list(cities), deadline)
+
+    def renumber(self, start):
+        # positions moved from index start on
+        tour, pos = self.tour, self.pos
+        for ind in range(start, len(tour)):
+            pos[tour[ind]] = ind
+
+    def addPoint(self, point):
+        # inserts a point, returns its id
+        t0 = time.time()
+        i = self.grid.newPoint(*point)
+        self.points.append(tuple(point))
+        
+        # cheapest insertion between a and its successor b. every edge
+        # touching one of the nearest points is a candidate, on a short 
+        # path simply every edge
+        dist, tour = self.dist, self.tour
+        if len(tour) <= self.n_neighbors + 1:
+            candidates = tour
+        else:
+            candidates = set()
+            for j, d in self.neighbors[i]:
+                candidates.add(j)
+                candidates.add(self.pred(j))
+        best, at = float('inf'), None
+        for a in candidates:
+            b = self.succ(a)
+            cost = dist(a, i) + dist(i, b) - dist(a, b)
+            if cost < best:
+                best, at = cost, a
+
+        ind = self.pos[at] + 1
+        tour.insert(ind, i)
+        self.renumber(ind)
+        self.length += best
+
+        self.grid.add(i)
+        self.neighbors.invalidate(i)
+        self.repair([i, at, self.succ(i)], t0 + self.repair_budget)
+        return i
+
+    def removePoint(self, i):
+        # removes the point with id i from the path
+        t0 = time.time()
+        if i not in self:
+            raise KeyError("No point with id {} in the tour".format(i))
+        a, b = self.pred(i), self.succ(i)
+        self.length += self.dist(a, b) - self.dist(a, i) - self.dist(i, b)
+        
+        ind = self.pos.pop(i)
+        del self.tour[ind]
+        self.renumber(ind)
+        
+        self.grid.remove(i)
+        self.neighbors.invalidate(i)
+        self.repair([a, b], t0 + self.repair_budget)
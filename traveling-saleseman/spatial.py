@@ -0,0 +1,449 @@
+"""
+    Spatial index for TSP solvers by Matthew Schieber
+
+    A uniform grid over the bounding box of the points. Points can be
+    removed (and added back) at any time, and nearest / k-nearest queries
+    only ever see the points currently in the grid. This is what lets
+    nearest neighbor style solvers ask for the "nearest unvisited city"
+    without a k x k distance matrix. New points can be registered later
+    too, and NeighborCache keeps candidate lists up to date while points
+    come and go.
+
+    Also: Hilbert and Morton (Z-order) space filling curve indices, 
+    vectorized over whole arrays of grid cells, and k-means clustering.
+
+"""
+from math import sqrt, ceil
+from heapq import heappush, heappushpop
+from collections import defaultdict
+import numpy as np
+
+
+class SpatialGrid():
+
+    # each query searches rings of cells around the query point, until no
+    # unseen cell can hold anything closer. The grid rebuilds itself with
+    # larger (or smaller) cells when it empties out (or fills up), so the
+    # queries stay cheap until the last few points.
+
+    def __init__(self, coords, ids=None, points_per_cell=2.):
+
+        # coords: (k, 2) coordinates of the points (more can be registered
+        #         later with newPoint)
+        # ids: the points indexed initially (all of them by default)
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.xs = coords[:, 0].tolist()
+        self.ys = coords[:, 1].tolist()
+        self.points_per_cell = points_per_cell
+
+        self.x0, self.y0 = coords.min(axis=0).tolist() if len(self.xs) else (0., 0.)
+        self.x1, self.y1 = coords.max(axis=0).tolist() if len(self.xs) else (1., 1.)
+        self.outside = False
+
+        # where each point lives: its cell and its slot inside that cell
+        self.cell_of = [-1] * len(self.xs)
+        self.slot_of = [-1] * len(self.xs)
+
+        self.build(range(len(self.xs)) if ids is None else ids)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, i):
+        return self.cell_of[i] != -1
+
+    def newPoint(self, x, y):
+        # registers a point that was not in coords, returns its index. Like 
+        # any other point it is only indexed once it is add()ed
+        self.xs.append(float(x))
+        self.ys.append(float(y))
+        self.cell_of.append(-1)
+        self.slot_of.append(-1)
+        if not (self.x0 <= x <= self.x1 and self.y0 <= y <= self.y1):
+            self.outside = True
+        return len(self.xs) - 1
+
+    def build(self, ids):
+
+        ids = list(ids)
+
+        # new points outside the box stretch it (clamping them into the 
+        # border cells is exact, but would crowd those cells)
+        if self.outside:
+            self.x0, self.x1 = min(self.xs), max(self.xs)
+            self.y0, self.y1 = min(self.ys), max(self.ys)
+            self.outside = False
+
+        # square cells, sized so every cell holds ~points_per_cell points
+        width = max(self.x1 - self.x0, 1e-9)
+        height = max(self.y1 - self.y0, 1e-9)
+        self.cell_size = sqrt(width * height * self.points_per_cell / max(len(ids), 1))
+        self.cell_size = max(self.cell_size, max(width, height) / 2048.)
+        self.gx = max(1, min(int(ceil(width / self.cell_size)), 2048))
+        self.gy = max(1, min(int(ceil(height / self.cell_size)), 2048))
+
+        self.size = 0
+        self.cells = [[] for i in range(self.gx * self.gy)]
+        for i in ids:
+            self.cell_of[i] = -1
+            self.add(i)
+
+    def cellOf(self, x, y):
+        # points outside the bounding box are clamped to the border cells.
+        # clamping is a projection onto the box, which never brings two
+        # points closer, so the ring search below stays exact
+        cx = min(max(int((x - self.x0) / self.cell_size), 0), self.gx - 1)
+        cy = min(max(int((y - self.y0) / self.cell_size), 0), self.gy - 1)
+        return cx, cy
+
+    def add(self, i):
+
+        if self.cell_of[i] != -1:
+            return
+        if self.outside and not (self.x0 <= self.xs[i] <= self.x1 and 
+                                 self.y0 <= self.ys[i] <= self.y1):
+            self.build(self.members() + [i])
+            return
+        cx, cy = self.cellOf(self.xs[i], self.ys[i])
+        cell = cy * self.gx + cx
+        self.cell_of[i] = cell
+        self.slot_of[i] = len(self.cells[cell])
+        self.cells[cell].append(i)
+        self.size += 1
+
+        # crowded cells make every query scan too many points, so refine
+        if self.size > 8 * self.points_per_cell * len(self.cells) and \
+                len(self.cells) < 2048 * 2048:
+            self.build(self.members())
+
+    def remove(self, i):
+
+        cell = self.cell_of[i]
+        if cell == -1:
+            return
+
+        # swap with the last point of the cell, then pop. O(1)
+        bucket = self.cells[cell]
+        last = bucket.pop()
+        if last != i:
+            bucket[self.slot_of[i]] = last
+            self.slot_of[last] = self.slot_of[i]
+        self.cell_of[i] = -1
+        self.slot_of[i] = -1
+        self.size -= 1
+
+        # mostly empty cells make the ring search crawl, so coarsen the grid
+        if self.size and 8 * self.size * self.points_per_cell < len(self.cells):
+            self.build(self.members())
+
+    def members(self):
+        return [i for bucket in self.cells for i in bucket]
+
+    def ringCells(self, cx, cy, r):
+        # all (existing) cells at Chebyshev distance r from cell (cx, cy)
+        if r == 0:
+            return [cy * self.gx + cx]
+
+        cells = []
+        x_lo, x_hi = max(cx - r, 0), min(cx + r, self.gx - 1)
+        for y in [cy - r, cy + r]:
+            if 0 <= y < self.gy:
+                cells.extend(range(y * self.gx + x_lo, y * self.gx + x_hi + 1))
+        for x in [cx - r, cx + r]:
+            if 0 <= x < self.gx:
+                for y in range(max(cy - r + 1, 0), min(cy + r - 1, self.gy - 1) + 1):
+                    cells.append(y * self.gx + x)
+        return cells
+
+    def nearest(self, x, y):
+        # returns (index, distance) of the nearest point in the grid to (x, y)
+        # or (-1, inf) if the grid is empty
+
+        if self.size == 0:
+            return -1, float('inf')
+
+        xs, ys, cells = self.xs, self.ys, self.cells
+        cx, cy = self.cellOf(x, y)
+        max_r = max(self.gx, self.gy)
+
+        best, best_d2 = -1, float('inf')
+        for r in range(max_r + 1):
+            for cell in self.ringCells(cx, cy, r):
+                for j in cells[cell]:
+                    d2 = (xs[j] - x) ** 2 + (ys[j] - y) ** 2
+                    if d2 < best_d2:
+                        best, best_d2 = j, d2
+
+            # everything unseen is at least r cells away
+            bound = r * self.cell_size
+            if best != -1 and best_d2 <= bound * bound:
+                break
+
+        return best, sqrt(best_d2)
+
+    def kNearest(self, x, y, K, exclude=-1):
+        # returns the (at most) K nearest points to (x, y), nearest first,
+        # as a list of (distance, index) pairs
+
+        xs, ys, cells = self.xs, self.ys, self.cells
+        cx, cy = self.cellOf(x, y)
+        max_r = max(self.gx, self.gy)
+        K = min(K, self.size - (exclude != -1 and exclude in self))
+        if K <= 0:
+            return []
+
+        # max-heap (by negated distance) of the best K seen so far
+        h = []
+        for r in range(max_r + 1):
+            for cell in self.ringCells(cx, cy, r):
+                for j in cells[cell]:
+                    if j == exclude:
+                        continue
+                    d2 = (xs[j] - x) ** 2 + (ys[j] - y) ** 2
+                    if len(h) < K:
+                        heappush(h, (-d2, j))
+                    elif d2 < -h[0][0]:
+                        heappushpop(h, (-d2, j))
+
+            bound = r * self.cell_size
+            if len(h) == K and -h[0][0] <= bound * bound:
+                break
+
+        return sorted([(sqrt(-d2), j) for d2, j in h])
+
+
+class NeighborCache(dict):
+
+    # candidate lists for local search on a changing set of points: 
+    # cache[i] is a list of (j, distance) pairs, the K nearest points to i 
+    # that are in the grid right now, nearest first. Lists are computed on
+    # first use, and invalidate(i) drops the ones that point i coming or
+    # going may have changed
+
+    def __init__(self, grid, K, extra=None):
+
+        # grid: a SpatialGrid, holding the points that may be candidates
+        # extra: appended to every list with distance 0 (e.g. the virtual
+        #        city that lets the ends of an open path move). its own 
+        #        list is empty
+        dict.__init__(self)
+        self.grid = grid
+        self.K = K
+        self.extra = extra
+        
+        # see remeasure
+        self.dist = None
+        
+        # listed_in[j]: the cached lists that (may) contain j
+        self.listed_in = defaultdict(set)
+
+    def __missing__(self, i):
+        if i == self.extra:
+            return []
+        grid = self.grid
+        row = [(j, d) for d, j in grid.kNearest(grid.xs[i], grid.ys[i], self.K, exclude=i)]
+        if self.dist is not None:
+            row = sorted([(j, self.dist(i, j)) for j, d in row], key=lambda pair: pair[1])
+        for j, d in row:
+            self.listed_in[j].add(i)
+        if self.extra is not None:
+            row.append((self.extra, 0.))
+        self[i] = row
+        return row
+
+    def remeasure(self, dist):
+        # from now on the lists hold dist(i, j) (and are sorted by it), for
+        # other metrics than euclidean. the candidates are still the K 
+        # euclidean nearest, which is a good guess for any metric that is
+        # close to it. None goes back to the grid's distances
+        self.dist = dist
+        self.clear()
+        self.listed_in.clear()
+
+    def invalidate(self, i):
+        # call right after point i was added to or removed from the grid.
+        # drops i's list, every list holding i, and (if i was added) the
+        # lists of i's nearest points, which i may belong in now
+        self.pop(i, None)
+        for j in self.listed_in.pop(i, ()):
+            self.pop(j, None)
+        if i in self.grid:
+            grid = self.grid
+            for d, j in grid.kNearest(grid.xs[i], grid.ys[i], self.K, exclude=i):
+                self.pop(j, None)
+
+
+def nearestNeighborLists(coords, K):
+    """ Computes the K nearest neighbors of every point, without a k x k
+        distance matrix
+
+        Args:
+            coords: (k, 2) coordinates
+            K: number of neighbors per point
+
+        Returns:
+            list: for every point, the indices of its K nearest neighbors,
+                  nearest first
+    """
+    grid = SpatialGrid(coords)
+    return [[j for dist, j in grid.kNearest(x, y, K, exclude=i)]
+            for i, (x, y) in enumerate(zip(grid.xs, grid.ys))]
+
+
+# hilbertTable(width) results, built on first use
+_hilbert_tables = {}
+
+
+def hilbertTable(width):
+    """ Lookup tables to walk the Hilbert curve width levels at a time
+
+        Going down one level, the curve inside a quadrant is the standard
+        curve, flipped and/or transposed. Flips and transposes commute, so
+        where we are in the recursion is one of 4 states (2 * flipped +
+        transposed), and they compose with xor.
+
+        Args:
+            width: number of levels (bits of x and y) per lookup
+
+        Returns:
+            tuple: (index, state) arrays. Entry (state << 2 * width) | 
+                   (x << width) | y holds the curve index of cell (x, y) 
+                   of a 2**width grid entered in that state, and the 
+                   state the next levels are entered in
+    """
+    if width not in _hilbert_tables:
+        cells = 1 << width
+        state, x, y = [a.ravel() for a in np.meshgrid(np.arange(4), 
+            np.arange(cells), np.arange(cells), indexing='ij')]
+        flipped, transposed = state >> 1, state & 1
+
+        # undo the state's transform, then descend one level at a time,
+        # from the top bit down (all branch free: the masks are either 0
+        # or all ones on the bits that change)
+        x = x ^ (flipped * (cells - 1))
+        y = y ^ (flipped * (cells - 1))
+        swap = (x ^ y) * transposed
+        x, y = x ^ swap, y ^ swap
+        
+        index = np.zeros_like(x)
+        for level in range(width - 1, -1, -1):
+            s = 1 << level
+            rx = (x >> level) & 1
+            ry = (y >> level) & 1
+            index += (s * s) * ((3 * rx) ^ ry)
+            
+            # flip the lower bits if rx and not ry, transpose if not ry
+            flip = rx & (ry ^ 1)
+            x ^= flip * (s - 1)
+            y ^= flip * (s - 1)
+            swap = (x ^ y) * (ry ^ 1)
+            x ^= swap
+            y ^= swap
+            flipped ^= flip
+            transposed ^= ry ^ 1
+
+        _hilbert_tables[width] = (index, (flipped << 1) | transposed)
+    return _hilbert_tables[width]
+
+
+def hilbertIndex(x, y, order):
+    """ Position of grid cells along the Hilbert curve
+
+        Args:
+            x: array of integer x coordinates, in [0, 2**order)
+            y: array of integer y coordinates, in [0, 2**order)
+            order: the curve covers a 2**order x 2**order grid (order <= 31)
+
+        Returns:
+            np.ndarray: int64 curve index of every cell, in [0, 4**order)
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    d = np.zeros(np.broadcast(x, y).shape, dtype=np.int64)
+    state = np.zeros_like(d)
+
+    # 8 levels per table lookup (any leftover levels go first)
+    shift = order
+    for width in [order % 8] * (order % 8 > 0) + [8] * (order // 8):
+        shift -= width
+        index, next_state = hilbertTable(width)
+        mask = (1 << width) - 1
+        ind = (state << (2 * width)) | (((x >> shift) & mask) << width) | ((y >> shift) & mask)
+        d = (d << (2 * width)) | index[ind]
+        state = next_state[ind]
+
+    return d
+
+
+def mortonIndex(x, y, order):
+    """ Position of grid cells along the Morton (Z-order) curve, which just
+        interleaves the bits of x and y
+
+        Args:
+            x: array of integer x coordinates, in [0, 2**order)
+            y: array of integer y coordinates, in [0, 2**order)
+            order: the curve covers a 2**order x 2**order grid (order <= 31)
+
+        Returns:
+            np.ndarray: int64 curve index of every cell, in [0, 4**order)
+    """
+    def spread(v):
+        # abcd -> 0a0b0c0d
+        v = np.array(v, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+        for shift, mask in [(16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), 
+                            (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333), 
+                            (1, 0x5555555555555555)]:
+            v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+        return v
+
+    return (spread(x) | (spread(y) << np.uint64(1))).astype(np.int64)
+
+
+def kMeans(coords, k, iterations=10, chunk_size=1 << 16):
+    """ Clusters points with Lloyd's k-means
+
+        The initial centers are k points spread evenly along the Hilbert
+        curve, so they cover the points and the result is deterministic.
+
+        Args:
+            coords: (N, 2) coordinates
+            k: number of clusters (at most N)
+            iterations: Lloyd iterations
+            chunk_size: points per block of the (block, k) distance array
+
+        Returns:
+            tuple: ((N,) cluster label of every point, in [0, k'), and the
+                   (k', 2) centers, where k' <= k as empty clusters are 
+                   dropped)
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    k = max(1, min(k, len(coords)))
+
+    lo = coords.min(axis=0)
+    side = max(float((coords.max(axis=0) - lo).max()), 1e-9)
+    grid = np.minimum(((coords - lo) * ((1 << 16) / side)).astype(np.int64), (1 << 16) - 1)
+    order = np.argsort(hilbertIndex(grid[:, 0], grid[:, 1], 16), kind='stable')
+    centers = coords[order[(np.arange(k) * len(coords)) // k]]
+
+    labels = np.zeros(len(coords), dtype=np.int64)
+    for iteration in range(iterations):
+        for start in range(0, len(coords), chunk_size):
+            block = coords[start:start + chunk_size]
+            d2 = (block * block).sum(axis=1)[:, None] - 2 * block @ centers.T + \
+                 (centers * centers).sum(axis=1)[None, :]
+            labels[start:start + chunk_size] = d2.argmin(axis=1)
+        
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack([np.bincount(labels, weights=coords[:, i], minlength=len(centers))
+                         for i in range(2)], axis=1)
+        keep = counts > 0
+        new_centers = sums[keep] / counts[keep, None]
+        
+        # relabel if a cluster emptied out
+        if not keep.all():
+            labels = (np.cumsum(keep) - 1)[labels]
+        if len(new_centers) == len(centers) and np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+
+    return labels, centers
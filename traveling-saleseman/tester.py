@@ -18,57 +18,57 @@ TestPackage = namedtuple("TestPackage", ['test_set_funs', 'algos'])
 ###############################################################################
 ###### Test Sets ##############################################################
 ###############################################################################
-def testSetRandomUniform1():
+def testSetRandomUniform1(random_seed=0):
     # small enough for BruteForce to work (30s)
     n = m = 20
     n_points = 10
-    seed(0)
+    seed(random_seed)
     points = list(set([(randint(0, m-1), randint(0, n-1)) for ex in range(n_points)])) 
     return TestSet(points, n, m) 
 
 
-def testSetRandomUniform2():
+def testSetRandomUniform2(random_seed=0):
     # larger, last one a python Branch and Bound solver can do (120s)
     n = m = 50
     n_points = 12
-    seed(0)
+    seed(random_seed)
     points = list(set([(randint(0, m-1), randint(0, n-1)) for ex in range(n_points)])) 
     return TestSet(points, n, m) 
 
 
-def testSetRandomUniform3():
+def testSetRandomUniform3(random_seed=0):
     n = m = 100
     n_points = 35
-    seed(0)
+    seed(random_seed)
     points = list(set([(randint(0, m-1), randint(0, n-1)) for ex in range(n_points)])) 
     return TestSet(points, n, m) 
 
 
-def testSetRandomUniform4():
+def testSetRandomUniform4(random_seed=0):
     n = 1000
     m = 1000
     n_points = 300
-    seed(0)
+    seed(random_seed)
     points = list(set([(randint(0, m-1), randint(0, n-1)) for ex in range(n_points)])) 
     return TestSet(points, n, m) 
 
 
-def testSetRandomUniform5():
+def testSetRandomUniform5(random_seed=0):
     n = 10000
     m = 10000
     n_points = 1000
-    seed(0)
+    seed(random_seed)
     points = list(set([(randint(0, m-1), randint(0, n-1)) for ex in range(n_points)])) 
     return TestSet(points, n, m) 
 
 
-def testSetCircle1():
+def testSetCircle1(random_seed=0):
     n = 100
     m = 100
     n_points = 100
     center = [n // 2, m  // 2]
     r = n // 4
-    seed(0)
+    seed(random_seed)
     
     points = []
     for sample in range(n_points):
@@ -80,12 +80,12 @@ def testSetCircle1():
     return TestSet(points, n, m) 
 
 
-def testSetTwoDisjointCities1():
+def testSetTwoDisjointCities1(random_seed=0):
     # deliveries occur within two separable cities
     n = 1000
     m = 1000
     n_points = 300
-    seed(0)
+    seed(random_seed)
     
     # define cities as rectangles, defined by upper right and lower left vertex
     city1 = [(10, 10), (200, 800)]
@@ -1,6 +1,14 @@
 from solvers import *
-from random import randint
+from random import randint, seed, shuffle, uniform
+from spatial import SpatialGrid, NeighborCache, hilbertIndex, mortonIndex, kMeans
+from matching import minWeightPerfectMatching
+from pointsets import savePoints, loadPoints, readTSPLIB, writeTSPLIB, gridSize
+from benchmark import runBenchmark, compareToBaseline, parseSolverSpec, phaseBreakdown
+from profiling import Profiler, NULL_PROFILER
+from metrics import (EuclideanMetric, ManhattanMetric, HaversineMetric, MatrixMetric, 
+    diskCachedMatrix)
 from collections import defaultdict
+import pytest
 
 # mostly for testing my graph classes to get the Christofides algo working 
 
@@ -148,5 +156,780 @@ def test_isBridge4():
                 mg.removeAnEdge(node1, node1+1)
 
 
+def test_distanceMatrix1():
 
+    # the broadcast matrix agrees with the point-by-point distance
+    seed(0)
+    points = [(randint(0, 100), randint(0, 100)) for i in range(30)]
+    d = computeDistanceMatrix(points)
 
+    assert d.shape == (30, 30)
+    for i in range(30):
+        for j in range(30):
+            assert abs(d[i][j] - distance(points[i], points[j])) < 1e-9
+
+    d32 = computeDistanceMatrix(points, np.float32)
+    assert d32.dtype == np.float32
+    assert np.allclose(d, d32, rtol=1e-6)
+
+
+def test_distanceMatrix2():
+
+    # solvers on the same points share one matrix only when caching is on
+    points = [(i, i * i % 7) for i in range(20)]
+    solver1 = NearestNeighborSolver(20, 20, points)
+    solver2 = NearestNeighborSolver(20, 20, list(points))
+    assert solver1.getDistanceMatrix() is solver1.getDistanceMatrix()
+    assert solver1.getDistanceMatrix() is not solver2.getDistanceMatrix()
+
+    clearDistanceMatrixCache()
+    solver1 = NearestNeighborSolver(20, 20, points)
+    solver2 = ChristofidesAlgorithmSolver(20, 20, list(points))
+    solver1.cache_distances = solver2.cache_distances = True
+    assert solver1.getDistanceMatrix() is solver2.getDistanceMatrix()
+
+    # the cache keeps the most recently used matrices, and no more
+    first = cachedDistanceMatrix(points)
+    for i in range(DISTANCE_MATRIX_CACHE_SIZE - 1):
+        cachedDistanceMatrix(points[:i + 5])
+    assert cachedDistanceMatrix(points) is first
+    cachedDistanceMatrix(points[:3])
+    assert cachedDistanceMatrix(points) is first
+    for i in range(DISTANCE_MATRIX_CACHE_SIZE):
+        cachedDistanceMatrix(points[:i + 10])
+    assert cachedDistanceMatrix(points) is not first
+    clearDistanceMatrixCache()
+
+
+def test_pathLength1():
+
+    # index based path lengths agree with the point based total distance
+    seed(1)
+    points = [(randint(0, 100), randint(0, 100)) for i in range(25)]
+    d = computeDistanceMatrix(points)
+    tour = [i for i in range(25)]
+    shuffle(tour)
+
+    path = [points[i] for i in tour]
+    assert abs(pathLength(tour, d) - totalDistance(path)) < 1e-9
+    assert abs(pathLength(np.array(tour), d, closed=True) - 
+               totalDistance(path + path[:1])) < 1e-9
+
+
+def test_HeldKarpSolver1():
+
+    # the DP must find a path as short as the one found by brute force
+    for trial in range(3):
+        seed(trial)
+        points = list(set([(randint(0, 50), randint(0, 50)) for i in range(8)]))
+        
+        exact = BruteForceSolver(50, 50, list(points)).computePath()
+        path = HeldKarpSolver(50, 50, list(points)).computePath()
+
+        assert sorted(path) == sorted(points)
+        assert abs(totalDistance(path) - totalDistance(exact)) < 1e-9
+
+
+def test_LocalSearchSolver1():
+
+    # improving a path never makes it longer, and keeps every point
+    seed(2)
+    points = [(randint(0, 1000), randint(0, 1000)) for i in range(200)]
+    base = OriginSortSolver(1000, 1000, list(points)).computePath()
+
+    solver = LocalSearchSolver(1000, 1000, points, base_solver=OriginSortSolver)
+    path = solver.computePath()
+
+    assert sorted(path) == sorted(points)
+    assert totalDistance(path) < totalDistance(base)
+    
+    # the history follows the improvements pass by pass
+    lengths = [length for iteration, elapsed, length, gain in solver.history]
+    assert all([l1 >= l2 for l1, l2 in zip(lengths, lengths[1:])])
+    assert abs(lengths[-1] - totalDistance(path)) < 1e-6
+    assert solver.name == "OriginSort+LocalSearch"
+
+
+def test_SpatialGrid1():
+
+    # nearest queries agree with a brute force scan while points are removed
+    seed(3)
+    points = [(randint(0, 100), randint(0, 50)) for i in range(300)]
+    grid = SpatialGrid(points)
+    alive = set(range(300))
+
+    while(alive):
+        x, y = randint(-10, 110), randint(-10, 60)
+        ind, dist = grid.nearest(x, y)
+        assert abs(dist - min([distance((x, y), points[i]) for i in alive])) < 1e-9
+        
+        nearest5 = [dist for dist, i in grid.kNearest(x, y, 5)]
+        brute5 = sorted([distance((x, y), points[i]) for i in alive])[:5]
+        assert np.allclose(nearest5, brute5)
+
+        grid.remove(ind)
+        alive.remove(ind)
+
+    assert len(grid) == 0
+
+
+def test_SpatialGrid2():
+
+    # points registered later (some outside the box) are found, and the
+    # cached candidate lists follow the points that come and go
+    seed(5)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(200)]
+    grid = SpatialGrid(points)
+    cache = NeighborCache(grid, 5)
+    alive = set(range(200))
+    for step in range(300):
+        if step % 3:
+            point = (uniform(-50, 150), uniform(-50, 150))
+            ind = grid.newPoint(*point)
+            points.append(point)
+            grid.add(ind)
+            alive.add(ind)
+        else:
+            ind = sorted(alive)[randint(0, len(alive) - 1)]
+            grid.remove(ind)
+            alive.remove(ind)
+        cache.invalidate(ind)
+        
+        # lists never hold removed points, a new point's list is exact
+        i = sorted(alive)[randint(0, len(alive) - 1)]
+        assert all([j in alive for j, dist in cache[i]])
+        if ind in alive:
+            brute = sorted([distance(points[ind], points[j]) for j in alive if j != ind])[:5]
+            assert np.allclose([dist for j, dist in cache[ind]], brute)
+
+
+def test_NearestNeighborSolver1():
+
+    # both indices build the same path from the same start city
+    seed(4)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(200)]
+    
+    for n_starts in [1, 5]:
+        matrix = NearestNeighborSolver(100, 100, points, "matrix", n_starts).computePath()
+        grid = NearestNeighborSolver(100, 100, points, "grid", n_starts).computePath()
+        assert matrix == grid
+
+
+def test_NearestNeighborSolverParallel1():
+
+    # chunked workers on shared memory agree with the serial solver, and
+    # the same pool serves repeated calls
+    seed(5)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(150)]
+    serial = NearestNeighborSolver(100, 100, points).computePath()
+    
+    with NearestNeighborSolverParallel(100, 100, points, n_threads=2) as solver:
+        assert solver.computePath() == serial
+        executor = solver.executor
+        assert solver.computePath() == serial
+        assert solver.executor is executor
+
+    assert solver.executor is None and len(solver.shared) == 0
+
+
+def test_BBSolver1():
+
+    # branch and bound agrees with the Held-Karp DP, and keeps its counters
+    for trial in range(3):
+        seed(10 + trial)
+        points = [(uniform(0, 100), uniform(0, 100)) for i in range(13)]
+
+        exact = HeldKarpSolver(100, 100, points).computePath()
+        solver = BBSolver(100, 100, points)
+        path = solver.computePath()
+
+        assert sorted(path) == sorted(points)
+        assert abs(totalDistance(path) - totalDistance(exact)) < 1e-9
+        assert solver.nodes_expanded > 0
+
+
+def test_TSPGAPopulation1():
+
+    # crossover and mutation only ever produce permutations, the cached
+    # fitness matches the tours, and elitism never loses the best tour
+    seed(6)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(40)]
+    d = computeDistanceMatrix(points)
+
+    for crossover in ["OX", "ERX"]:
+        population = TSPGAPopulation(100, 100, points, popsize=30, dist=d, 
+                                     crossover=crossover)
+        best = population.getTopTour()[0]
+        for generation in range(20):
+            population.propogate()
+            assert population.getTopTour()[0] <= best
+            best = population.getTopTour()[0]
+
+        for tour, fitness in zip(population.population, population.fitness):
+            assert sorted(tour.tolist()) == [i for i in range(40)]
+            assert abs(pathLength(tour, d) - fitness) < 1e-9
+
+        path = population.getTopCreature()
+        assert abs(totalDistance(path) - best) < 1e-6
+
+
+def test_TSPGAPopulation2():
+
+    # tiny populations still evolve (or at least keep their best tour)
+    seed(10)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(12)]
+    d = computeDistanceMatrix(points)
+
+    for popsize in [1, 2, 3]:
+        for crossover in ["OX", "ERX"]:
+            population = TSPGAPopulation(100, 100, points, popsize=popsize, 
+                                         dist=d, crossover=crossover)
+            assert 0 <= population.cull_amount <= max(0, popsize - 2)
+            best = population.getTopTour()[0]
+            for generation in range(10):
+                population.propogate()
+                assert len(population.population) == popsize
+                assert population.getTopTour()[0] <= best
+                best = population.getTopTour()[0]
+            for tour in population.population:
+                assert sorted(tour.tolist()) == [i for i in range(12)]
+
+    path = GenticAlgorithmSolver(100, 100, points, max_generations=10, 
+                                 popsize=1).computePath()
+    assert sorted(path) == sorted(points)
+
+
+def test_GenticAlgorithmSolver1():
+
+    # the island model returns a full tour, and logs every island at
+    # every migration
+    seed(7)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(30)]
+    solver = GenticAlgorithmSolver(100, 100, points, max_generations=40, 
+        popsize=20, n_islands=2, migration_interval=10)
+    path = solver.computePath()
+
+    assert sorted(path) == sorted(points)
+    assert len(solver.island_history) == 4
+    assert all([len(bests) == 2 for bests in solver.island_history])
+    assert abs(min(solver.island_history[-1]) - totalDistance(path)) < 1e-6
+
+
+def test_denseMST1():
+
+    # the matrix based Prim finds a tree as light as the Graph based one
+    seed(8)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(60)]
+    d = computeDistanceMatrix(points)
+
+    g = Graph(60)
+    for i in range(60):
+        for j in range(i+1, 60):
+            g.addUndirectedEdge(i, j, d[i][j])
+    mst = g.PrimsMST()
+    weight = sum([sum(mst.edges[i].values()) for i in mst.edges]) / 2
+
+    edges = denseMST(d)
+    assert len(edges) == 59
+    assert abs(sum([d[i][j] for i, j in edges]) - weight) < 1e-9
+
+
+def test_EulerTour1():
+
+    # Hierholzer uses every edge of an Eulerian multigraph exactly once
+    mg = ArrayMultiGraph(5)
+    edges = [(0, 1), (1, 2), (2, 0), (0, 3), (3, 4), (4, 0), (1, 2), (2, 1)]
+    for i, j in edges:
+        mg.addEdge(i, j)
+    
+    circuit = mg.EulerTour(0)
+    assert circuit[0] == circuit[-1] == 0
+    walked = sorted([tuple(sorted(edge)) for edge in zip(circuit, circuit[1:])])
+    assert walked == sorted([tuple(sorted(edge)) for edge in edges])
+
+
+def test_ChristofidesAlgorithmSolver1():
+
+    seed(9)
+    points = [(uniform(0, 1000), uniform(0, 1000)) for i in range(300)]
+    path = ChristofidesAlgorithmSolver(1000, 1000, points).computePath()
+    assert sorted(path) == sorted(points)
+
+    # the returned rotation is the best one
+    d = computeDistanceMatrix(path)
+    cycle = pathLength(range(300), d, closed=True)
+    assert abs(cycle - max(d[i][(i+1) % 300] for i in range(300)) - 
+               totalDistance(path)) < 1e-6
+
+
+def test_minWeightPerfectMatching1():
+
+    # the blossom algorithm matches the exhaustive search, ties included
+    for trial in range(30):
+        seed(20 + trial)
+        r = 2 * randint(1, 4)
+        if trial % 2:
+            d = np.array([[randint(1, 4) for j in range(r)] for i in range(r)], dtype=float)
+            d = d + d.T
+        else:
+            d = computeDistanceMatrix([(uniform(0, 10), uniform(0, 10)) for i in range(r)])
+
+        g = Graph(r)
+        for i in range(r):
+            for j in range(i+1, r):
+                g.addUndirectedEdge(i, j, d[i][j])
+        exact = g.minCostPerfectMatching()
+        best = sum([sum(exact.edges[i].values()) for i in exact.edges]) / 2
+
+        pairs = minWeightPerfectMatching(d)
+        assert sorted([i for pair in pairs for i in pair]) == [i for i in range(r)]
+        assert abs(sum([d[i][j] for i, j in pairs]) - best) < 1e-6
+
+
+def test_ChristofidesAlgorithmSolver2():
+
+    # the exact matching never loses to the greedy one
+    seed(30)
+    points = [(uniform(0, 1000), uniform(0, 1000)) for i in range(120)]
+    d = computeDistanceMatrix(points)
+    mst = denseMST(d)
+    odds = np.nonzero(np.bincount(np.asarray(mst).ravel(), minlength=120) % 2)[0]
+    sub = d[np.ix_(odds, odds)]
+    
+    greedy = sum([sub[i][j] for i, j in greedyMatching(sub)])
+    exact = sum([sub[i][j] for i, j in minWeightPerfectMatching(sub)])
+    assert exact <= greedy + 1e-9
+
+    path = ChristofidesAlgorithmSolver(1000, 1000, points, "blossom").computePath()
+    assert sorted(path) == sorted(points)
+
+
+def test_benchmark1():
+
+    rows = runBenchmark(["NearestNeighborSolver", "OriginSortSolver",
+                         "LocalSearchSolver:time_budget=1.,base_solver=OriginSortSolver", 
+                         "NotASolver"], 
+                        ["testSetCircle1"], [0, 1])
+    assert len(rows) == 8
+
+    for row in rows:
+        if row['solver'] == "NotASolver":
+            assert row['error'] and row['length'] is None
+            continue
+        assert row['error'] is None and row['n_points'] == 100
+        assert row['time'] >= 0 and row['peak_memory_mb'] > 0
+        assert row['gap'] >= 0 and row['length'] >= row['best_known']
+
+    # gaps are measured against the best tour found for each seed
+    for s in [0, 1]:
+        assert min([row['gap'] for row in rows if row['seed'] == s and not row['error']]) == 0.
+
+    assert parseSolverSpec("LocalSearchSolver:time_budget=2,base_solver=BBSolver") == \
+        (LocalSearchSolver, {'time_budget': 2, 'base_solver': BBSolver})
+
+
+def test_benchmark2():
+
+    baseline = [dict(solver="A", test_set="t", seed=0, time=1., length=100., error=None),
+                dict(solver="B", test_set="t", seed=0, time=1., length=100., error=None),
+                dict(solver="C", test_set="t", seed=0, time=.01, length=100., error=None)]
+    rows = [dict(solver="A", test_set="t", seed=0, time=1.1, length=100.5, error=None),
+            dict(solver="B", test_set="t", seed=0, time=2., length=110., error=None),
+            dict(solver="C", test_set="t", seed=0, time=.04, length=100., error=None),
+            dict(solver="D", test_set="t", seed=0, time=9., length=900., error=None)]
+
+    # A is within tolerance, C's slowdown is timer noise, D has no baseline
+    regressions = compareToBaseline(rows, baseline)
+    assert len(regressions) == 2
+    assert all([r.startswith("B on t") for r in regressions])
+
+
+def test_profiling1():
+
+    seed(10)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(200)]
+
+    # off by default, and then nothing is recorded
+    solver = ChristofidesAlgorithmSolver(100, 100, points)
+    assert solver.profiler is NULL_PROFILER
+    unprofiled = solver.computePath()
+    assert solver.profiler.report() == {'phases': {}, 'counters': {}}
+
+    # every numbered step is a phase, and profiling doesn't change the path
+    solver = ChristofidesAlgorithmSolver(100, 100, points)
+    profiler = solver.enableProfiling()
+    assert solver.computePath() == unprofiled
+    report = profiler.report()
+    assert list(report['phases']) == ["1 distance matrix", "2 mst", "3 odd vertices",
+        "4-5 matching", "6 union", "7 euler tour", "8 shortcut", "9 best rotation"]
+    assert all([phase['calls'] == 1 for phase in report['phases'].values()])
+    odds = report['counters']['odd vertices']
+    assert odds % 2 == 0 and report['counters']['euler edges walked'] == 199 + odds // 2
+
+    # the older graph classes count heap pushes and bridge tests
+    d = computeDistanceMatrix(points[:20])
+    g = Graph(20)
+    for i in range(20):
+        for j in range(i+1, 20):
+            g.addUndirectedEdge(i, j, d[i][j])
+    profiler = Profiler()
+    g.PrimsMST(profiler)
+    mg = MultiGraph(3)
+    for i, j in [(0, 1), (1, 2), (2, 0)]:
+        mg.addUndirectedEdge(i, j, 1)
+    mg.EulerTour(profiler)
+    assert profiler.counters['edges pushed'] >= 19
+    assert profiler.counters['bridges tested'] >= 3
+
+    # spans nest under the solver that wraps another one
+    solver = LocalSearchSolver(100, 100, points, base_solver=ChristofidesAlgorithmSolver)
+    report = solver.enableProfiling().report
+    solver.computePath()
+    assert "base solver/2 mst" in report()['phases']
+    assert report()['counters']['improving moves'] > 0
+
+
+def test_benchmark3():
+
+    # --profile: the fastest run's phases per case, summed per solver
+    rows = runBenchmark(["ChristofidesAlgorithmSolver"], ["testSetRandomUniform3"],
+                        [0, 1], repeats=2, measure_memory=False, profile=True)
+    assert all([row['phases']['phases']['2 mst']['calls'] == 1 for row in rows])
+    breakdown = phaseBreakdown(rows)["ChristofidesAlgorithmSolver"]
+    assert breakdown['phases']['2 mst']['calls'] == 2
+    assert breakdown['counters']['odd vertices'] == sum(
+        [row['phases']['counters']['odd vertices'] for row in rows])
+
+
+def test_iterSolutions1():
+
+    seed(31)
+    points = list(set([(randint(0, 99), randint(0, 99)) for i in range(30)]))
+
+    solvers = [BBSolver(100, 100, list(points)), 
+               RandomSampleSolver(100, 100, list(points), samples=10**9),
+               GenticAlgorithmSolver(100, 100, list(points)),
+               LocalSearchSolver(100, 100, list(points), base_solver=OriginSortSolver)]
+    for solver in solvers:
+        t0 = time.time()
+        lengths = []
+        for length, path in solver.iterSolutions(.3):
+            assert sorted(path) == sorted(points)
+            assert abs(totalDistance(path) - length) < 1e-6
+            lengths.append(length)
+        
+        # improving only, and the time budget is respected
+        assert len(lengths) >= 1
+        assert all([a > b for a, b in zip(lengths, lengths[1:])])
+        assert time.time() - t0 < 2.
+
+
+def test_iterSolutions2():
+
+    # solvers without an anytime version report their final path once
+    seed(32)
+    points = [(uniform(0, 100), uniform(0, 100)) for i in range(50)]
+    results = list(ChristofidesAlgorithmSolver(100, 100, points).iterSolutions(1.))
+    assert len(results) == 1
+
+    # the callback sees every improvement, the last one is returned
+    seen = []
+    solver = LocalSearchSolver(100, 100, points, base_solver=OriginSortSolver)
+    path = solver.computePathWithin(1., lambda length, path: seen.append(length))
+    assert len(seen) > 1 and abs(seen[-1] - totalDistance(path)) < 1e-6
+
+    # stopping early kills the islands
+    solver = GenticAlgorithmSolver(100, 100, points, n_islands=2)
+    solutions = solver.iterSolutions()
+    next(solutions)
+    solutions.close()
+    assert mp.active_children() == []
+
+
+def test_LinKernighanSolver1():
+
+    # small instances: mostly optimal, never worse than plain local search
+    optimal = 0
+    for trial in range(20):
+        seed(trial)
+        points = [(uniform(0, 100), uniform(0, 100)) for i in range(9)]
+        path = LinKernighanSolver(100, 100, points, base_solver=OriginSortSolver).computePath()
+        assert sorted(path) == sorted(points)
+        best = totalDistance(HeldKarpSolver(100, 100, points).computePath())
+        optimal += totalDistance(path) < best + 1e-6
+    assert optimal >= 15
+
+    seed(33)
+    points = [(uniform(0, 1000), uniform(0, 1000)) for i in range(300)]
+    two_opt = totalDistance(LocalSearchSolver(1000, 1000, points).computePath())
+    solver = LinKernighanSolver(1000, 1000, points)
+    path = solver.computePath()
+    assert sorted(path) == sorted(points)
+    assert totalDistance(path) < two_opt
+    
+    # the tracked length matches the path, and no distance matrix was built
+    assert abs(solver.history[-1][2] - totalDistance(path)) < 1e-6
+    assert solver._dist is None
+
+
+def test_SimulatedAnnealingSolver1():
+
+    seed(12)
+    points = [(uniform(0, 1000), uniform(0, 1000)) for i in range(150)]
+    two_opt = totalDistance(LocalSearchSolver(1000, 1000, points).computePath())
+    for kwargs in [{}, {'cooling': 'linear', 'n_reheats': 0}, 
+                   {'n_starts': 3, 'n_workers': 2}]:
+        solver = SimulatedAnnealingSolver(1000, 1000, points, **kwargs)
+        path = solver.computePath()
+        assert sorted(path) == sorted(points)
+        assert totalDistance(path) < two_opt
+        
+        # the moves counter covers every start, and the best start wins
+        starts = kwargs.get('n_starts', 1)
+        assert len(solver.starts) == starts
+        assert solver.n_moves >= starts * solver.max_moves and solver.moves_per_second > 0
+        assert abs(totalDistance(path) - min(s[1] for s in solver.starts)) < 1e-6
+
+
+def test_IncrementalTourSolver1():
+
+    seed(21)
+    points = [(uniform(0, 1000), uniform(0, 1000)) for i in range(300)]
+    solver = IncrementalTourSolver(1000, 1000, points)
+    alive = dict(enumerate(points))
+    for step in range(300):
+        if step % 2:
+            point = (uniform(0, 1000), uniform(0, 1000))
+            alive[solver.addPoint(point)] = point
+        else:
+            ind = sorted(alive)[randint(0, len(alive) - 1)]
+            solver.removePoint(ind)
+            del alive[ind]
+
+    # the path holds exactly the live points, its length is tracked, and 
+    # it stays close to re-solving from scratch
+    path = solver.computePath()
+    assert len(solver) == len(alive) and sorted(path) == sorted(alive.values())
+    assert abs(solver.length - totalDistance(path)) < 1e-6
+    fresh = LinKernighanSolver(1000, 1000, list(alive.values()), n_kicks=0).computePath()
+    assert totalDistance(path) < 1.1 * totalDistance(fresh)
+    
+    # from nothing, and back to nothing
+    solver = IncrementalTourSolver(1000, 1000, [])
+    ids = [solver.addPoint(point) for point in points[:10]]
+    assert sorted(solver.computePath()) == sorted(points[:10])
+    for ind in ids:
+        solver.removePoint(ind)
+    assert solver.computePath() == [] and len(solver) == 0
+
+
+def test_fixedEnds1():
+
+    # with fixed_ends the improved path still starts and ends where it did
+    seed(4)
+    points = [(uniform(0, 1000), uniform(0, 1000)) for i in range(200)]
+    for solver_class in [LocalSearchSolver, LinKernighanSolver, SimulatedAnnealingSolver]:
+        solver = solver_class(1000, 1000, points)
+        solver.fixed_ends = True
+        tour = list(range(len(points)))
+        shuffle(tour)
+        result = solver.improve(list(tour), time.time() + 10)
+        assert sorted(result) == sorted(tour)
+        assert result[0] == tour[0] and result[-1] == tour[-1]
+        assert totalDistance([points[i] for i in result]) < totalDistance([points[i] for i in tour])
+
+
+def test_kMeans1():
+
+    # four well separated blobs are found exactly
+    np.random.seed(0)
+    corners = np.array([[0, 0], [0, 1000], [1000, 0], [1000, 1000]])
+    coords = np.concatenate([c + np.random.rand(250, 2) * 100 for c in corners])
+    labels, centers = kMeans(coords, 4)
+    assert len(centers) == 4 and len(labels) == len(coords)
+    for blob in range(4):
+        assert len(set(labels[blob * 250:(blob + 1) * 250])) == 1
+    assert len(set(labels)) == 4
+
+
+def test_ClusterSolver1():
+
+    seed(8)
+    points = [(uniform(0, 1000), uniform(0, 1000)) for i in range(3000)]
+    hilbert = totalDistance(HilbertCurveSolver(1000, 1000, points).computePath())
+    for n_workers in [1, 2]:
+        path = ClusterSolver(1000, 1000, points, cluster_size=500, 
+                             n_workers=n_workers, n_kicks=50).computePath()
+        assert sorted(path) == sorted(points)
+        assert totalDistance(path) < .85 * hilbert
+
+
+def test_hilbertIndex1():
+
+    # every cell gets its own index, and the curve only makes unit steps
+    for order in [1, 2, 5, 9]:
+        x, y = [a.ravel() for a in np.meshgrid(np.arange(1 << order), np.arange(1 << order))]
+        for curve in [hilbertIndex, mortonIndex]:
+            d = curve(x, y, order)
+            assert sorted(d.tolist()) == [i for i in range(4 ** order)]
+        
+        visits = np.argsort(hilbertIndex(x, y, order))
+        assert (np.abs(np.diff(x[visits])) + np.abs(np.diff(y[visits])) == 1).all()
+
+    # the z in z-order
+    assert mortonIndex([0, 1, 0, 1], [0, 0, 1, 1], 1).tolist() == [0, 1, 2, 3]
+
+
+def test_HilbertCurveSolver1():
+
+    seed(34)
+    points = [(uniform(0, 1000), uniform(0, 1000)) for i in range(2000)]
+    lengths = {}
+    for solver in [HilbertCurveSolver, MortonCurveSolver, OriginSortSolver]:
+        path = solver(1000, 1000, list(points)).computePath()
+        assert sorted(path) == sorted(points)
+        lengths[solver] = totalDistance(path)
+    assert lengths[HilbertCurveSolver] < lengths[MortonCurveSolver] < lengths[OriginSortSolver]
+
+    # points off the grid still work, and so does seeding an improver
+    points = [(-5, 3), (2000, 7), (10, 10), (11, 10), (500, 500)]
+    assert sorted(HilbertCurveSolver(100, 100, list(points)).computePath()) == sorted(points)
+    path = LocalSearchSolver(100, 100, points, base_solver=HilbertCurveSolver).computePath()
+    assert sorted(path) == sorted(points)
+
+
+def test_pointsets1(tmp_path):
+
+    # small integers are stored as int32, anything else as float64
+    seed(35)
+    grid_points = [(randint(0, 99), randint(0, 49)) for i in range(100)]
+    float_points = [(uniform(0, 100), uniform(-5, 5)) for i in range(100)]
+    for points, dtype in [(grid_points, np.int32), (float_points, np.float64)]:
+        filename = str(tmp_path / "points.npy")
+        savePoints(filename, points)
+        loaded = loadPoints(filename)
+        assert isinstance(loaded, np.memmap) and loaded.dtype == dtype
+        assert [tuple(p) for p in loaded.tolist()] == points
+        assert (np.load(filename) == loaded).all()
+
+        writeTSPLIB(str(tmp_path / "points.tsp"), points)
+        again, header = readTSPLIB(str(tmp_path / "points.tsp"))
+        assert header['DIMENSION'] == '100' and header['NAME'] == 'points'
+        assert (again == loaded).all() and again.dtype == dtype
+
+    assert gridSize(grid_points) == (max([y for x, y in grid_points]) + 1, 
+                                     max([x for x, y in grid_points]) + 1)
+
+    points, header = readTSPLIB("mona-lisa100K.tsp")
+    assert points.shape == (100000, 2) and header['EDGE_WEIGHT_TYPE'] == 'EUC_2D'
+    assert points[0].tolist() == [14991, 8390]
+
+
+def test_arrayPoints1(tmp_path):
+
+    # solvers take (k, 2) arrays (even memory-mapped ones) and give back arrays
+    seed(36)
+    points = list(set([(randint(0, 99), randint(0, 99)) for i in range(40)]))
+    savePoints(str(tmp_path / "points.npy"), points)
+    arr = loadPoints(str(tmp_path / "points.npy"))
+    
+    for solver in [OriginSortSolver, HilbertCurveSolver, NearestNeighborSolver, 
+                   ChristofidesAlgorithmSolver, LocalSearchSolver, LinKernighanSolver]:
+        path = solver(100, 100, copyPoints(arr)).computePath()
+        assert isinstance(path, np.ndarray) and path.shape == (len(points), 2)
+        assert sorted(map(tuple, path.tolist())) == sorted(points)
+        
+        # same path as for list input
+        assert path.tolist() == [list(p) for p in solver(100, 100, list(points)).computePath()]
+    
+    assert abs(totalDistance(path) - totalDistance([tuple(p) for p in path.tolist()])) < 1e-9
+
+
+def test_metrics1(tmp_path):
+
+    # the vectorized matrices agree with the scalar formulas
+    seed(37)
+    points = [(uniform(-180, 180), uniform(-80, 80)) for i in range(30)]
+    for metric in [EuclideanMetric(), ManhattanMetric(), HaversineMetric()]:
+        d = metric.matrix(points)
+        scalar = metric.scalar()
+        for i, j in [(0, 1), (3, 17), (29, 5), (8, 8)]:
+            assert abs(d[i, j] - scalar(*points[i], *points[j])) < 1e-9
+            assert abs(d[i, j] - metric.distance(points[i], points[j])) < 1e-9
+        assert np.allclose(d, d.T) and metric.bound(points) >= d.max()
+    
+    # Paris to London is ~344km
+    assert abs(HaversineMetric().distance((2.3522, 48.8566), (-0.1276, 51.5072)) - 344) < 2
+    assert ManhattanMetric().pathLength([(0, 0), (3, 4), (3, 0)]) == 11.
+
+    # written once, memory-mapped after that
+    metric = ManhattanMetric()
+    d = diskCachedMatrix(points, metric, np.float32, str(tmp_path))
+    assert isinstance(d, np.memmap) and d.dtype == np.float32
+    assert np.allclose(d, metric.matrix(points), rtol=1e-6)
+    assert len(list(tmp_path.iterdir())) == 1
+    diskCachedMatrix(points, metric, np.float32, str(tmp_path))
+    diskCachedMatrix(points, HaversineMetric(), np.float32, str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 2
+
+    solver = NearestNeighborSolver(100, 100, points).useMetric(metric)
+    solver.distance_cache_dir = str(tmp_path)
+    assert np.allclose(solver.getDistanceMatrix(), metric.matrix(points))
+    assert len(list(tmp_path.iterdir())) == 3
+
+
+def test_asymmetricMetric1():
+
+    # one way streets: the exact solvers agree on a random asymmetric 
+    # matrix, and the heuristics give valid paths no better than them
+    seed(38)
+    points = list(set([(randint(0, 99), randint(0, 99)) for i in range(8)]))
+    k = len(points)
+    matrix = [[0 if i == j else randint(1, 100) for j in range(k)] for i in range(k)]
+    metric = MatrixMetric(matrix, points)
+    assert not metric.symmetric
+
+    def cost(path):
+        return metric.pathLength(path)
+
+    best = cost(BruteForceSolver(100, 100, points).useMetric(metric).computePath())
+    assert cost(HeldKarpSolver(100, 100, points).useMetric(metric).computePath()) == best
+    assert cost(BBSolver(100, 100, points).useMetric(metric).computePath()) == best
+    
+    nn = NearestNeighborSolver(100, 100, points).useMetric(metric).computePath()
+    ls = LocalSearchSolver(100, 100, points).useMetric(metric).computePath()
+    for path in [nn, ls]:
+        assert sorted(path) == sorted(points)
+    assert best <= cost(ls) <= cost(nn)
+
+    # reversing the path changes its cost, so the directed cost is reported
+    solver = LocalSearchSolver(100, 100, points).useMetric(metric)
+    length, path = list(solver.iterSolutions())[-1]
+    assert abs(length - cost(path)) < 1e-9
+
+    for solver in [LinKernighanSolver, ChristofidesAlgorithmSolver, SimulatedAnnealingSolver]:
+        with pytest.raises(ValueError):
+            solver(100, 100, points).useMetric(metric).computePath()
+
+    # the geometric solvers take any symmetric metric
+    seed(39)
+    points = list(set([(randint(0, 99), randint(0, 99)) for i in range(60)]))
+    metric = ManhattanMetric()
+    nn = NearestNeighborSolver(100, 100, points).useMetric(metric).computePath()
+    for solver in [LocalSearchSolver, LinKernighanSolver, 
+                   lambda n, m, points: ClusterSolver(n, m, points, cluster_size=20, n_workers=1)]:
+        path = solver(100, 100, points).useMetric(metric).computePath()
+        assert sorted(path) == sorted(points)
+        assert metric.pathLength(path) <= metric.pathLength(nn) + 1e-9
+
+    solver = IncrementalTourSolver(100, 100, points).useMetric(metric)
+    for i in range(20):
+        solver.addPoint((uniform(0, 99), uniform(0, 99)))
+    solver.removePoint(0)
+    assert abs(solver.length - metric.pathLength(solver.computePath())) < 1e-6
+
+    # the GA's population scores tours with the new metric too
+    solver = GenticAlgorithmSolver(100, 100, points, max_generations=20).useMetric(metric)
+    assert np.allclose(solver.population.heuristic_computer.dist, metric.matrix(points))
+    length, path = list(solver.iterSolutions())[-1]
+    assert abs(length - metric.pathLength(path)) < 1e-6
@@ -1,4 +1,5 @@
 import itertools
+from collections import OrderedDict
 from math import sqrt
 import numpy as np
 from typing import Tuple, List # necessary before 3.9
@@ -20,9 +21,102 @@ def totalDistance(path: Path) -> float:
         Returns:
             float: sum of distance travelled by the salesman on this route
     """
+    if isinstance(path, np.ndarray):
+        steps = np.diff(path.astype(np.float64), axis=0)
+        return float(np.sqrt((steps * steps).sum(axis=1)).sum())
     return sum([distance(path[i], path[i+1]) for i in range(len(path)-1)])
 
 
+def computeDistanceMatrix(points, dtype=np.float64) -> np.ndarray:
+    """ Computes all pairwise euclidean distances at once with broadcasting
+        
+        Args:
+            points: list of points or a (k, 2) array of coordinates
+            dtype: float type of the returned matrix (float64 or float32)
+
+        Returns:
+            np.ndarray: (k, k) matrix, where entry [i, j] is the distance 
+                        between points[i] and points[j]
+    """
+    arr = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    diff = arr[:, None, :] - arr[None, :, :]
+    return np.sqrt((diff ** 2).sum(axis=2)).astype(dtype, copy=False)
+
+
+# distance matrices shared across solver runs on the same point set, keyed
+# on the (ordered) points, dtype and metric. See BaseSolver.cache_distances.
+# Only the DISTANCE_MATRIX_CACHE_SIZE most recently used matrices are kept,
+# so a long running process that solves many instances doesn't hold on to 
+# every (k, k) matrix it ever built
+DISTANCE_MATRIX_CACHE_SIZE = 4
+_distance_matrix_cache = OrderedDict()
+
+def cachedDistanceMatrix(points, dtype=np.float64, metric=None) -> np.ndarray:
+    """ Same as computeDistanceMatrix, but reuses a previously computed matrix
+        if the very same points (in the same order) were seen before 
+
+        Args:
+            points: list of points or a (k, 2) array of coordinates
+            dtype: float type of the returned matrix
+            metric: a metrics.Metric to build the matrix with (euclidean 
+                    distances if None)
+    """
+    key = (np.dtype(dtype).str, 'euclidean' if metric is None else metric.key(),
+           np.ascontiguousarray(points, dtype=np.float64).tobytes())
+    if key in _distance_matrix_cache:
+        _distance_matrix_cache.move_to_end(key)
+        return _distance_matrix_cache[key]
+    if metric is None:
+        dist = computeDistanceMatrix(points, dtype)
+    else:
+        dist = metric.matrix(points, dtype)
+    _distance_matrix_cache[key] = dist
+    while len(_distance_matrix_cache) > DISTANCE_MATRIX_CACHE_SIZE:
+        # least recently used first
+        _distance_matrix_cache.popitem(last=False)
+    return dist
+
+
+def clearDistanceMatrixCache() -> None:
+    _distance_matrix_cache.clear()
+
+
+def pathLength(tour, dist: np.ndarray, closed: bool=False) -> float:
+    """ Computes total distance traveled along a path of point indices
+        
+        Args:
+            tour: sequence (or array) of indices into the distance matrix
+            dist: (k, k) distance matrix
+            closed: whether to also count the edge from the last point 
+                    back to the first
+
+        Returns:
+            float: sum of distances between consecutive indices of the tour
+    """
+    tour = np.asarray(tour, dtype=np.intp)
+    if len(tour) < 2:
+        return 0.
+    total = dist[tour[:-1], tour[1:]].sum(dtype=np.float64)
+    if closed:
+        total += dist[tour[-1], tour[0]]
+    return float(total)
+
+
+def copyPoints(points):
+    """ Copies a set of points, so a solver may sort or shuffle its own
+
+        Args:
+            points: list of points, or (k, 2) array of points
+
+        Returns:
+            a list, or an array for array input (always in memory, so 
+            memory-mapped points are read here)
+    """
+    if isinstance(points, np.ndarray):
+        return np.array(points)
+    return list(points)
+
+
 def printDistanceAndPlot(path: Path, solver_name: str, 
         test_name: str, total_time: float, figname: str=None) -> None:
     """ computes distance and produces a plot of a path